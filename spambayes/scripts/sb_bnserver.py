@@ -17,6 +17,9 @@ Where:
         if it exists, and saves data to this file at the end.
     -d FILE
         use DBM store FILE as the persistent store.
+    -F FILE
+        use the frozen snapshot (see storage.freeze) in FILE.  When a new
+        snapshot is published over it, the next request will use that.
     -o section:option:value
         set [section, option] in the options database to value
     -a seconds
@@ -45,7 +48,7 @@ def usage(code, msg=''):
 def main():
     """Main program; parse options and go."""
     try:
-        opts, args = getopt.getopt(sys.argv[1:], 'hd:p:o:a:A:')
+        opts, args = getopt.getopt(sys.argv[1:], 'hd:p:F:o:a:A:')
     except getopt.error, msg:
         usage(2, msg)
 
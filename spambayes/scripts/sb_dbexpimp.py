@@ -24,7 +24,14 @@
     Database merging - multiple databases can be merged into one quite
     easily by specifying -m on an import.  This will add the two database
     nham and nspams together and for wordinfo conflicts, will add spamcount
-    and hamcount together.
+    and hamcount together.  Several exports can also be imported together
+    by giving -f more than once.
+
+    With -b, the export is written in a compact, compressed binary format
+    (a token dump) rather than CSV.  It's several times smaller, and quicker
+    to read.  Token dumps are sorted, so any number of them are imported
+    together in a single pass, merging them as they're read.  The format
+    of each file imported is recognised automatically.
 
 Usage:
     sb_dbexpimp [options]
@@ -32,7 +39,9 @@ Usage:
         options:
             -e     : export
             -i     : import
-            -f: FN : flat file to export to or import from
+            -f: FN : flat file to export to or import from; may be given
+                     more than once on an import
+            -b     : export to a binary token dump rather than a CSV file
             -p: FN : name of pickled database file to use
             -d: FN : name of dbm database file to use
             -m     : merge import into an existing database file.  This is
@@ -57,6 +66,11 @@ Examples:
     Import mybayes.db.export into a new DBM mybayes.db
         sb_dbexpimp -i -d mybayes.db -f mybayes.db.export
 
+    Combine the pickled databases of two users into a new DBM combined.db
+        sb_dbexpimp -e -b -p abayes.db -f abayes.dump
+        sb_dbexpimp -e -b -p bbayes.db -f bbayes.dump
+        sb_dbexpimp -i -d combined.db -f abayes.dump -f bbayes.dump
+
     Convert a bayes database from pickle to DBM
         sb_dbexpimp -e -p abayes.db -f abayes.export
         sb_dbexpimp -i -d abayes.db -f abayes.export
@@ -80,6 +94,7 @@ __author__ = "Tim Stone <tim@fourstonesExpressions.com>"
 import csv
 
 import spambayes.storage
+from spambayes import tokendump
 from spambayes.Options import options
 import sys, os, getopt, errno
 from types import UnicodeType
@@ -100,13 +115,16 @@ def uunquote(s):
     # punt
     return s
 
-def runExport(dbFN, useDBM, outFN):
+def runExport(dbFN, useDBM, outFN, binary=False):
     bayes = spambayes.storage.open_storage(dbFN, useDBM)
-    if useDBM == "dbm":
-        words = bayes.db.keys()
-        words.remove(bayes.statekey)
-    else:
-        words = bayes.wordinfo.keys()
+
+    # Without their text, hashed tokens are only written to a token dump,
+    # which marks them as hashes; in a CSV file they'd be taken for text.
+    if not binary and getattr(bayes, "hash_tokens", False) and \
+       not getattr(bayes, "keep_token_text", False):
+        bayes.close()
+        raise ValueError("%s holds hashed tokens without their text, which "
+                         "can only be exported with -b" % (dbFN,))
 
     try:
         fp = open(outFN, 'wb')
@@ -114,25 +132,52 @@ def runExport(dbFN, useDBM, outFN):
         if e.errno != errno.ENOENT:
             raise
 
-    writer = csv.writer(fp)
-
     nham = bayes.nham
     nspam = bayes.nspam
 
     print "Exporting database %s to file %s" % (dbFN, outFN)
-    print "Database has %s ham, %s spam, and %s words" \
-            % (nham, nspam, len(words))
 
-    writer.writerow([nham, nspam])
+    # The records are written as they're read, rather than all fetched
+    # first, so a big database needn't fit in memory.
+    if binary:
+        counter = [0]
+        def items():
+            for word, wi in bayes._wordinfoitems():
+                counter[0] += 1
+                yield word, wi.spamcount, wi.hamcount
+        tokendump.dump_make(fp, nham, nspam, items())
+        count = counter[0]
+    else:
+        writer = csv.writer(fp)
+        writer.writerow([nham, nspam])
+        count = 0
+        for word, wi in bayes._wordinfoitems():
+            writer.writerow([uquote(word), wi.hamcount, wi.spamcount])
+            count += 1
+    fp.close()
+    bayes.close()
+
+    print "Database has %s ham, %s spam, and %s words" \
+            % (nham, nspam, count)
 
-    for word in words:
-        wi = bayes._wordinfoget(word)
-        hamcount = wi.hamcount
-        spamcount = wi.spamcount
-        word = uquote(word)
-        writer.writerow([word, hamcount, spamcount])
+def readRecords(bayes, rdr):
+    for (word, hamcount, spamcount) in rdr:
+        wi = bayes.WordInfoClass()
+        wi.hamcount = int(hamcount)
+        wi.spamcount = int(spamcount)
+        yield uunquote(word), wi
+
+def readDumps(bayes, readers):
+    for key, flags, spamcount, hamcount in tokendump.merge(readers):
+        wi = bayes.WordInfoClass()
+        wi.hamcount = hamcount
+        wi.spamcount = spamcount
+        yield tokendump.token_word(key, flags), wi
 
 def runImport(dbFN, useDBM, newDBM, inFN):
+    # inFN is the name of a file to import, or a list of them.
+    if isinstance(inFN, basestring):
+        inFN = [inFN]
 
     if newDBM:
         try:
@@ -142,57 +187,57 @@ def runImport(dbFN, useDBM, newDBM, inFN):
 
     bayes = spambayes.storage.open_storage(dbFN, useDBM)
 
-    fp = open(inFN, 'rb')
-    rdr = csv.reader(fp)
-    (nham, nspam) = rdr.next()
-
-    if newDBM:
-        bayes.nham = int(nham)
-        bayes.nspam = int(nspam)
-    else:
-        bayes.nham += int(nham)
-        bayes.nspam += int(nspam)
-
     if newDBM:
+        bayes.nham = bayes.nspam = 0
         impType = "Importing"
     else:
         impType = "Merging"
 
-    print "%s file %s into database %s" % (impType, inFN, dbFN)
-
-    for (word, hamcount, spamcount) in rdr:
-        word = uunquote(word)
-
-        # Can't use wordinfo[word] here, because wordinfo
-        # is only a cache with dbm!  Need to use _wordinfoget instead.
-        wi = bayes._wordinfoget(word)
-        if wi is None:
-            wi = bayes.WordInfoClass()
-
-        wi.hamcount += int(hamcount)
-        wi.spamcount += int(spamcount)
-
-        bayes._wordinfoset(word, wi)
+    # Token dumps are sorted, so they're all merged as they're read, in a
+    # single pass; CSV files are read one after another.  Either way,
+    # the counts are added to those already in the database (got with
+    # _wordinfoget, because wordinfo is only a cache with dbm).
+    files = []
+    readers = []
+    count = 0
+    try:
+        for fn in inFN:
+            print "%s file %s into database %s" % (impType, fn, dbFN)
+            fp = open(fn, 'rb')
+            files.append(fp)
+            if tokendump.is_dump(fn):
+                reader = tokendump.DumpReader(fp)
+                readers.append(reader)
+                (nham, nspam) = (reader.nham, reader.nspam)
+            else:
+                rdr = csv.reader(fp)
+                (nham, nspam) = rdr.next()
+                count += spambayes.storage.copy_records(
+                    bayes, readRecords(bayes, rdr), merge=True)
+            bayes.nham += int(nham)
+            bayes.nspam += int(nspam)
+        if readers:
+            count += spambayes.storage.copy_records(
+                bayes, readDumps(bayes, readers), merge=True)
+    finally:
+        for fp in files:
+            fp.close()
 
     print "Storing database, please be patient.  Even moderately sized"
     print "databases may take a very long time to store."
     bayes.store()
     print "Finished storing database"
 
-    if useDBM == "dbm" or useDBM == True:
-        words = bayes.db.keys()
-        words.remove(bayes.statekey)
-    else:
-        words = bayes.wordinfo.keys()
-
-    print "Database has %s ham, %s spam, and %s words" \
-           % (bayes.nham, bayes.nspam, len(words))
+    # A token in more than one file is counted once for each.
+    print "Imported %s records; database has %s ham and %s spam" \
+           % (count, bayes.nham, bayes.nspam)
+    bayes.close()
 
 
 if __name__ == '__main__':
 
     try:
-        opts, args = getopt.getopt(sys.argv[1:], 'iehmvd:p:f:o:')
+        opts, args = getopt.getopt(sys.argv[1:], 'iehmvbd:p:f:o:')
     except getopt.error, msg:
         print >> sys.stderr, str(msg) + '\n\n' + __doc__
         sys.exit()
@@ -200,16 +245,19 @@ if __name__ == '__main__':
     useDBM = "pickle"
     newDBM = True
     dbFN = None
-    flatFN = None
+    flatFNs = []
     exp = False
     imp = False
+    binary = False
 
     for opt, arg in opts:
         if opt == '-h':
             print >> sys.stderr, __doc__
             sys.exit()
         elif opt == '-f':
-            flatFN = arg
+            flatFNs.append(arg)
+        elif opt == '-b':
+            binary = True
         elif opt == '-e':
             exp = True
         elif opt == '-i':
@@ -220,10 +268,14 @@ if __name__ == '__main__':
             options.set_from_cmdline(arg, sys.stderr)
     dbFN, useDBM = spambayes.storage.database_type(opts)
 
-    if (dbFN and flatFN):
-        if exp:
-            runExport(dbFN, useDBM, flatFN)
-        if imp:
-            runImport(dbFN, useDBM, newDBM, flatFN)
+    if dbFN and flatFNs and not (exp and len(flatFNs) > 1):
+        try:
+            if exp:
+                runExport(dbFN, useDBM, flatFNs[0], binary)
+            if imp:
+                runImport(dbFN, useDBM, newDBM, flatFNs)
+        except ValueError, e:
+            print >> sys.stderr, e
+            sys.exit(1)
     else:
         print >> sys.stderr, __doc__
@@ -27,6 +27,9 @@ Options can one or more of:
         use database in DBFILE
     -p PICKLEFILE
         use pickle (instead of database) in PICKLEFILE
+    -F FROZENFILE
+        use the frozen snapshot (see storage.freeze) in FROZENFILE; a
+        snapshot can only be used to filter, not to train
     -n
         create a new database
 *   -f
@@ -164,6 +167,9 @@ class HammieFilter(object):
                 self.h.close()
             self.mode = mode
             self.h = hammie.open(self.dbname, self.usedb, self.mode)
+        elif self.usedb in ("frozen", "table"):
+            # Switch to a newly published snapshot, if there is one.
+            self.h.bayes.refresh()
 
     def close(self):
         if self.h is not None:
@@ -212,7 +218,7 @@ class HammieFilter(object):
 def main(profiling=False):
     h = HammieFilter()
     actions = []
-    opts, args = getopt.getopt(sys.argv[1:], 'hvxd:p:nfgstGSo:P',
+    opts, args = getopt.getopt(sys.argv[1:], 'hvxd:p:F:nfgstGSo:P',
                                ['help', 'version', 'examples', 'option='])
     create_newdb = False
     do_profile = False
@@ -250,7 +256,15 @@ def main(profiling=False):
             create_newdb = True
     h.dbname, h.usedb = storage.database_type(opts)
 
-    if create_newdb or not os.path.exists(h.dbname):
+    if h.usedb in ("frozen", "table"):
+        # A snapshot can only be made with storage.freeze() (or, for a
+        # token table, storage.write_table()), and can't be trained.
+        if create_newdb or \
+           [action for action in actions if action != h.filter] or \
+           Options.options["Hammie", "train_on_filter"]:
+            usage(2, "A frozen snapshot or token table can only be used "
+                  "to filter")
+    elif create_newdb or not os.path.exists(h.dbname):
         h.newdb()
         print >> sys.stderr, "Created new database in", h.dbname
         if create_newdb:
@@ -970,8 +970,9 @@ class IMAPFolder(object):
                         print >> sys.stderr, "[imapfilter] could not retrieve:", msg.uid
                     continue
                 
-                (prob, clues) = classifier.spamprob(msg.tokenize(),
-                                                    evidence=True)
+                (prob, clues) = classifier.spamprob_cached(msg.as_string(),
+                                                           msg.tokenize,
+                                                           evidence=True)
                 # Add headers and remember classification.
                 msg.delSBHeaders()
                 msg.addSBHeaders(prob, clues)
@@ -71,7 +71,13 @@ def get_message(obj):
     return msg
 
 def msg_train(h, msg, is_spam, force):
-    """Train bayes with a single message."""
+    """Decide whether bayes should be trained with a single message.
+
+    If the message was trained as the other class, it is untrained first.
+    Returns True if the message should be trained on.  The training itself
+    is left to the caller, so that all the messages in a mailbox can be
+    trained on together; the caller should then call mark_trained().
+    """
 
     # XXX: big hack -- why is email.Message unable to represent
     # multipart/alternative?
@@ -97,13 +103,24 @@ def msg_train(h, msg, is_spam, force):
         # It's been trained, but as something else.  Untrain.
         del msg[options["Headers", "trained_header_name"]]
         h.untrain(msg, not is_spam)
-    h.train(msg, is_spam)
-    msg.add_header(options["Headers", "trained_header_name"], spamtxt)
 
     return True
 
+def mark_trained(msg, is_spam):
+    """Add the trained header to a message that has been trained on."""
+    if is_spam:
+        spamtxt = options["Headers", "header_spam_string"]
+    else:
+        spamtxt = options["Headers", "header_ham_string"]
+    msg.add_header(options["Headers", "trained_header_name"], spamtxt)
+
 def maildir_train(h, path, is_spam, force, removetrained):
     """Train bayes with all messages from a maildir."""
+    h.train_many(maildir_msgs(h, path, is_spam, force, removetrained),
+                 is_spam)
+
+def maildir_msgs(h, path, is_spam, force, removetrained):
+    """Yield the messages from a maildir that need training."""
 
     if loud:
         print "  Reading %s as Maildir" % (path,)
@@ -135,6 +152,8 @@ def maildir_train(h, path, is_spam, force, removetrained):
             continue
         if not msg_train(h, msg, is_spam, force):
             continue
+        yield msg
+        mark_trained(msg, is_spam)
         trained += 1
         if not options["Headers", "include_trained"]:
             continue
@@ -156,6 +175,10 @@ def maildir_train(h, path, is_spam, force, removetrained):
 
 def mbox_train(h, path, is_spam, force):
     """Train bayes with a Unix mbox"""
+    h.train_many(mbox_msgs(h, path, is_spam, force), is_spam)
+
+def mbox_msgs(h, path, is_spam, force):
+    """Yield the messages from a Unix mbox that need training."""
 
     if loud:
         print "  Reading as Unix mbox"
@@ -182,6 +205,8 @@ def mbox_train(h, path, is_spam, force):
             sys.stdout.write("\r%6d" % counter)
             sys.stdout.flush()
         if msg_train(h, msg, is_spam, force):
+            yield msg
+            mark_trained(msg, is_spam)
             trained += 1
         if options["Headers", "include_trained"]:
             # Write it out with the Unix "From " line
@@ -214,6 +239,10 @@ def mbox_train(h, path, is_spam, force):
 
 def mhdir_train(h, path, is_spam, force):
     """Train bayes with an mh directory"""
+    h.train_many(mhdir_msgs(h, path, is_spam, force), is_spam)
+
+def mhdir_msgs(h, path, is_spam, force):
+    """Yield the messages from an mh directory that need training."""
 
     if loud:
         print "  Reading as MH mailbox"
@@ -237,7 +266,9 @@ def mhdir_train(h, path, is_spam, force):
         if not msg:
             print "Malformed message: %s.  Skipping..." % cfn
             continue
-        msg_train(h, msg, is_spam, force)
+        if msg_train(h, msg, is_spam, force):
+            yield msg
+            mark_trained(msg, is_spam)
         trained += 1
         if not options["Headers", "include_trained"]:
             continue
@@ -0,0 +1,165 @@
+#! /usr/bin/env python
+
+"""Usage: %(program)s [OPTIONS] ...
+
+Prune a SpamBayes database:  remove the tokens that appear in only a few
+trained messages, and that haven't been trained on or been a clue in a
+scored message for a long time (the hapaxes of long-gone spam campaigns,
+for example).  Nothing else in the database is changed.
+
+This needs the [Classifier] x-track_last_seen option, which records when
+each token was last seen.  It is safe to run regularly, from cron, say.
+
+Where OPTIONS is one or more of:
+    -h
+        show usage and exit
+    -d DBNAME
+        use the DBM store
+    -p DBNAME
+        use the pickle store
+    -D DAYS
+        remove tokens not seen for at least this many days (default is
+        the [Storage] x-prune_after_days option, or 180 if that is zero)
+    -c COUNT
+        only remove tokens that appear in fewer than this many trained
+        messages (default is the [Storage] x-prune_below_count option)
+    -u
+        also remove tokens whose last-seen day isn't known, because they
+        were last seen before x-track_last_seen was turned on
+    -C
+        compact a DBM store afterwards, by copying it to a new file.
+        Hash files don't shrink when records are removed from them.
+    -o section:option:value
+        set [section, option] in the options database to value
+
+If neither -p nor -d is given, the database named in the configuration
+file is used.  The size of the database and the time taken to look up a
+sample of its tokens are reported before and after pruning.
+"""
+
+import os
+import sys
+import time
+import random
+import getopt
+
+from spambayes import storage
+from spambayes.Options import options, get_pathname_option
+
+program = sys.argv[0]
+
+# The number of tokens whose lookups are timed.
+SAMPLE_SIZE = 1000
+
+def usage(code, msg=''):
+    """Print usage message and sys.exit(code)."""
+    if msg:
+        print >> sys.stderr, msg
+        print >> sys.stderr
+    print >> sys.stderr, __doc__ % globals()
+    sys.exit(code)
+
+# The suffixes the dbm modules add to the names of their files:  a dbm
+# database named name is in one or more of the files name + suffix.
+DB_SUFFIXES = ("", ".db", ".dir", ".pag", ".dat", ".bak")
+
+def db_size(name):
+    """Return the size in bytes of the named database, or None if it
+    isn't (only) a file."""
+    size = None
+    for suffix in DB_SUFFIXES:
+        if os.path.isfile(name + suffix):
+            size = (size or 0) + os.path.getsize(name + suffix)
+    return size
+
+def time_lookups(bayes, words):
+    """Return the mean time in microseconds to look up each of words."""
+    if not words:
+        return 0.0
+    start = time.time()
+    for word in words:
+        bayes._wordinfoget(word)
+    return (time.time() - start) * 1e6 / len(words)
+
+def compact(name, usedb, bayes):
+    """Copy a dbm database to a new file, and replace it with the copy."""
+    tmpname = name + ".prune"
+    storage.convert(name, usedb, tmpname, usedb, bayes.hash_tokens,
+                    bayes.keep_token_text)
+    # Whichever files the dbm module made of the copy replace those of the
+    # same kind.
+    for suffix in DB_SUFFIXES:
+        if os.path.isfile(tmpname + suffix):
+            os.rename(tmpname + suffix, name + suffix)
+
+def report(label, ntokens, size, latency):
+    if size is None:
+        size = "n/a"
+    else:
+        size = "%d bytes" % (size,)
+    print "%-7s %9d tokens, %s, %.1f us per lookup" % (label, ntokens, size,
+                                                      latency)
+
+def main():
+    """Main program; parse options and go."""
+    try:
+        opts, args = getopt.getopt(sys.argv[1:], 'hd:p:D:c:uCo:')
+    except getopt.error, msg:
+        usage(2, msg)
+    if args:
+        usage(2, "Positional arguments not allowed")
+
+    days = options["Storage", "x-prune_after_days"] or 180
+    threshold = options["Storage", "x-prune_below_count"]
+    include_unknown = False
+    do_compact = False
+    for opt, arg in opts:
+        if opt == '-h':
+            usage(0)
+        elif opt == '-D':
+            days = int(arg)
+        elif opt == '-c':
+            threshold = int(arg)
+        elif opt == '-u':
+            include_unknown = True
+        elif opt == '-C':
+            do_compact = True
+        elif opt == '-o':
+            options.set_from_cmdline(arg, sys.stderr)
+
+    name, usedb = storage.database_type(opts)
+    if usedb is None:
+        usedb = options["Storage", "persistent_use_database"]
+        name = get_pathname_option("Storage", "persistent_storage_file")
+
+    bayes = storage.open_storage(name, usedb)
+    words = bayes._wordinfokeys()
+    sample = random.sample(words, min(SAMPLE_SIZE, len(words)))
+    report("Before:", len(words), db_size(name), time_lookups(bayes, sample))
+    del words
+
+    removed = bayes.prune(days, threshold, include_unknown)
+    print "Removed %d tokens in fewer than %d messages, not seen for " \
+          "%d days." % (removed, threshold, days)
+    bayes.store()
+    bayes.close()
+    if do_compact:
+        if usedb == "dbm":
+            # The pruning has been stored, whether or not this works.
+            try:
+                compact(name, usedb, bayes)
+            except OSError, e:
+                print >> sys.stderr, "Couldn't compact %s: %s" % (name, e)
+        else:
+            print >> sys.stderr, "Only DBM stores need compacting."
+
+    # Reopen the database, so that the lookups are as cold as before.
+    bayes = storage.open_storage(name, usedb, 'r')
+    try:
+        report("After:", len(bayes._wordinfokeys()), db_size(name),
+               time_lookups(bayes, sample))
+    finally:
+        bayes.close()
+
+if __name__ == "__main__":
+    main()
@@ -551,8 +551,9 @@ class BayesProxy(POP3ProxyBase):
                       _class=spambayes.message.SBHeaderMessage)
             msg.setId(state.getNewMessageName())
             # Now find the spam disposition and add the header.
-            (prob, clues) = state.bayes.spamprob(msg.tokenize(),
-                                                 evidence=True)
+            (prob, clues) = state.bayes.spamprob_cached(messageText,
+                                                        msg.tokenize,
+                                                        evidence=True)
 
             msg.addSBHeaders(prob, clues)
 
@@ -867,6 +868,13 @@ class State:
         self.bayes = storage.open_storage(self.DBName, self.useDB)
         self.mdb = spambayes.message.Message().message_info_db
 
+        # Prune rare tokens that haven't been seen for a long time, if
+        # we've been asked to.
+        prune_days = options["Storage", "x-prune_after_days"]
+        if prune_days and not self.isTest:
+            self.bayes.prune(prune_days,
+                             options["Storage", "x-prune_below_count"])
+
         # Load stats manager.
         self.stats = Stats.Stats(options, self.mdb)
 
@@ -13,6 +13,10 @@ Where:
         if it exists, and saves data to this file at the end.
     -d FILE
         use DBM store FILE as the persistent store.
+    -t
+        handle each request in a thread of its own, so that several
+        messages can be scored at once.  Training still happens one
+        message at a time, while no scoring is going on.
     -o section:option:value
         set [section, option] in the options database to value
 
@@ -25,14 +29,20 @@ Where:
 import getopt
 import sys
 import xmlrpclib
+import SocketServer
 import SimpleXMLRPCServer
 
 from spambayes import hammie, Options
 from spambayes import storage
+from spambayes import threadsafe
 
 class ReusableSimpleXMLRPCServer(SimpleXMLRPCServer.SimpleXMLRPCServer):
     allow_reuse_address = True
 
+class ThreadingXMLRPCServer(SocketServer.ThreadingMixIn,
+                            ReusableSimpleXMLRPCServer):
+    daemon_threads = True
+
 
 program = sys.argv[0] # For usage(); referenced by docstring above
 
@@ -64,17 +74,20 @@ def usage(code, msg=''):
 def main():
     """Main program; parse options and go."""
     try:
-        opts, args = getopt.getopt(sys.argv[1:], 'hd:p:o:')
+        opts, args = getopt.getopt(sys.argv[1:], 'hd:p:o:t')
     except getopt.error, msg:
         usage(2, msg)
 
     options = Options.options
 
+    server_class = ReusableSimpleXMLRPCServer
     for opt, arg in opts:
         if opt == '-h':
             usage(0)
         elif opt == '-o':
             options.set_from_cmdline(arg, sys.stderr)
+        elif opt == '-t':
+            server_class = ThreadingXMLRPCServer
     dbname, usedb = storage.database_type(opts)
 
     if len(args) != 1:
@@ -84,9 +97,11 @@ def main():
     port = int(port)
 
     bayes = storage.open_storage(dbname, usedb)
-    h = XMLHammie(bayes)
+    if server_class is ThreadingXMLRPCServer:
+        bayes = threadsafe.LockedClassifier(bayes)
+    h = XMLHammie(bayes, 'c')
 
-    server = ReusableSimpleXMLRPCServer(
+    server = server_class(
         (ip, port),
         SimpleXMLRPCServer.SimpleXMLRPCRequestHandler)
     server.register_instance(h)
@@ -82,6 +82,7 @@ scripts=['scripts/sb_client.py',
          'scripts/sb_mboxtrain.py',
          'scripts/sb_notesfilter.py',
          'scripts/sb_pop3dnd.py',
+         'scripts/sb_prune.py',
          'scripts/sb_server.py',
          'scripts/core_server.py',
          'scripts/sb_unheader.py',
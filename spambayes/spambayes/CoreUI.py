@@ -149,6 +149,8 @@ class CoreUserInterface(UserInterface.UserInterface):
         self.state.buildStatusStrings()
         stateDict = self.state.__dict__.copy()
         stateDict.update(self.state.bayes.__dict__)
+        stateDict["scoreCacheHits"] = self.state.bayes.scorecache.hits
+        stateDict["scoreCacheMisses"] = self.state.bayes.scorecache.misses
         statusTable = self.html.statusTable.clone()
         findBox = self._buildBox(_('Word query'), 'query.gif',
                                  self.html.wordQuery)
@@ -143,6 +143,8 @@ class IMAPUserInterface(UserInterface.UserInterface):
         stateDict = self.classifier.__dict__.copy()
         stateDict["warning"] = ""
         stateDict.update(self.classifier.__dict__)
+        stateDict["scoreCacheHits"] = self.classifier.scorecache.hits
+        stateDict["scoreCacheMisses"] = self.classifier.scorecache.misses
         statusTable = self.html.statusTable.clone()
         del statusTable.proxyDetails
         # This could be a bit more modular
@@ -578,6 +578,38 @@ defaults = {
      spambayes@python.org with your comments and results.
      """),
      BOOLEAN, RESTORE),
+
+    ("x-use_compact_wordinfo", _("Use compact in-memory token storage"), False,
+     _("""(EXPERIMENTAL) Keep the token counts of an in-memory (e.g. pickle)
+     database in a compact columnar store, rather than in one WordInfo
+     object per token.  This cuts the memory needed for a large database
+     by about half (see utilities/wordinfo_memory.py), at the cost of
+     slower token lookups:  scoring takes roughly twice as long, and
+     training several times as long.  Note that a pickle saved with this
+     option enabled can only be read by versions of SpamBayes that have
+     it."""),
+     BOOLEAN, RESTORE),
+
+    ("x-track_last_seen", _("Track when tokens were last seen"), False,
+     _("""(EXPERIMENTAL) Record, for each token, the day on which it was
+     last trained on or was a clue in a scored message, so that tokens
+     that are both rare and long unseen can be pruned from the database
+     (see sb_prune.py, and the [Storage] x-prune_after_days option).  Each
+     token's record is written back at most once a day.  The days are kept
+     by dbm, pickle and ZODB databases (but not with the compact in-memory
+     token storage option), and add a little to the size of each
+     record."""),
+     BOOLEAN, RESTORE),
+
+    ("x-early_exit_scoring", _("Stop scoring once the outcome is certain"),
+     False,
+     _("""(EXPERIMENTAL) When only a message's classification is wanted
+     (not the clues behind it), combine its clues strongest first, and
+     stop as soon as the weaker ones left can't move the score past the
+     ham or spam cutoff.  The score is then somewhere in the range the
+     remaining clues could give, so it isn't the exact score, but it is
+     always ham, unsure or spam exactly when the exact score would be."""),
+     BOOLEAN, RESTORE),
   ),
 
   "Hammie": (
@@ -604,8 +636,14 @@ defaults = {
      _("""SpamBayes can use either a ZODB or dbm database (quick to score
      one message) or a pickle (quick to train on huge amounts of messages).
      There is also (experimental) ability to use a mySQL or PostgresSQL
-     database."""),
-     ("zeo", "zodb", "cdb", "mysql", "pgsql", "dbm", "pickle"), RESTORE),
+     database, or an SQLite database file (which needs no server).
+     A frozen database is a read-only snapshot of another
+     database (see storage.freeze), for filters that only classify, and
+     a table is a read-only copy of another database's counts (see
+     storage.write_table, or convert_db.py -T table) that is quick to
+     open, for filters that are started for each message."""),
+     ("zeo", "zodb", "cdb", "mysql", "pgsql", "sqlite", "dbm", "pickle",
+      "frozen", "table"), RESTORE),
 
     ("persistent_storage_file", _("Storage file name"), DB_TYPE[1],
      _("""Spambayes builds a database of information that it gathers
@@ -694,6 +732,113 @@ defaults = {
      (and are correctly classified), you may not wish to cache these.
      If you set this to zero (0), then this option will have no effect."""),
      INTEGER, RESTORE),
+
+    ("training_buffer_size", _("Bulk training memory limit"), 32,
+     _("""When training on many messages at once (for example, with
+     sb_mboxtrain or hammiebulk), the changes to the token counts are
+     collected in memory and written to the database in one pass, rather
+     than once for every message.  This is roughly how much memory, in
+     megabytes, may be used to collect them; when it is reached, the
+     changes so far are written out and collecting starts again.
+     A larger value means fewer writes to the database."""),
+     INTEGER, RESTORE),
+
+    ("score_cache_size", _("Remembered scores"), 100,
+     _("""The scores of this many recently classified messages are
+     remembered, so that classifying exactly the same message again (for
+     example, when a mail client fetches a message twice, or an IMAP
+     folder is filtered again) doesn't mean tokenizing and scoring it
+     again.  The remembered scores are forgotten whenever the database is
+     trained.  Set this to 0 to remember nothing."""),
+     INTEGER, RESTORE),
+
+    ("wordinfo_cache_size", _("Cached database records"), 100000,
+     _("""With a dbm database, the records of the most recently used
+     tokens (this many of them) are kept in memory, so that they needn't
+     be read from the database again.  Records that have been changed by
+     training are kept until they are stored, however many there are.  Set
+     this to 0 to keep every record that is read, which is quickest, but
+     means that a long-running server slowly reads most of the database
+     into memory."""),
+     INTEGER, RESTORE),
+
+    ("wordinfo_cache_memory", _("Cached database records (MB)"), 0,
+     _("""With a dbm database, keep no more records in memory than fit in
+     roughly this many megabytes, besides those changed by training and
+     not yet stored.  0 means that only the number of records is
+     limited."""),
+     INTEGER, RESTORE),
+
+    ("cdb_journal_percent", _("CDB journal size (%)"), 0,
+     _("""A CDB database can't be changed in place, so by default it is
+     rewritten every time it is saved, which takes a while when it is big.
+     Set this to a percentage (10 is a good choice) to append the changes
+     made by training to a journal file next to the database instead, until
+     the journal would be bigger than that percentage of the size of the
+     database; then the database is rewritten with all the changes, and
+     the journal is removed."""),
+     INTEGER, RESTORE),
+
+    ("pickle_journal_percent", _("Pickle journal size (%)"), 0,
+     _("""By default a pickle is rewritten every time it is saved, which
+     takes a while when it is big.  Set this to a percentage (10 is a good
+     choice) to append the changes made by training to a journal file next
+     to the pickle instead, until the journal would be bigger than that
+     percentage of the size of the pickle; then the pickle is rewritten
+     with all the changes, and the journal is removed."""),
+     INTEGER, RESTORE),
+
+    ("x-negative_lookup_filter", _("Filter out unknown tokens"), False,
+     _("""(EXPERIMENTAL) With a dbm or SQL database, keep a Bloom filter of
+     the tokens in the database in memory (about ten bits per token), so
+     that looking up a token that isn't there, as most of the tokens in a
+     spam aren't, usually costs a few hash operations instead of a trip to
+     the database.  The filter is built from all the keys in the database
+     whenever it's opened, which takes a few seconds for a large one, so
+     this is best for long-running servers rather than for filters that
+     are started once per message."""),
+     BOOLEAN, RESTORE),
+
+    ("sql_pool_size", _("Connections to an SQL database"), 1,
+     _("""The most connections to keep open to an SQL database (PostgreSQL,
+     MySQL or SQLite).  Each thread that uses the database has a
+     connection to itself while it does, so with more than one, a threaded
+     server (such as sb_xmlrpcserver) can score several messages at
+     once; training still waits for scoring to finish."""),
+     INTEGER, RESTORE),
+
+    ("x-hash_tokens", _("Store hashed tokens"), False,
+     _("""(EXPERIMENTAL) Store a 64-bit hash of each token in the database
+     instead of the token itself.  Tokens can be long (whole URLs and
+     subject lines, for instance), and every one is a key in the database,
+     so this makes dbm, SQL and CDB databases smaller and lookups cheaper.
+     The chance of two tokens sharing a hash is negligible (see
+     utilities/token_hash_collisions.py).  This only affects new databases;
+     an existing database keeps the form it was created with (use
+     utilities/convert_db.py -H to convert one).  Without the token text,
+     the "word query" page can only find tokens by exact match."""),
+     BOOLEAN, RESTORE),
+
+    ("x-hash_tokens_keep_text", _("Keep the text of hashed tokens"), False,
+     _("""(EXPERIMENTAL) When storing hashed tokens, also keep the text of
+     each token to one side, so that the database can still be listed
+     and searched by token.  This gives back most of the space saving."""),
+     BOOLEAN, RESTORE),
+
+    ("x-prune_after_days", _("Prune tokens unseen for this many days"), 0,
+     _("""(EXPERIMENTAL) If this is not zero, sb_server prunes the database
+     each time it starts, removing the tokens that appear in fewer than
+     [Storage] x-prune_below_count trained messages, and that have not
+     been seen for this many days.  This needs [Classifier]
+     x-track_last_seen, and only tokens seen since that was turned on are
+     pruned."""),
+     INTEGER, RESTORE),
+
+    ("x-prune_below_count", _("Prune tokens in fewer messages than"), 2,
+     _("""(EXPERIMENTAL) When pruning, only remove tokens that appear in
+     fewer than this many trained messages.  The default, 2, removes only
+     tokens seen in a single message ("hapaxes")."""),
+     INTEGER, RESTORE),
   ),
 
   # These options control the various headers that some Spambayes
@@ -162,6 +162,8 @@ class ProxyUserInterface(UserInterface.UserInterface):
         state.buildStatusStrings()
         stateDict = state.__dict__.copy()
         stateDict.update(state.bayes.__dict__)
+        stateDict["scoreCacheHits"] = state.bayes.scorecache.hits
+        stateDict["scoreCacheMisses"] = state.bayes.scorecache.misses
         statusTable = self.html.statusTable.clone()
         if not state.servers:
             statusTable.proxyDetails = _("No POP3 proxies running.<br/>")
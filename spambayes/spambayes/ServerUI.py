@@ -66,6 +66,8 @@ class ServerUserInterface(UserInterface.UserInterface):
         """Serve up the homepage."""
         stateDict = self.state.__dict__.copy()
         stateDict.update(self.state.bayes.__dict__)
+        stateDict["scoreCacheHits"] = self.state.bayes.scorecache.hits
+        stateDict["scoreCacheMisses"] = self.state.bayes.scorecache.misses
         statusTable = self.html.statusTable.clone()
         if not self.state.servers:
             statusTable.proxyDetails = "No POP3 proxies running."
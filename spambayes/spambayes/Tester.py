@@ -1,5 +1,10 @@
 from spambayes.Options import options
 
+# Number of examples predict() scores together.  Scoring in batches lets
+# the classifier share token lookups between examples (and combine their
+# scores in one go, if NumPy is available).
+PREDICT_BATCH_SIZE = 500
+
 class Test:
     # Pass a classifier instance (an instance of Bayes).
     # Loop:
@@ -48,25 +53,21 @@ class Test:
     # before returning, and resets test results.
     def train(self, hamstream=None, spamstream=None):
         self.reset_test_results()
-        learn = self.classifier.learn
+        learn_many = self.classifier.learn_many
         if hamstream is not None:
-            for example in hamstream:
-                learn(example, False)
+            learn_many((example, False) for example in hamstream)
         if spamstream is not None:
-            for example in spamstream:
-                learn(example, True)
+            learn_many((example, True) for example in spamstream)
 
     # Untrain the classifier on streams of ham and spam.  Updates
     # probabilities before returning, and resets test results.
     def untrain(self, hamstream=None, spamstream=None):
         self.reset_test_results()
-        unlearn = self.classifier.unlearn
+        unlearn_many = self.classifier.unlearn_many
         if hamstream is not None:
-            for example in hamstream:
-                unlearn(example, False)
+            unlearn_many((example, False) for example in hamstream)
         if spamstream is not None:
-            for example in spamstream:
-                unlearn(example, True)
+            unlearn_many((example, True) for example in spamstream)
 
     # Run prediction on each sample in stream.  You're swearing that stream
     # is entirely composed of spam (is_spam True), or of ham (is_spam False).
@@ -79,9 +80,7 @@ class Test:
     # If specified, callback(msg, spam_probability) is called for each
     # msg in the stream, after the spam probability is computed.
     def predict(self, stream, is_spam, callback=None):
-        guess = self.classifier.spamprob
-        for example in stream:
-            prob = guess(example)
+        for example, prob in self._guesses(stream):
             if callback:
                 callback(example, prob)
             is_ham_guessed  = prob <  options["Categorization", "ham_cutoff"]
@@ -112,6 +111,20 @@ class Test:
         assert (self.nspam_right + self.nspam_wrong + self.nspam_unsure ==
                 self.nspam_tested)
 
+    # Generate (example, spam_probability) pairs for the examples in stream.
+    def _guesses(self, stream):
+        guess_many = self.classifier.spamprob_many
+        batch = []
+        for example in stream:
+            batch.append(example)
+            if len(batch) >= PREDICT_BATCH_SIZE:
+                for pair in zip(batch, guess_many(batch)):
+                    yield pair
+                batch = []
+        if batch:
+            for pair in zip(batch, guess_many(batch)):
+                yield pair
+
     def false_positive_rate(self):
         """Percentage of ham mistakenly identified as spam, in 0.0..100.0."""
         return self.nham_wrong * 1e2 / (self.nham_tested or 1)
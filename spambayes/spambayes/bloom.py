@@ -0,0 +1,136 @@
+"""A Bloom filter, for knowing which tokens a database doesn't hold.
+
+Most of the tokens in a spam have never been seen before, and with a dbm
+or SQL database each of them costs a probe or a query that finds nothing.
+A Bloom filter of the keys in the database answers "might this key be
+there?" with a few hash operations and about ten bits of memory per key.
+A "no" is always right, so the database needn't be asked; a "yes" is
+wrong for a small fraction (the false positive rate) of the keys that
+aren't there, which then cost the lookup they would have anyway.
+
+Keys can be added but not removed, so a key deleted from the database
+stays a false positive until the filter is rebuilt.
+"""
+
+# This module is part of the spambayes project, which is Copyright 2002-2007
+# The Python Software Foundation and is covered by the Python Software
+# Foundation license.
+
+import math
+import array
+import struct
+
+from spambayes.port import md5
+
+
+class BloomFilter(object):
+    """A set of strings that can say for sure only that a string isn't in
+    it.
+
+    It's sized for capacity keys, with the given false positive rate;
+    more can be added, but the rate then goes up (full() says when).  The
+    filter also counts the lookups it has answered:  checks, the ones it
+    rejected (each a database lookup saved), and false_positives, the ones
+    it let through that the database then didn't have (which the caller
+    reports with missed()).  With several threads looking keys up at
+    once, the counts may come out a little low.
+    """
+
+    def __init__(self, capacity, error_rate=0.01):
+        capacity = max(capacity, 1024)
+        self.capacity = capacity
+        self.error_rate = error_rate
+        ln2 = math.log(2)
+        self.nbits = int(math.ceil(-capacity * math.log(error_rate) /
+                                   (ln2 * ln2)))
+        self.nhashes = max(1, int(round(ln2 * self.nbits / capacity)))
+        self.bits = array.array('B', [0]) * ((self.nbits + 7) // 8)
+        self.count = 0
+        self.checks = self.rejections = self.false_positives = 0
+
+    def __repr__(self):
+        return ("BloomFilter(keys=%d, bytes=%d, lookups saved=%d of %d, "
+                "false positive rate=%.4f)" %
+                (self.count, len(self.bits), self.rejections, self.checks,
+                 self.false_positive_rate()))
+
+    def __len__(self):
+        return self.count
+
+    def _positions(self, key):
+        # Two 64-bit hashes from one digest, combined as in Kirsch and
+        # Mitzenmacher's "Less Hashing, Same Performance".
+        h1, h2 = struct.unpack("<QQ", md5(key).digest())
+        nbits = self.nbits
+        pos = int(h1 % nbits)
+        step = int(h2 % nbits)
+        positions = [pos]
+        for _i in xrange(self.nhashes - 1):
+            pos = (pos + step) % nbits
+            positions.append(pos)
+        return positions
+
+    def add(self, key):
+        """Add key, returning whether it's new to the filter.
+
+        Only new keys are counted towards the capacity, so the same key
+        may be added again and again (as a database adds a token each time
+        it changes).  A new key that the filter already seemed to hold (a
+        false positive) isn't counted either, so the count runs a little
+        low, by about the false positive rate.
+        """
+        bits = self.bits
+        new = False
+        for pos in self._positions(key):
+            byte = pos >> 3
+            bit = 1 << (pos & 7)
+            if not bits[byte] & bit:
+                bits[byte] |= bit
+                new = True
+        if new:
+            self.count += 1
+        return new
+
+    def might_contain(self, key):
+        """Return False if key certainly hasn't been added, else True."""
+        self.checks += 1
+        bits = self.bits
+        for pos in self._positions(key):
+            if not bits[pos >> 3] & (1 << (pos & 7)):
+                self.rejections += 1
+                return False
+        return True
+
+    def missed(self, n=1):
+        """Note that n keys might_contain() let through weren't there."""
+        self.false_positives += n
+
+    def full(self):
+        """Return whether more keys have been added than the filter was
+        sized for."""
+        return self.count > self.capacity
+
+    def false_positive_rate(self):
+        """Return the fraction of the lookups of missing keys that the
+        filter let through."""
+        misses = self.rejections + self.false_positives
+        if misses:
+            return float(self.false_positives) / misses
+        return 0.0
+
+
+def build(keys, old=None, headroom=2):
+    """Return a BloomFilter holding keys, with room for headroom times as
+    many.
+
+    If old is given, the new filter replaces it, and carries on its
+    counts.
+    """
+    bloom = BloomFilter(len(keys) * headroom)
+    for key in keys:
+        bloom.add(key)
+    if old is not None:
+        bloom.checks = old.checks
+        bloom.rejections = old.rejections
+        bloom.false_positives = old.false_positives
+    return bloom
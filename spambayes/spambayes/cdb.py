@@ -136,14 +136,42 @@ class Cdb(object):
                         return self.read(dlen, dpos)
         raise KeyError
 
+    def find(self, key):
+        """Return the (first) value stored for key.
+
+        This does what findstart() and findnext() do, but keeps the state
+        of the search in local variables rather than in the Cdb, so that
+        several threads can look keys up at once."""
+        map = self.map
+        u = cdb_hash(key)
+        pos = u << 3 & 2047
+        hpos, hslots = struct.unpack("<LL", map[pos:pos+8])
+        if not hslots:
+            raise KeyError(key)
+        end = hpos + (hslots << 3)
+        kpos = hpos + ((u >> 8) % hslots << 3)
+        klen = len(key)
+        for _i in xrange(hslots):
+            h, pos = struct.unpack("<LL", map[kpos:kpos+8])
+            if not pos:
+                break
+            kpos += 8
+            if kpos == end:
+                kpos = hpos
+            if h == u:
+                rlen, dlen = struct.unpack("<LL", map[pos:pos+8])
+                pos += 8
+                if rlen == klen and map[pos:pos+klen] == key:
+                    pos += klen
+                    return map[pos:pos+dlen]
+        raise KeyError(key)
+
     def __getitem__(self, key):
-        self.findstart()
-        return self.findnext(key)
+        return self.find(key)
 
     def get(self, key, default=None):
-        self.findstart()
         try:
-            return self.findnext(key)
+            return self.find(key)
         except KeyError:
             return default
 
@@ -0,0 +1,58 @@
+"""Chi-squared combining for many messages at once, using NumPy.
+
+Scoring a single message only combines max_discriminators probabilities,
+which the plain Python loop in classifier.Classifier.chi2_spamprob() does
+quickly enough.  The bulk scoring paths (hammiebulk, the test drivers)
+combine thousands of messages, though, and here it pays to put all their
+clue probabilities in one matrix and do the lot in a few array operations.
+
+NumPy is optional.  If it can't be imported, numpy is None here, and the
+classifier carries on combining one message at a time.  The scores agree
+with the one-at-a-time ones to within 1e-12 (the only difference being
+that the logs are summed rather than taken of a product).
+"""
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+def chi2Q(x2, v):
+    """Return prob(chisq >= x2, with v degrees of freedom), elementwise.
+
+    x2 and v are arrays of the same shape; every element of v must be
+    even.  This is chi2.chi2Q(), evaluated over the arrays.
+    """
+    m = numpy.asarray(x2, numpy.float64) / 2.0
+    halfv = numpy.asarray(v) // 2
+    term = numpy.exp(-m)
+    sum = term.copy()
+    if halfv.size:
+        for i in xrange(1, int(halfv.max())):
+            term *= m / i
+            sum += numpy.where(halfv > i, term, 0.0)
+    # See chi2.chi2Q() for why this is needed.
+    return numpy.minimum(sum, 1.0)
+
+def combine(probs, counts):
+    """Combine clue probabilities into chi-squared spam scores.
+
+    probs is a flat sequence of the clue probabilities of all the messages,
+    one message after another, and counts gives the number of clues each
+    message has.  Returns a list of (score, S, H) triples, one for each
+    message, with S and H as reported in the evidence by
+    classifier.Classifier.chi2_spamprob().
+    """
+    probs = numpy.asarray(probs, numpy.float64)
+    counts = numpy.asarray(counts, numpy.int_)
+    nmsgs = len(counts)
+    # Sum the logs for each message.
+    msgnums = numpy.repeat(numpy.arange(nmsgs), counts)
+    S = numpy.bincount(msgnums, numpy.log(1.0 - probs), nmsgs)
+    H = numpy.bincount(msgnums, numpy.log(probs), nmsgs)
+
+    scored = counts > 0
+    S = numpy.where(scored, 1.0 - chi2Q(-2.0 * S, 2 * counts), S)
+    H = numpy.where(scored, 1.0 - chi2Q(-2.0 * H, 2 * counts), H)
+    scores = numpy.where(scored, (S - H + 1.0) / 2.0, 0.5)
+    return zip(scores.tolist(), S.tolist(), H.tolist())
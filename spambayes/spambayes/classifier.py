@@ -38,6 +38,14 @@ from __future__ import generators
 # This implementation is due to Tim Peters et alia.
 
 import math
+import time
+from array import array
+from UserDict import DictMixin
+from heapq import heapify, heapreplace
+try:
+    import threading
+except ImportError:
+    import dummy_threading as threading
 
 # XXX At time of writing, these are only necessary for the
 # XXX experimental url retrieving/slurping code.  If that
@@ -56,11 +64,16 @@ URL_KEY_RE = re.compile(r"[\W]")
 # XXX ---- ends ----
 
 from spambayes.Options import options
-from spambayes.chi2 import chi2Q
+from spambayes.chi2 import chi2Q, chi2Q_bounds
 from spambayes.safepickle import pickle_read, pickle_write
+from spambayes.port import md5
 
 LN2 = math.log(2)       # used frequently by chi-combining
 
+# Early-exit scoring doesn't check whether a message's classification is
+# certain when fewer than this many of its clues are left to combine.
+_EARLY_EXIT_MIN_SKIP = 8
+
 slurp_wordstream = None
 
 PICKLE_VERSION = 5
@@ -90,6 +103,436 @@ class WordInfo(object):
         self.spamcount, self.hamcount = t
 
 
+class TimedWordInfo(WordInfo):
+    # A WordInfo that also records the day on which the word was last
+    # trained on or found among the clues of a scored message, for
+    # Classifier.prune().  Days are counted from the epoch (see today());
+    # a lastseen of 0 means the day isn't known, because the record dates
+    # from before [Classifier] x-track_last_seen was turned on.
+    __slots__ = 'lastseen',
+
+    def __init__(self):
+        self.__setstate__((0, 0, 0))
+
+    def __repr__(self):
+        return "TimedWordInfo" + repr(self.__getstate__())
+
+    def __getstate__(self):
+        return self.spamcount, self.hamcount, self.lastseen
+
+    def __setstate__(self, t):
+        if len(t) == 2:
+            self.spamcount, self.hamcount = t
+            self.lastseen = 0
+        else:
+            self.spamcount, self.hamcount, self.lastseen = t
+
+def today():
+    """Return today's date as a day number, for TimedWordInfo.lastseen."""
+    return int(time.time() // 86400)
+
+def _seen_on(record, day):
+    """Return record, as a TimedWordInfo, with lastseen set to day."""
+    if not isinstance(record, TimedWordInfo):
+        timed = TimedWordInfo()
+        timed.spamcount = record.spamcount
+        timed.hamcount = record.hamcount
+        record = timed
+    record.lastseen = day
+    return record
+
+
+class CompactWordInfo(DictMixin):
+    # A compact stand-in for the wordinfo dict mapping word to WordInfo
+    # record, for big in-memory databases.
+    #
+    # A dict of WordInfo objects costs over 100 bytes a word, most of it in
+    # the WordInfo objects and the dict's per-entry overhead.  Here each
+    # word is instead given an integer id:  its slot in an open-addressed
+    # (linear probing) hash table whose slots are a list of words and two
+    # parallel arrays of C longs holding the spam and ham counts.  That's
+    # 24 bytes a slot, and the table is kept between 1/4 and 2/3 full.
+    #
+    # An empty slot has word None and counts 0; the slot of a deleted word
+    # has word None and spamcount -1, so that probing carries on past it.
+    #
+    # Looking a word up builds a new WordInfo from the arrays, so changing
+    # a record has no effect until it is stored back (which is how the
+    # _wordinfoset() hook is always used anyway).
+
+    # Hash of this string when the table was pickled; if it differs when
+    # unpickling (Python's -R option), the table has to be rebuilt.
+    HASH_CHECK = "spambayes"
+
+    def __init__(self, items=()):
+        self._clear(8)
+        for word, record in items:
+            self[word] = record
+
+    def _clear(self, size):
+        self.words = [None] * size
+        self.spamcounts = array('l', [0]) * size
+        self.hamcounts = array('l', [0]) * size
+        self.used = 0       # slots holding a word
+        self.filled = 0     # slots holding a word, or once holding one
+
+    def __getstate__(self):
+        return (hash(self.HASH_CHECK), self.words, self.spamcounts,
+                self.hamcounts, self.used, self.filled)
+
+    def __setstate__(self, t):
+        (check, self.words, self.spamcounts, self.hamcounts, self.used,
+         self.filled) = t
+        if check != hash(self.HASH_CHECK):
+            self._resize()
+
+    def _slot(self, word):
+        """Return the slot holding word, or if it isn't in the table,
+        ~slot for the slot it should be put in."""
+        words = self.words
+        mask = len(words) - 1
+        i = hash(word) & mask
+        w = words[i]
+        if w == word:
+            # The usual case, when word is there.
+            return i
+        spamcounts = self.spamcounts
+        free = None
+        while True:
+            if w is None:
+                if spamcounts[i] != -1:
+                    if free is None:
+                        free = i
+                    return ~free
+                if free is None:
+                    free = i
+            elif w == word:
+                return i
+            i = (i + 1) & mask
+            w = words[i]
+
+    def _resize(self):
+        """Rebuild the table, leaving it between 1/4 and 1/2 full."""
+        items = [(w, self.spamcounts[i], self.hamcounts[i])
+                 for i, w in enumerate(self.words) if w is not None]
+        size = 8
+        while size <= 2 * len(items):
+            size <<= 1
+        self._clear(size)
+        words = self.words
+        spamcounts = self.spamcounts
+        hamcounts = self.hamcounts
+        mask = size - 1
+        for word, spamcount, hamcount in items:
+            i = hash(word) & mask
+            while words[i] is not None:
+                i = (i + 1) & mask
+            words[i] = word
+            spamcounts[i] = spamcount
+            hamcounts[i] = hamcount
+        self.used = self.filled = len(items)
+
+    def __getitem__(self, word):
+        i = self._slot(word)
+        if i < 0:
+            raise KeyError(word)
+        record = WordInfo()
+        record.spamcount = self.spamcounts[i]
+        record.hamcount = self.hamcounts[i]
+        return record
+
+    def get(self, word, default=None):
+        i = self._slot(word)
+        if i < 0:
+            return default
+        record = WordInfo()
+        record.spamcount = self.spamcounts[i]
+        record.hamcount = self.hamcounts[i]
+        return record
+
+    def __setitem__(self, word, record):
+        i = self._slot(word)
+        if i < 0:
+            i = ~i
+            if self.spamcounts[i] != -1:
+                self.filled += 1
+            self.words[i] = word
+            self.used += 1
+        self.spamcounts[i] = record.spamcount
+        self.hamcounts[i] = record.hamcount
+        if 3 * self.filled >= 2 * len(self.words):
+            self._resize()
+
+    def __delitem__(self, word):
+        i = self._slot(word)
+        if i < 0:
+            raise KeyError(word)
+        self.words[i] = None
+        self.spamcounts[i] = -1
+        self.hamcounts[i] = 0
+        self.used -= 1
+        if 4 * self.used < len(self.words) and len(self.words) > 8:
+            self._resize()
+
+    def __contains__(self, word):
+        return self._slot(word) >= 0
+
+    has_key = __contains__
+
+    def __len__(self):
+        return self.used
+
+    def __iter__(self):
+        for word in self.words:
+            if word is not None:
+                yield word
+
+    iterkeys = __iter__
+
+    def keys(self):
+        return [word for word in self.words if word is not None]
+
+    def iteritems(self):
+        spamcounts = self.spamcounts
+        hamcounts = self.hamcounts
+        for i, word in enumerate(self.words):
+            if word is not None:
+                record = WordInfo()
+                record.spamcount = spamcounts[i]
+                record.hamcount = hamcounts[i]
+                yield word, record
+
+
+def _strongest(candidates, n):
+    """Return the n largest items of list candidates, in increasing order.
+
+    candidates may be reordered.  When there are many more candidates than
+    are wanted, a bounded heap is much cheaper than sorting them all.
+    """
+    if len(candidates) <= 8 * n:
+        candidates.sort()
+        return candidates[-n:]
+    heap = candidates[:n]
+    heapify(heap)
+    for i in xrange(n, len(candidates)):
+        item = candidates[i]
+        if item > heap[0]:
+            heapreplace(heap, item)
+    heap.sort()
+    return heap
+
+
+class ProbabilityCache(object):
+    # Memo for Classifier.probability().  A word's probability depends only
+    # on its (spamcount, hamcount) pair, the classifier's nspam and nham,
+    # and the unknown_word_* options, so the memo is keyed on the pair and
+    # is only valid while nspam and nham keep the values it was reset for
+    # (probability() checks).  The options are read once, at reset time.
+    #
+    # Nearly all tokens have small counts, so their probabilities live in a
+    # flat array of doubles indexed by spamcount*size + hamcount, where an
+    # unfilled slot holds -1.0.  Pairs with a count of size or more go in
+    # a dict instead.
+    #
+    # The cache is changed in place rather than replaced, so that using it
+    # never marks a persistent (ZODB) classifier as modified.
+    #
+    # Several threads may score at once (see threadsafe.py), but training
+    # can't happen at the same time, so all the probabilities they store
+    # are right; at worst one thread's reset() throws away another's
+    # entries.  reset() sets nspam and nham last, so that no thread uses
+    # the cache before it's ready.  The hit and miss counts may miss the
+    # odd lookup.
+    __slots__ = ('size', 'small', 'large', 'nspam', 'nham', 'S', 'StimesX',
+                 'hits', 'misses')
+
+    def __init__(self, size=64):
+        self.size = size
+        self.hits = self.misses = 0
+        self.nspam = self.nham = None
+        self.clear()
+
+    def __repr__(self):
+        return "ProbabilityCache(hits=%d, misses=%d)" % (self.hits,
+                                                        self.misses)
+
+    def clear(self):
+        self.small = array('d', [-1.0]) * (self.size * self.size)
+        self.large = {}
+
+    def reset(self, nspam, nham):
+        """Empty the cache, and make it valid for nspam and nham."""
+        self.clear()
+        self.S = options["Classifier", "unknown_word_strength"]
+        self.StimesX = self.S * options["Classifier", "unknown_word_prob"]
+        self.nspam = nspam
+        self.nham = nham
+
+    def hit_rate(self):
+        """Return the fraction of lookups that were answered from the
+        cache."""
+        lookups = self.hits + self.misses
+        if lookups:
+            return float(self.hits) / lookups
+        return 0.0
+
+
+class ScoringStats(object):
+    # Counts of the clues that early-exit scoring (the [Classifier]
+    # x-early_exit_scoring option) didn't need to combine.  Like the
+    # ProbabilityCache, this is changed in place.
+    __slots__ = ('messages', 'clues', 'skipped')
+
+    def __init__(self):
+        self.messages = self.clues = self.skipped = 0
+
+    def __repr__(self):
+        return "ScoringStats(messages=%d, clues=%d, skipped=%d)" % \
+               (self.messages, self.clues, self.skipped)
+
+    def mean_skipped(self):
+        """Return the mean number of clues skipped per message."""
+        if self.messages:
+            return float(self.skipped) / self.messages
+        return 0.0
+
+
+class LRUList(object):
+    # A dict of keys to values that keeps track of the order in which they
+    # were last used, for caches that throw away the least recently used.
+    # The entries are kept in a circular doubly linked list, most recently
+    # used first, each a [prev, next, key, value] list.  This isn't thread
+    # safe; the caches that use it hold their own locks.
+    def __init__(self):
+        self.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def __getitem__(self, key):
+        """Return the value for key, without counting it as used."""
+        return self._entries[key][3]
+
+    def clear(self):
+        root = []
+        root[:] = [root, root, None, None]
+        self._root = root
+        self._entries = {}
+
+    def get(self, key):
+        """Return the value for key, or None if there isn't one, and count
+        it as the most recently used."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        # Move the entry to the front of the list.
+        prev, next = entry[0], entry[1]
+        prev[1] = next
+        next[0] = prev
+        root = self._root
+        first = root[1]
+        entry[0] = root
+        entry[1] = first
+        first[0] = root[1] = entry
+        return entry[3]
+
+    def put(self, key, value):
+        """Store value for key, as the most recently used."""
+        self.remove(key)
+        root = self._root
+        first = root[1]
+        entry = [root, first, key, value]
+        first[0] = root[1] = self._entries[key] = entry
+
+    def remove(self, key):
+        """Take key out, returning whether it was there."""
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return False
+        entry[0][1] = entry[1]
+        entry[1][0] = entry[0]
+        return True
+
+    def pop_oldest(self):
+        """Take out the least recently used key, and return it."""
+        key = self._root[0][2]
+        self.remove(key)
+        return key
+
+
+class ScoreCache(object):
+    # The results of scoring recently scored messages, keyed by a digest of
+    # the message text, so that scoring exactly the same text again (a POP3
+    # client fetching a message it has fetched before, or an IMAP folder
+    # being filtered again) costs only the digest.  Text that differs at
+    # all, such as a TOP response and the RETR response for the same
+    # message, is scored afresh.
+    # The results are only good for one generation of the classifier (see
+    # Classifier.generation), so they are all thrown away when it changes.
+    #
+    # When the cache is full the least recently used result is thrown away.
+    # Several threads may score at once (see threadsafe.py), so a lock
+    # guards the LRUList of results.
+    def __init__(self, size=100):
+        self.size = size
+        self.hits = self.misses = 0
+        self.generation = None
+        self._lock = threading.Lock()
+        self._results = LRUList()
+
+    def __repr__(self):
+        return "ScoreCache(hits=%d, misses=%d)" % (self.hits, self.misses)
+
+    def __len__(self):
+        return len(self._results)
+
+    def clear(self):
+        self._results.clear()
+
+    def get(self, key, generation):
+        """Return the value stored for key, or None if there isn't one.
+
+        Everything stored for any other generation is thrown away first.
+        """
+        self._lock.acquire()
+        try:
+            if generation != self.generation:
+                self.clear()
+                self.generation = generation
+            value = self._results.get(key)
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return value
+        finally:
+            self._lock.release()
+
+    def put(self, key, generation, value):
+        """Store value for key, if generation is the current one."""
+        self._lock.acquire()
+        try:
+            if generation != self.generation:
+                return
+            results = self._results
+            results.put(key, value)
+            while len(results) > self.size:
+                results.pop_oldest()
+        finally:
+            self._lock.release()
+
+    def hit_rate(self):
+        """Return the fraction of lookups that were answered from the
+        cache."""
+        lookups = self.hits + self.misses
+        if lookups:
+            return float(self.hits) / lookups
+        return 0.0
+
+
 class Classifier:
     # Defining __slots__ here made Jeremy's life needlessly difficult when
     # trying to hook this all up to ZODB as a persistent object.  There's
@@ -105,9 +548,31 @@ class Classifier:
     # allow a subclass to use a different class for WordInfo
     WordInfoClass = WordInfo
 
+    # Whether several threads may score with this classifier at once (see
+    # threadsafe.py).  They can with the words in a dict in memory;
+    # subclasses whose storage can't take it turn this off.
+    concurrent_reads = True
+
+    # Whether scoring a message should fetch the records of all its tokens
+    # at once, with _wordinfoget_many(), rather than one at a time.  That's
+    # quicker where each lookup costs a query.
+    batch_lookups = False
+
+    # Whether store() writes only what has changed since it was last
+    # called, so that a subclass that stores its records somewhere can be
+    # stored every so often while a whole database is copied into it (see
+    # storage.copy_records()), rather than keep all the changes in memory.
+    incremental_store = False
+
     def __init__(self):
-        self.wordinfo = {}
-        self.probcache = {}
+        self.wordinfo = self._new_wordinfo()
+        self.probcache = ProbabilityCache()
+        self.scoringstats = ScoringStats()
+        self.scorecache = ScoreCache()
+        # Goes up by one whenever training changes what the classifier
+        # knows; scores remembered by the scorecache are only good while it
+        # stays the same.
+        self.generation = 0
         self.nspam = self.nham = 0
 
     def __getstate__(self):
@@ -117,7 +582,19 @@ class Classifier:
         if t[0] != PICKLE_VERSION:
             raise ValueError("Can't unpickle -- version %s unknown" % t[0])
         (self.wordinfo, self.nspam, self.nham) = t[1:]
-        self.probcache = {}
+        if options["Classifier", "x-use_compact_wordinfo"] and \
+           isinstance(self.wordinfo, dict):
+            self.wordinfo = CompactWordInfo(self.wordinfo.iteritems())
+        self.probcache = ProbabilityCache()
+        self.scoringstats = ScoringStats()
+        self.scorecache = ScoreCache()
+        self.generation = 0
+
+    def _new_wordinfo(self):
+        """Return a new, empty, wordinfo mapping."""
+        if options["Classifier", "x-use_compact_wordinfo"]:
+            return CompactWordInfo()
+        return {}
 
     # spamprob() implementations.  One of the following is aliased to
     # spamprob, depending on option settings.
@@ -149,6 +626,20 @@ class Classifier:
         where evidence is a list of (word, probability) pairs.
         """
 
+        clues = self._getclues(wordstream)
+        if options["Classifier", "x-track_last_seen"]:
+            self._note_seen(clues)
+        if not evidence and options["Classifier", "x-early_exit_scoring"]:
+            return self._chi2_combine_early(clues)
+        return self._chi2_combine(clues, evidence)
+
+    def _chi2_combine(self, clues, evidence=False):
+        """Combine clues into a best-guess probability that they're spam.
+
+        clues is a list of (prob, word, record) triples, as returned by
+        _getclues().  The return value is as for chi2_spamprob().
+        """
+
         from math import frexp, log as ln
 
         # We compute two chi-squared statistics, one for ham and one for
@@ -166,7 +657,6 @@ class Classifier:
         H = S = 1.0
         Hexp = Sexp = 0
 
-        clues = self._getclues(wordstream)
         for prob, word, record in clues:
             S *= 1.0 - prob
             H *= prob
@@ -199,14 +689,122 @@ class Classifier:
             prob = 0.5
 
         if evidence:
-            clues = [(w, p) for p, w, _r in clues]
-            clues.sort(lambda a, b: cmp(a[1], b[1]))
-            clues.insert(0, ('*S*', S))
-            clues.insert(0, ('*H*', H))
-            return prob, clues
+            return prob, self._chi2_evidence(clues, S, H)
         else:
             return prob
 
+    def _chi2_combine_early(self, clues):
+        """Like _chi2_combine(), but stop once the classification is
+        certain.
+
+        The clues are combined strongest first.  Every clue not yet
+        combined is at most as far from 0.5 as the last one that was, and
+        the score only goes up as any clue's probability does, so the
+        score must lie between the scores given by setting all the rest
+        to 0.5 - d and to 0.5 + d, where d is that distance.  Now and then
+        bounds on those are worked out (cheaply, with chi2Q_bounds()), and
+        if they show that the score must be ham, unsure or spam, the rest
+        of the clues are skipped and a score in the bounds is returned.
+        Counts of the clues skipped are kept in self.scoringstats.
+        """
+
+        from math import frexp, log as ln
+
+        n = len(clues)
+        stats = self.scoringstats
+        stats.messages += 1
+        stats.clues += n
+        if n == 0:
+            return 0.5
+        v = 2 * n
+
+        H = S = 1.0
+        Hexp = Sexp = 0
+        # _getclues() leaves the strongest clues at the end, so combine
+        # them from there, and check each time the number left halves.
+        # The checks rarely succeed with more than a quarter left.
+        lo = n // 4
+        hi = n
+        h_cut = None
+        while True:
+            for prob, word, record in clues[lo:hi]:
+                S *= 1.0 - prob
+                H *= prob
+                if S < 1e-200:  # prevent underflow
+                    S, e = frexp(S)
+                    Sexp += e
+                if H < 1e-200:  # prevent underflow
+                    H, e = frexp(H)
+                    Hexp += e
+            if lo < _EARLY_EXIT_MIN_SKIP:
+                if lo:
+                    # Too few left for checking to pay.
+                    hi = lo
+                    lo = 0
+                    continue
+                break
+            # The lo clues left are at most d from 0.5.
+            d = abs(clues[lo][0] - 0.5)
+            lnS = ln(S) + Sexp * LN2
+            lnH = ln(H) + Hexp * LN2
+            near = lo * ln(0.5 + d)
+            far = lo * ln(0.5 - d)
+            # The lowest score has all the rest at 0.5 - d, so the
+            # smallest S and the biggest H, and the highest score the
+            # reverse.
+            if h_cut is None:
+                h_cut = options["Categorization", "ham_cutoff"]
+                s_cut = options["Categorization", "spam_cutoff"]
+            bottom = (chi2Q_bounds(-2.0 * (lnH + far), v)[0] -
+                      chi2Q_bounds(-2.0 * (lnS + near), v)[1] + 1.0) / 2.0
+            top = (chi2Q_bounds(-2.0 * (lnH + near), v)[1] -
+                   chi2Q_bounds(-2.0 * (lnS + far), v)[0] + 1.0) / 2.0
+            # The cutoffs themselves are treated differently in different
+            # places, so the range must avoid them.
+            if bottom > s_cut or top < h_cut or \
+               (bottom > h_cut and top < s_cut):
+                stats.skipped += lo
+                return (top + bottom) / 2.0
+            hi = lo
+            lo //= 2
+
+        S = ln(S) + Sexp * LN2
+        H = ln(H) + Hexp * LN2
+        S = 1.0 - chi2Q(-2.0 * S, v)
+        H = 1.0 - chi2Q(-2.0 * H, v)
+        return (S-H + 1.0) / 2.0
+
+    def _chi2_combine_many(self, clueslist, evidence=False):
+        """Like _chi2_combine(), but for a list of clue lists.
+
+        If NumPy is available, all the lists are combined at once (see
+        chi2array.py); otherwise, or if early-exit scoring is wanted,
+        they're done one at a time.
+        """
+        from spambayes import chi2array
+
+        if not evidence and options["Classifier", "x-early_exit_scoring"]:
+            return [self._chi2_combine_early(clues) for clues in clueslist]
+        if chi2array.numpy is None or not clueslist:
+            return [self._chi2_combine(clues, evidence)
+                    for clues in clueslist]
+        results = chi2array.combine([prob for clues in clueslist
+                                           for prob, _w, _r in clues],
+                                    [len(clues) for clues in clueslist])
+        if evidence:
+            return [(prob, self._chi2_evidence(clues, S, H))
+                    for clues, (prob, S, H) in zip(clueslist, results)]
+        else:
+            return [prob for prob, _S, _H in results]
+
+    def _chi2_evidence(self, clues, S, H):
+        """Return the evidence list that chi2_spamprob() reports."""
+        clues = [(w, p) for p, w, _r in clues]
+        clues.sort(lambda a, b: cmp(a[1], b[1]))
+        clues.insert(0, ('*S*', S))
+        clues.insert(0, ('*H*', H))
+        return clues
+
     def slurping_spamprob(self, wordstream, evidence=False):
         """Do the standard chi-squared spamprob, but if the evidence
         leaves the score in the unsure range, and we have fewer tokens
@@ -238,6 +836,78 @@ class Classifier:
         else:
             spamprob = chi2_spamprob
 
+    def spamprob_many(self, wordstreams, evidence=False):
+        """Return a list of best-guess probabilities, one per wordstream.
+
+        wordstreams is an iterable of word streams, as would be passed to
+        spamprob().  The results are the same as calling spamprob() on
+        each in turn, but every distinct token in the batch is looked up
+        in the database (and has its probability computed) only once,
+        which saves a great many backend lookups when scoring a mailbox
+        full of similar messages.  If NumPy is available, the chi-squared
+        combining is also done for the whole batch at once (the scores
+        then agree with spamprob()'s to within 1e-12).
+
+        If optional arg evidence is True, each item of the returned list
+        is a (probability, evidence) pair, as for spamprob().
+        """
+        if options["URLRetriever", "x-slurp_urls"]:
+            # Slurping adds different tokens to each message, so there
+            # is nothing to share; just score them one at a time.
+            return [self.spamprob(wordstream, evidence)
+                    for wordstream in wordstreams]
+
+        # The streams have to be walked twice, so hang on to them.
+        wordstreams = [list(wordstream) for wordstream in wordstreams]
+
+        # Find every distinct token (including bigrams, if they are in
+        # use) in the whole batch, and fetch all their records at once.
+        words = set()
+        for wordstream in wordstreams:
+            if options["Classifier", "use_bigrams"]:
+                wordstream = self._enhance_wordstream(wordstream)
+            words.update(wordstream)
+        distances = self._worddistances_many(words)
+
+        clueslist = [self._getclues(wordstream, distances.__getitem__)
+                     for wordstream in wordstreams]
+        if options["Classifier", "x-track_last_seen"]:
+            for clues in clueslist:
+                self._note_seen(clues)
+        return self._chi2_combine_many(clueslist, evidence)
+
+    def spamprob_cached(self, text, tokenize, evidence=False):
+        """Return spamprob(tokenize(), evidence), remembering the result.
+
+        text is the text of the message, and tokenize a function of no
+        arguments that returns its word stream.  If the same text has been
+        scored since the classifier was last trained, the result is taken
+        from the scorecache and tokenize isn't called at all.  How many
+        results are remembered is set by the [Storage] score_cache_size
+        option; 0 turns the cache off.
+        """
+        # A result taken from the cache doesn't mark its clues as seen
+        # (for [Classifier] x-track_last_seen), but they were marked when
+        # the text was first scored, which is close enough.
+        cache = self.scorecache
+        cache.size = options["Storage", "score_cache_size"]
+        if cache.size <= 0:
+            return self.spamprob(tokenize(), evidence)
+        if isinstance(text, unicode):
+            text = text.encode("utf-8")
+        evidence = bool(evidence)
+        key = (md5(text).digest(), evidence)
+        generation = self.generation
+        result = cache.get(key, generation)
+        if result is None:
+            result = self.spamprob(tokenize(), evidence)
+            cache.put(key, generation, result)
+        if evidence:
+            # Don't let the caller change the cached clues.
+            prob, clues = result
+            return prob, list(clues)
+        return result
+
     def learn(self, wordstream, is_spam):
         """Teach the classifier by example.
 
@@ -262,6 +932,109 @@ class Classifier:
             wordstream = self._add_slurped(wordstream)
         self._remove_msg(wordstream, is_spam)
 
+    def learn_many(self, examples):
+        """Teach the classifier by many examples.
+
+        examples is an iterable of (wordstream, is_spam) pairs, each as
+        would be passed to learn().  The result is the same as calling
+        learn() for each, but the changes to the token counts are collected
+        in memory, and the database is only touched once for each distinct
+        token (or once each time the [Storage] training_buffer_size limit
+        is reached).
+        """
+        self._train_many(examples, True)
+
+    def unlearn_many(self, examples):
+        """Undo learn_many().
+
+        Pass the same examples you passed to learn_many() (or learn()).
+        """
+        self._train_many(examples, False)
+
+    # Rough number of bytes each token costs in the training buffer (the
+    # dict entry and the count) over and above the length of the token.
+    _TRAINING_BYTES_PER_TOKEN = 100
+
+    def _train_many(self, examples, learning):
+        limit = options["Storage", "training_buffer_size"] * 1024 * 1024
+        use_bigrams = options["Classifier", "use_bigrams"]
+        slurp = options["URLRetriever", "x-slurp_urls"]
+        overhead = self._TRAINING_BYTES_PER_TOKEN
+        spamdeltas = {}
+        hamdeltas = {}
+        size = 0
+        try:
+            for wordstream, is_spam in examples:
+                if use_bigrams:
+                    wordstream = self._enhance_wordstream(wordstream)
+                if slurp:
+                    wordstream = self._add_slurped(wordstream)
+                words = set(wordstream)
+                if is_spam:
+                    deltas = spamdeltas
+                else:
+                    deltas = hamdeltas
+                if learning:
+                    if is_spam:
+                        self.nspam += 1
+                    else:
+                        self.nham += 1
+                elif is_spam:
+                    if self.nspam <= 0:
+                        raise ValueError("spam count would go negative!")
+                    self.nspam -= 1
+                else:
+                    if self.nham <= 0:
+                        raise ValueError("non-spam count would go negative!")
+                    self.nham -= 1
+                for word in words:
+                    if word in deltas:
+                        deltas[word] += 1
+                    else:
+                        deltas[word] = 1
+                        size += len(word) + overhead
+                if size >= limit:
+                    self._apply_deltas(spamdeltas, hamdeltas, learning)
+                    spamdeltas.clear()
+                    hamdeltas.clear()
+                    size = 0
+        finally:
+            # Whatever happens, the message counts have been changed, so
+            # the token counts must be brought into line with them.
+            self._apply_deltas(spamdeltas, hamdeltas, learning)
+            self.generation += 1
+
+    def _apply_deltas(self, spamdeltas, hamdeltas, learning):
+        """Add (or, if learning is false, subtract) the collected changes
+        to the token counts in one pass over the database."""
+        words = spamdeltas.keys()
+        words.extend([word for word in hamdeltas if word not in spamdeltas])
+        if learning and options["Classifier", "x-track_last_seen"]:
+            day = today()
+        else:
+            day = None
+        wordinfoget = self._training_wordinfoget(words)
+        for word in words:
+            spamdelta = spamdeltas.get(word, 0)
+            hamdelta = hamdeltas.get(word, 0)
+            record = wordinfoget(word)
+            if learning:
+                if record is None:
+                    record = self.WordInfoClass()
+                record.spamcount += spamdelta
+                record.hamcount += hamdelta
+                if day is not None:
+                    record = _seen_on(record, day)
+                self._wordinfoset(word, record)
+            elif record is not None:
+                record.spamcount = max(0, record.spamcount - spamdelta)
+                record.hamcount = max(0, record.hamcount - hamdelta)
+                if record.hamcount == 0 == record.spamcount:
+                    self._wordinfodel(word)
+                else:
+                    self._wordinfoset(word, record)
+        self._post_training()
+
     def probability(self, record):
         """Compute, store, and return prob(msg is spam | msg contains word).
 
@@ -275,11 +1048,27 @@ class Classifier:
         spamcount = record.spamcount
         hamcount = record.hamcount
 
-        # Try the cache first
-        try:
-            return self.probcache[spamcount][hamcount]
-        except KeyError:
-            pass
+        # Try the cache first, after making sure that it's still valid.
+        cache = self.probcache
+        if cache.nspam != self.nspam or cache.nham != self.nham:
+            cache.reset(self.nspam, self.nham)
+        size = cache.size
+        if spamcount < size and hamcount < size:
+            index = spamcount * size + hamcount
+            prob = cache.small[index]
+            if prob >= 0.0:
+                cache.hits += 1
+                return prob
+        else:
+            index = None
+            try:
+                prob = cache.large[spamcount, hamcount]
+            except KeyError:
+                pass
+            else:
+                cache.hits += 1
+                return prob
+        cache.misses += 1
 
         nham = float(self.nham or 1)
         nspam = float(self.nspam or 1)
@@ -292,8 +1081,8 @@ class Classifier:
 
         prob = spamratio / (hamratio + spamratio)
 
-        S = options["Classifier", "unknown_word_strength"]
-        StimesX = S * options["Classifier", "unknown_word_prob"]
+        S = cache.S
+        StimesX = cache.StimesX
 
 
         # Now do Robinson's Bayesian adjustment.
@@ -316,10 +1105,10 @@ class Classifier:
         prob = (StimesX + n * prob) / (S + n)
 
         # Update the cache
-        try:
-            self.probcache[spamcount][hamcount] = prob
-        except KeyError:
-            self.probcache[spamcount] = {hamcount: prob}
+        if index is None:
+            cache.large[spamcount, hamcount] = prob
+        else:
+            cache.small[index] = prob
 
         return prob
 
@@ -344,14 +1133,19 @@ class Classifier:
     # appears in a msg, but distorting spamprob doesn't appear a correct way
     # to exploit it.
     def _add_msg(self, wordstream, is_spam):
-        self.probcache = {}    # nuke the prob cache
         if is_spam:
             self.nspam += 1
         else:
             self.nham += 1
 
-        for word in set(wordstream):
-            record = self._wordinfoget(word)
+        if options["Classifier", "x-track_last_seen"]:
+            day = today()
+        else:
+            day = None
+        words = set(wordstream)
+        wordinfoget = self._training_wordinfoget(words)
+        for word in words:
+            record = wordinfoget(word)
             if record is None:
                 record = self.WordInfoClass()
 
@@ -360,12 +1154,14 @@ class Classifier:
             else:
                 record.hamcount += 1
 
+            if day is not None:
+                record = _seen_on(record, day)
             self._wordinfoset(word, record)
 
+        self.generation += 1
         self._post_training()
 
     def _remove_msg(self, wordstream, is_spam):
-        self.probcache = {}    # nuke the prob cache
         if is_spam:
             if self.nspam <= 0:
                 raise ValueError("spam count would go negative!")
@@ -375,8 +1171,10 @@ class Classifier:
                 raise ValueError("non-spam count would go negative!")
             self.nham -= 1
 
-        for word in set(wordstream):
-            record = self._wordinfoget(word)
+        words = set(wordstream)
+        wordinfoget = self._training_wordinfoget(words)
+        for word in words:
+            record = wordinfoget(word)
             if record is not None:
                 if is_spam:
                     if record.spamcount > 0:
@@ -389,14 +1187,67 @@ class Classifier:
                 else:
                     self._wordinfoset(word, record)
 
+        self.generation += 1
         self._post_training()
 
+    def _training_wordinfoget(self, words):
+        """Return the function training should use to look up the records
+        of words:  _wordinfoget(), or, if batch_lookups is set, the get()
+        of a dict of all their records, fetched at once."""
+        if self.batch_lookups:
+            return self._wordinfoget_many(words).get
+        return self._wordinfoget
+
     def _post_training(self):
         """This is called after training on a wordstream.  Subclasses might
         want to ensure that their databases are in a consistent state at
         this point.  Introduced to fix bug #797890."""
         pass
 
+    def _note_seen(self, clues):
+        """Record that the clues of a scored message were seen today.
+
+        clues is a list of (prob, word, record) triples, as returned by
+        _getclues().  Each record is written back at most once a day.
+        """
+        day = today()
+        for prob, word, record in clues:
+            if record is not None and \
+               getattr(record, "lastseen", None) != day:
+                self._wordinfoset(word, _seen_on(record, day))
+
+    def prune(self, days, threshold=2, include_unknown=False):
+        """Remove the tokens that are both rare and long unseen.
+
+        A token is removed if it appears in fewer than threshold trained
+        messages, and hasn't been trained on or been a clue in a scored
+        message for at least days days.  Tokens whose last-seen day isn't
+        known are kept, unless include_unknown is true.  Nothing else (in
+        particular, not nspam or nham) is changed.  The last-seen days are
+        only kept when [Classifier] x-track_last_seen is on.
+
+        Returns the number of tokens removed.
+        """
+        cutoff = today() - days
+        removed = 0
+        for word in self._wordinfokeys():
+            record = self._wordinfoget(word)
+            if record is not None and \
+               self._prunable(record, cutoff, threshold, include_unknown):
+                self._wordinfodel(word)
+                removed += 1
+        if removed:
+            self.generation += 1
+        return removed
+
+    def _prunable(self, record, cutoff, threshold, include_unknown):
+        if record.spamcount + record.hamcount >= threshold:
+            return False
+        lastseen = getattr(record, "lastseen", 0)
+        if lastseen == 0:
+            return include_unknown
+        return lastseen <= cutoff
+
     # Return list of (prob, word, record) triples, sorted by increasing
     # prob.  "word" is a token from wordstream; "prob" is its spamprob (a
     # float in 0.0 through 1.0); and "record" is word's associated
@@ -405,8 +1256,28 @@ class Classifier:
     # the strongest (farthest from 0.5) spamprobs of all tokens in wordstream.
     # Tokens with spamprobs less than minimum_prob_strength away from 0.5
     # aren't returned.
-    def _getclues(self, wordstream):
+    # If given, worddistanceget is used instead of _worddistanceget() to
+    # look up the (distance, prob, word, record) tuple for each token (and
+    # if not, and batch_lookups is set, the tuples for all the tokens are
+    # looked up at once).
+    #
+    # Large messages can have thousands of candidate clues, of which only
+    # the strongest max_discriminators are wanted, so when there are lots
+    # of them they're never fully sorted (see _strongest()).
+    def _getclues(self, wordstream, worddistanceget=None):
+        if worddistanceget is None:
+            if self.batch_lookups:
+                wordstream = list(wordstream)
+                words = set(wordstream)
+                if options["Classifier", "use_bigrams"]:
+                    # The same pairs as below.
+                    words.update(["bi:%s %s" % pair for pair in
+                                  zip(wordstream, wordstream[1:])])
+                worddistanceget = self._worddistances_many(words).__getitem__
+            else:
+                worddistanceget = self._worddistanceget
         mindist = options["Classifier", "minimum_prob_strength"]
+        maxdisc = options["Classifier", "max_discriminators"]
 
         if options["Classifier", "use_bigrams"]:
             # This scheme mixes single tokens with pairs of adjacent tokens.
@@ -422,7 +1293,8 @@ class Classifier:
             # the start of wordstream) of the tokens that went into word.
             # indices is a 1-tuple for an original token, and a 2-tuple for
             # a synthesized bigram token.  The indices are needed to detect
-            # overlap later.
+            # overlap later.  They're only built for tokens that make it
+            # into raw.
             raw = []
             push = raw.append
             pair = None
@@ -438,28 +1310,47 @@ class Classifier:
                     # _enhance_wordstream().
                     pair = "bi:%s %s" % (last_token, token)
                 last_token = token
-                for clue, indices in (token, (i,)), (pair, (i-1, i)):
-                    if clue not in seen:    # as always, skip duplicates
-                        seen[clue] = 1
-                        tup = self._worddistanceget(clue)
-                        if tup[0] >= mindist:
-                            push((tup, indices))
-
-            # Sort raw, strongest to weakest spamprob.
-            raw.sort()
-            raw.reverse()
-            # Fill clues with the strongest non-overlapping clues.
-            clues = []
-            push = clues.append
-            # Keep track of which indices have already contributed to a
-            # clue in clues.
-            seen = {}
-            for tup, indices in raw:
-                overlap = [i for i in indices if i in seen]
-                if not overlap: # no overlap with anything already in clues
-                    for i in indices:
-                        seen[i] = 1
-                    push(tup)
+                # As always, skip duplicates.
+                if token not in seen:
+                    seen[token] = 1
+                    tup = worddistanceget(token)
+                    if tup[0] >= mindist:
+                        push((tup, (i,)))
+                if pair not in seen:
+                    seen[pair] = 1
+                    tup = worddistanceget(pair)
+                    if tup[0] >= mindist:
+                        push((tup, (i-1, i)))
+
+            # Fill clues with the strongest non-overlapping clues, working
+            # from strongest to weakest spamprob.  Once there are
+            # max_discriminators of them, the rest of raw can't matter, so
+            # try with just the strongest part of raw first, and only sort
+            # all of it if that part doesn't yield enough clues.
+            n = 2 * maxdisc
+            while True:
+                if n < len(raw):
+                    candidates = _strongest(raw, n)
+                else:
+                    raw.sort()
+                    candidates = raw
+                candidates.reverse()
+                clues = []
+                push = clues.append
+                # Keep track of which indices have already contributed to a
+                # clue in clues.
+                seen = {}
+                for tup, indices in candidates:
+                    overlap = [i for i in indices if i in seen]
+                    if not overlap: # no overlap with anything already in clues
+                        for i in indices:
+                            seen[i] = 1
+                        push(tup)
+                        if len(clues) == maxdisc:
+                            break
+                if len(clues) == maxdisc or candidates is raw:
+                    break
+                n *= 4
             # Leave sorted from smallest to largest spamprob.
             clues.reverse()
 
@@ -469,13 +1360,11 @@ class Classifier:
             clues = []
             push = clues.append
             for word in set(wordstream):
-                tup = self._worddistanceget(word)
+                tup = worddistanceget(word)
                 if tup[0] >= mindist:
                     push(tup)
-            clues.sort()
+            clues = _strongest(clues, maxdisc)
 
-        if len(clues) > options["Classifier", "max_discriminators"]:
-            del clues[0 : -options["Classifier", "max_discriminators"]]
         # Return (prob, word, record).
         return [t[1:] for t in clues]
 
@@ -488,15 +1377,64 @@ class Classifier:
         distance = abs(prob - 0.5)
         return distance, prob, word, record
 
+    def _worddistances_many(self, words):
+        """Return a dict mapping each of words to the tuple
+        _worddistanceget() would return for it, fetching all the records
+        at once."""
+        records = self._wordinfoget_many(words)
+        unknown_prob = options["Classifier", "unknown_word_prob"]
+        distances = {}
+        for word in words:
+            record = records.get(word)
+            if record is None:
+                prob = unknown_prob
+            else:
+                prob = self.probability(record)
+            distances[word] = abs(prob - 0.5), prob, word, record
+        return distances
+
     def _wordinfoget(self, word):
         return self.wordinfo.get(word)
 
+    def _wordinfoget_many(self, words):
+        """Return a dict mapping each of words to its WordInfo record.
+
+        Words that aren't in the database are left out.  Subclasses whose
+        backend can fetch many records in one go should override this.
+        """
+        records = {}
+        for word in words:
+            record = self._wordinfoget(word)
+            if record is not None:
+                records[word] = record
+        return records
+
     def _wordinfoset(self, word, record):
         self.wordinfo[word] = record
 
     def _wordinfodel(self, word):
         del self.wordinfo[word]
 
+    def _wordinfokeys(self):
+        return self.wordinfo.keys()
+
+    def _wordinfoitems(self, batch=1000):
+        """Generate a (word, WordInfo record) pair for each word.
+
+        The records are fetched batch at a time, so that not all of them
+        need be in memory at once.  Subclasses whose backend can go
+        through its records without first listing the words should
+        override this.
+        """
+        words = self._wordinfokeys()
+        for i in xrange(0, len(words), batch):
+            chunk = words[i:i+batch]
+            records = self._wordinfoget_many(chunk)
+            for word in chunk:
+                record = records.get(word)
+                if record is not None:
+                    yield word, record
+
     def _enhance_wordstream(self, wordstream):
         """Add bigrams to the wordstream.
 
@@ -52,9 +52,33 @@ class Hammie:
         true, returns a tuple: (probability, clues), where clues is a
         list of the words which contributed to the score.
 
+        If msg is a string (or a file object), the result is remembered,
+        and scoring the same text again before the classifier is next
+        trained just returns it.
+
+        """
+
+        if hasattr(msg, "read"):
+            msg = msg.read()
+        if not isinstance(msg, basestring):
+            return self._scoremsg(msg, evidence)
+        return self.bayes.spamprob_cached(msg, lambda: tokenize(msg),
+                                          evidence)
+
+    def score_many(self, msgs, evidence=False):
+        """Score (judge) a batch of messages.
+
+        msgs is a sequence of messages, each of which can be a string, a
+        file object, or a Message object.
+
+        Returns a list with one result per message, as score() would
+        return it.  Tokens shared between the messages are only looked
+        up in the database once.
+
         """
 
-        return self._scoremsg(msg, evidence)
+        return self.bayes.spamprob_many([tokenize(msg) for msg in msgs],
+                                        evidence)
 
     def score_and_filter(self, msg, header=None, spam_cutoff=None,
                          ham_cutoff=None, debugheader=None,
@@ -181,6 +205,34 @@ class Hammie:
 
         self.bayes.unlearn(tokenize(msg), is_spam)
 
+    def train_many(self, msgs, is_spam):
+        """Train bayes with many messages.
+
+        msgs is an iterable of messages, each of which can be a string, a
+        file object, or a Message object.
+
+        is_spam should be True if the messages are spam, False if not.
+
+        The database is updated once for all the messages, rather than
+        once for each, so this is much quicker than calling train() for
+        each message.
+
+        """
+
+        self.bayes.learn_many((tokenize(msg), is_spam) for msg in msgs)
+
+    def untrain_many(self, msgs, is_spam):
+        """Untrain bayes with many messages.
+
+        msgs is an iterable of messages, each of which can be a string, a
+        file object, or a Message object.
+
+        is_spam should be True if the messages are spam, False if not.
+
+        """
+
+        self.bayes.unlearn_many((tokenize(msg), is_spam) for msg in msgs)
+
     def untrain_from_header(self, msg):
         """Untrain bayes based on X-Spambayes-Trained header.
 
@@ -63,34 +63,48 @@ DEFAULTDB = get_pathname_option("Storage", "persistent_storage_file")
 SPAM_THRESHOLD = options["Categorization", "spam_cutoff"]
 HAM_THRESHOLD = options["Categorization", "ham_cutoff"]
 
+# Number of messages scored together by score().  Tokens shared between
+# the messages of a batch are only looked up in the database once.
+SCORE_BATCH_SIZE = 500
 
-def train(h, msgs, is_spam):
-    """Train bayes with all messages from a mailbox."""
-    mbox = mboxutils.getmbox(msgs)
+
+def _counted(mbox):
+    """Yield the messages from mbox, showing a running count."""
     i = 0
     for msg in mbox:
         i += 1
         if i % 10 == 0:
             sys.stdout.write("\r%6d" % i)
             sys.stdout.flush()
-        h.train(msg, is_spam)
+        yield msg
     sys.stdout.write("\r%6d" % i)
     sys.stdout.flush()
     print
 
+def train(h, msgs, is_spam):
+    """Train bayes with all messages from a mailbox."""
+    h.train_many(_counted(mboxutils.getmbox(msgs)), is_spam)
+
 def untrain(h, msgs, is_spam):
     """Untrain bayes with all messages from a mailbox."""
-    mbox = mboxutils.getmbox(msgs)
-    i = 0
+    h.untrain_many(_counted(mboxutils.getmbox(msgs)), is_spam)
+
+def _batches(mbox, size=SCORE_BATCH_SIZE):
+    """Yield lists of up to size messages from mbox."""
+    batch = []
     for msg in mbox:
-        i += 1
-        if i % 10 == 0:
-            sys.stdout.write("\r%6d" % i)
-            sys.stdout.flush()
-        h.untrain(msg, is_spam)
-    sys.stdout.write("\r%6d" % i)
-    sys.stdout.flush()
-    print
+        batch.append(msg)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def _scored(h, mbox):
+    """Yield (msg, (prob, clues)) for each message in mbox."""
+    for batch in _batches(mbox):
+        for msg, result in zip(batch, h.score_many(batch, True)):
+            yield msg, result
 
 def score(h, msgs, reverse=0):
     """Score (judge) all messages from a mailbox."""
@@ -98,9 +112,8 @@ def score(h, msgs, reverse=0):
     mbox = mboxutils.getmbox(msgs)
     i = 0
     spams = hams = unsures = 0
-    for msg in mbox:
+    for msg, (prob, clues) in _scored(h, mbox):
         i += 1
-        prob, clues = h.score(msg, True)
         if hasattr(msg, '_mh_msgno'):
             msgno = msg._mh_msgno
         else:
@@ -43,6 +43,10 @@ class HammieFilter(object):
         self.h = None
 
     def open(self):
+        if self.h is not None and self.usedb in ("frozen", "table"):
+            # A snapshot switches to a newly published one itself.
+            self.h.bayes.refresh()
+            return
         mtime = os.path.getmtime(self.dbname)
         if self.h is None or self.modtime < mtime:
             self.h = hammie.open(self.dbname, self.usedb, 'r')
@@ -5,153 +5,175 @@ source = 'ui.html'
 package = 'spambayes.resources'
 
 import zlib
-data = zlib.decompress("x=ksFS0\015\")v\022=kN=;ʦRj\010\014I@\000C\024713\030<HQ\
-vv꜔D\002~O\017tw\027W?%.޾\021|\016F/FW/ƓP\\2)\
-2J\023\031F~&_~q(1V2eTJDGL._ȵ*ďTL\006lD\017*\
-Xev~sB\006\013 K҃/zuE*\021Wj \000D\034~X'\
-&04\005ӸgXVEy[\031G,\002*47\025HZ.f\000D|;~$d\036x UT\
-\024\003P*@Qr\"__~Q)0oq,͗l\003_ȓ8Jnzi~\"4\001ݔ'\
-\021\0127]@g'\014\0155+\035T4_\0004\016Hh#\011)cn8IBLep\
-3*\011a``S0S V3q/7MP\007eN\024)\000iZ\
-(rK\010\021EO\005\035\037?j]s)XsU\"C[\000hl\002!֌ܟ\
-\031b\025\002#w b\014`<fRO{\020q9r/g}W^E^O\017 ٝ^tP\030\016t!z\
-%tL2y_`õm<\015\030QQӄ\027\\\025,0@~,\022)`g\022e\035\
-\037Z<!<N\031|62Vl,|$v\017\036]%:\013[\021Ĳ(}5\024\031B\034\001V\004L79s\
-QWh\0130mܗb\031aq2-S\003 4xDɲ<\015A.\033'5u]\001\
-A>qK4]*\\<O,r5?g#?\035heBs=蠚7\000Ø9\004Qri\
-\012=m\010g'#0|X'\002dETY\024{8\013PM,\026m B5\022`BP\"Nӛ\003\0073\
-b\006N22<2Wk\026~T9\020Wp\026\034EZ\025\014 @Z\013\034AΛ\013{\012\034\022e\000\023iK\
-%}/\031B^%e\004Ӗp\015\004\023k\010\021\002].dD3n_2q\000Oi\010\032t\033\007c\021\
-T\006S\036\033,M\005\014|~\015h案{K\007-0\001F\010N \003l\024\020eh8c\
-31Ky\003\001m^\026E\004fy0^gfZ^ҨD@LU{\013$*r@xFA\001{@T_\
-\013!\032;><\033e\035y\\641\012}\004ѳ,.EI\012sa\003PbP\007\020D\017F$\012\
-\016\017%H@\0001c0V&ۈ>',ԝ\\f1l\030UP\0023FT\030\016|\\`\000p4\0004\
-L\030oi[q\026%YU֏x\\g\012\002Ps\0174#\015\003{\0356\001p\011BYZA\\\
-.epҠ\036\007i]lYS\001\033}>t?M8ȇ]\011;\033\035P\016Pt\
-\010q\034\032)q.L%{6Z@xyk4\000@5\002C4`WU@w\005 k\010lXY\
-<_~\004a\016l\024Mv'bHЀFb!\012C\014\012mF g\035?ucJm\020\024\031*\
-|\005s-Ȅ$v\024h\012qLB#)ɢD3T2G;\0112h@9Ow\011~m\031,O\010rY\
-\030-p\002ϓ+ю\004ŀ\003(\002\0175]\033\017\0014Cn@\004'\034\025\013Am\004\036j?X\
-H\025\022\016T\021,wV_h1\011{BYl\023{źm<_\030%>\023\000̂'R\003M'\
->\030.3`ȒS~ƍL\011\005p\013\016NNo{F8y៛\"Pq\014#\003f\014\
-e\003\016zڃSG\020Ԃ\014\031\026\001\016D?\002Ay}\010\012_!5[1P9\002c7\\eh\
-\0009..JYV\005z\017n\014#tlc'\026E<h\025T6rFG')\034ƃ\026M?6,L\007\
-S\001/`:\012F&uX\001mn>.'w ;7E\023 oSpua\037)AӰ\004\021BQ\005\
-\001\011blP֤Hx\037(e[:/vh#\003 Ȧ\031)\000\033/pQ#\
-KI\037 \"OW<.B4D\026E\036\001.\037<_Hpt((2\025D(u\
-2i\025f\0165a/\"-5\"\003\"\027ɮ\020>rwj+\014\")$\020_(s\0159-\
-\004\037(<\000C\015\022@.\022kp1)\030a\0020\020\006@\003{A\0267}\031$7\\(\002\034\005\
-L\0024\017?sZN\034C\003\0268\030SKcH]\024>D@W`~T(Mr\012 C*1\000m%\
-\016i\014\004c\022\005\017ҧ\033G%W\013thsLÍ_jHH>b\005\011\016\021\034#OF\014o9N-\
-i>)\033\024@\014lt\011\030p\010\001$qLrjhT\000\005\0020Q\010\033~v\015\
-P\002\034\035\016\0218PTKu\014p\013H\034w\011( Ba\0000\"%X\001ض\034r\025Hcr \003\
-X0`\000+\0364\007`Fy4+4\022\0214s\002\012A\024ƚb1j2E\022\
-ZwEZ,8&\001F)0\030+\0344\022r1Xjj%-\0060*Wvk`\
-$\0036w\0328\005\026T!O\002HJW'|\021\\-(ph>XiA\"P\"\021KЪ\027,`\014\
-\022*ib\017n\034X\033aXĽwhXWQXC\030Yв\015\006\\l%84B\014CH6\033\027\
-;E^\"\000\"\015Hu|\033\021/5W\007-\020FPv\000b\014OZAbr\
-`;:Ȑcq(ZU\004_7\032Y!VbXiauS{\015\024\020Ca\
-R\025\034R#\031\0201fJ:å\011\034LD\0304鰋pX\017S\020\030U6h\002\
-j\012_(sP\012#@\0114!\014\"Uť7,5T\002ҵd>\001\006$!\023\012\
-l\005n\"\004r\035\014فE(*\024cPe*\011eB12*X\000mR\032hчgb\
-N^%\004<_p[3\002G\032QSCU-LOҫ\006X٬*AF\034ϓז\037F!AP2Y<\
-M\006!}Gێ\0127ס\\\027/Fˌy\015y\0249\002\016\025\016\005\023^G=)`B\004Cc\"\025|z\
-I¨\010d\036K\027(42#R\017\032CL@.\026XϘ|QqC3f+\007v\
-\\\011\006F\016\\$ \037U\017ue\024\0005\001\003\010B\016Ws?\000wp\001<\010\013\020WTDl\
-.Xf^e.\024˧2`7cb4\027\003\013*ug\035隩\002`pd\020\015\027RX\001D\000\
-\020\026D3&L\\LY;0~ɡW\010xAY]\022HKn\003\0304\004Yvz\\U\012\002`\037\
-b!\\h\000\024p\021\021-\011\007+\030\\YRFF d\005^AӚ\010ó1Qv׎\027\
-Б\023/fѐ\003Ǵ3\026e|BTd\020Z\0308k~+\021|U*q8߰\006?\"ÆbcO\001\
-laKʂ\0300\020H\"\037ok\007a\032r\022o(jpX\013C\010\\&2kGb\032Ty\
-\032\001GE3#\010+t\020\020\0368Q^mS/MB^\010rE\000Xf\020\027\0028@\007\033\003B\020|Ψ\
-;1ʄuh\021\017`D!3c\025BOLPp\033\010\014M\"WW\020\006䩡\
-pY\\q:@5In\001 `Y\0230W1N\"8Zq\020\007\037k\023i\0304xֵ6i)\
-\004\006iM89F6C~­h\015\024\025kZ\036W2\013׀c;vFJ9Aơ:!=H\
-/8\0002\001핹0Xd \001q\022W};BOq\001Q\025\037rn\031!\
-\027udڗB#2[Q(\005ˉ\005֠?<9\014+sfi\017\012bgZd\017YrV߉ڱ\
-Z:/@%\012\035\002w=\023D(\025\033#*:\\Łu\003SI\"w\003^2*d\003\025ie4\027\013\014\
-\015򛀓_˙]Yhb1t3U-b%NK\026K*, \023G\003\006\006\024\033!B\0140E\
-`K4,VleI\013RN\012N(0\004\006\001Dc3\\\020V(7&bw\"\
-\005@Ntoߪ<5v\012YW\011[رv.X4N\011!i\010\031\033$W%@\
-@8A;\032\002˻GM-;(;Ds\011wLR-符=[ƞh\034KG\0011N7GPt\
-\031vƸ;\005G!d\\q-\032i!8Y4r._@\027QH\025Kr7R,\000N\
-JLū;\013\036n1bb5Z7>(\017\006\020L\000[\"ryY܆L\020\027h\026\
-\027XW٘=3,\022\0245#p\02024K;/Dջ\007\015jLA(<uo \
-Ŋ0K\031uDf\023\006p\003\030Z?\"ja\021i\025\015B4.fQ܍`u4Ϣ\
-؅\021&F2=\\r3H,\"ȣ醚\013\031Pl( \0000;\010c1>cj\
-ӵ_8\036\"/[n\005=̾\0006BJkQ\005\021\004Pk\\'\015fn£\005\005\031\023tRw+\
-`L\0257p^B\025\027(\012oqǁP\"x\015뢰@!\006r5P蘊mH\
-Qo/ղ\013%\027ZOS$,Qlya\013y#u$htE\021\001\0357Z\
-5\033~d8Ѯ&r\007ƀ\031Oe-i8\036KǅȺXӞaF\012lm'\022\027\
-mg\024$,Nؙj=?\0247ԫ'g%׳6kqKRJ:@\005H\030\001βǍop?Gb\016\
- *<\000jh7կ\006Z\033ή\037ʗp~_\\r _];Gg_\035\034\0157Ȟ\025\
-\031L܌]%yw6\037p\007<i\021SG\022v՞{K>(Sӑt<]H<X\032-\
-9d䟞rt'ѳ\031)lνg^c34\010zf$2\010(ynY\
-=֓\005\017\002Q}69u\014H7r.\037\0344\037xG.aio\031\036op\
-\007\032w6<ѻn\027\033/\0115䩹#΍ϐqS$\036JG6@)SM홦^֔mL\035\
-O7?\021M0%m<\0357><H<h\\R\0202\003E[\013QUֆ\
-_\001Ē9\0367;C\023\0173~\006\022o9Œ,8P*\011f{\035R\031A\
-M864\017iJ'\001:F\011aC3݋_9\013\033^C|''\026D6D4ݼ>DJ\
-ZA\034#ͮ##\014tznR]6޿{LQ\032\017͞t\032\036waX\
-wA\023$=O\031F\004vBѝXv\015[Y6\011sH\021$\036I;s4\016\
-Kðg\014 7]2mi\036:U­Cm1kR-1mM(p\013q}ewA?Rm5\
-\013fm\"\0379RĠE\011b~Қ\0031oo\016YGm6OtmYp8lj\036;Hp\023\
-\020ڸ?Swn#rƸm4(\033ב\023nx@\037}\030\006\0179uq4I\001{ol\
-. \027̶\007pujS\\dY\015o\007PkQ\0327s샠\020V2OF5/\
-(\001\006\031\011_(5_q{jj~+\032Si\014\013\032t\011m'Z\032\0307A%\002]@@`t\023W\
-חqz4q?itH٩P}6\024D\0124.U)\020!GijV\
-ja|deOc6~v\0022d\001?@\\\032+ڸ\025A'\0253U\022[JkAK5\026JD\
-\015]f\030\002>\005M%էJ)v\012/\027ԿRkCQf\007\024m`\032d5Ǻ\007=l\
-1\022\004\035~1(\004B]%HI}G=Ij\032u<홗$\014v\002OY6붶qy\
-\013y\011\025\031\004ktVp\033\024ţ\017\034]q\030\012b?_]9\015[E\024\012\
-Bp|j7\0379Ǯ\002 \001\025w8Ǩ:${\020|MMT#o<uA\035\
-\032;\035J\004¨@\000ġs\021\0121\0057@#|݈=\007\022Ӷ3t\017ܦv\
-m\013(3d\031CJOF~x/[\011[=\034Io(UJ^\023Ͱ\011/\
-x7MǏE0Vɼ\\ɹ8گ\"iyk/v\036\023{\021<8>\0258az\002?7\037\
-Tԡ\000\000 8!n'~\013'P;Pt~.^{\003ŋ\027q9sa\
-IW*\000G\035vdyzhWUԿF_\0171h\015߿xOo\\\
-\034pWEjc55n}á\030\010\001'\003W\014l\011LxsTx\026l\0206\036\
-nN*;ŝA\030\0154y\020\005\026\007\011\026);Eߖ}ienxM׋\006Ң/\0154\017\027\
-WENj#j}`o\021p^F6u>ʅ?\020!0\003^\007AӠQF\007!APF\
-ph3`PG`x+\017tu\015(|\004\002Eb\021?$\003<+znQHW98>\035\037X\026\
-\002\022\026v\023@@}͘\016AZh>9=ӻ\037d\021zMfC\024\
-,\"%.#:\021\007sW\024\031H.ԨA$_]G^\032DczQ'NB\
-y5Aip\003\0317\0074YC\007:\"ˁ8<\024\037U&cq甩p=KD\
-\014\004g儜?D)\010S\016w\033_v;@[!/}ϢA7Y\004 \
-ޣl;!ڣyۛh1\032\005߹<t^b-1\017\\nQ@,\017\
-zMhڅDՉ\035 d=5-Eo\033Vɹ\026,Ne-/ GgkPC\
-\032aP\021}*.#<_KX\035`g\014ٍA;sʯ_ћ\014ܾEM\022o@6n3uO\011\
-tVijN~W'\033\024-D.7dcW<MFξ;~{\015K5klPP[Q\
-S(L{\031.B5~e\006g$\026.\027dl/S\021DOS<eNp\\}\
-G[!r\015Bma;c\031:L\012f\015x:4C<{bN\026fCo<}Qc\
-\000y\026hx<n\032֮T1ߔbm{Nݘxde\021\005\032b5b7\
-.\0271\017z:6\001șMƮp)ۺe>^\005ʐGc9U7y_P\
-tU\015}kR#Mft)8h4\0322?\\\0262F\020AwþݰL*8|\
-\002Yv\026߹d)n\\cIvF\031_%U\034\031xo]`z?̚\\\007!׹d\
-=\0347,SOL\023\006mqF\004)onmi\007]\\|z1w\
-tܰGR\022\034k0ڤ(r׵[\015\023;ws-=̷E\0256'[D|\
-nӓqC'\023\007}gĻ!а_o\035FR\0015똷\020}j3sl\
-Ѹ/z)jf4\022M>Q+V\022b\032\035\003^<{Zw\037(`\017Vbb\
-[MRx/H+l><:ЛVZl<}\001{z\017\025'ڇm\013\034*\010yB\021Fbo2\036~\
-ͷ\033&y7\011\037f\015n9ݙtơk\016tS3\004\0172\004ob9:/\033)FXGS1 O\
-}&φ\\\037\002\0155лE-N\015'S)tC,Y!O>\015?aIE\
-w/阴}z/&^\0239PGA-DkVw1/]'Ւ\001>em\
-3MXWp^J²\002+\033\036|'<կ\0347\017\033mH!L8tsv9=qٻ\
-ٴ\021{\"O'=\033\031\033f+.aP]x1z\0036\006;zG:;\014bl\031o\013\011\
-Fۢ-wMA{<u\006\007\0367QG3jiAU^g!\0041뾐\011\
-\032?|g|gloHb\023;N^(u&g\036wԥ\031FL =\024\
-Į\037\016o#xB0oyүFt+\025m\021٦ݳۗs;1mԘ[P\026s^\033\
-F,\027\011T\021Q/5{xQ\016z7gO\032\020\027\021\\\
-Zzn3Ħ\016/OԽzٜst|Nr~p]&5K\016'-.q\006\
-\035Ի>;6\002y-}\035QGd\016#Rö=S\027>~]Cjӹ?bL%\020G;NiZ\
-x\021,&yu\026[%(t&Un\003߻t.l9K!1k-~\
- ^fتt\002R>\006[Xhż\034m]$pw61GVz1VU\
-+wI\026\013T1bmWlwY8nQn:M%\016\037\025#ݨ\036\005\005|\026\
-SOb6LgN\013LSy>a\011e;POjf+i\030\036\
-\017\011\017\033lN$sF6K3{| \036{O>E\030C?)HL\021nox3\
-g ʙ㓑h,_,2LWIߎ\012j=M\032\0054\015g)݃ޟIS<mf]\
-o\0331\036?knnWyAi)c[/{v'dog\033tOA;g\
-1.!\011C\011(Q \021\006\036iD㩾~j\032\0020#F~o_ubAy\
-0^iX4}S[_\017\037\024K\004\032#\032k.w\010h\0269R\036»\\O%==J\0371[P\
-\023jNǰ\014\031\026ykQ@Qp_/$#")
+data = zlib.decompress("x=ksFS0\015\")v\022=kN=;ʦRj\010\014I@\000C\02471\
+3\030<HQvv꜔D\002~O\017tw\027W?\177%.޾\021\177|\016F/\
+FW/ƓP\\2)2J\023\031F~&_~q(1V2eTJDGL._ȵ*ďTL\006\
+lD\017*Xev~sB\006\013 K҃/z\177uE*\021Wj \000D\
+\034~X'&04\005ӸgXVEy[\031G,\002*47\025HZ.f\000\
+D|;~$d\036x UT\024\003P*@Qr\"__~Q)0oq,͗l\003_ȓ8Jnz\
+i~\"4\177\001ݔ'\021\0127]@g'\014\0155+\035T4_\0004\
+\016Hh#\011)cn8IBLep3*\011a``S0S V3q/7MP\007\
+eN\024)\000iZ(rK\010\021EO\005\035\037?j]s)Xs\
+U\"C[\000hl\002!֌ܟ\031\177b\025\002#w b\014`<fR\
+O{\020q9r/g}W^E^O\017 ٝ^tP\030\016t!z%tL2y_`õm<\015\030\
+QQӄ\027\\\025\177,0@~,\177\022)`g\022e\035\037Z<!<N\031\
+|62Vl,|$v\017\036]%:\013[\021Ĳ(}5\177\024\031B\034\001V\004L\
+79sQWh\0130mܗb\031aq2-S\003 4xDɲ<\015A.\033\
+'5u]\001A>qK4]*\\<O,r5?g#?\035heBs=蠚7\000Ø9\004\
+Qri\012=m\010g'#0|X'\002dETY\024{8\013PM,\026m B5\022`\
+BP\"Nӛ\003\0073b\006N22<2Wk\026~T9\020Wp\026\034EZ\025\014 \
+@Z\013\034AΛ\013{\012\034\022e\000\023iK%}/\031B^%e\004Ӗp\
+\015\004\023k\010\021\002].dD3n_2q\000Oi\010\032t\033\007c\
+\021T\006S\036\033,M\005\014|~\015h案{K\007-0\001F\010\
+N \003l\024\020eh8c31Ky\003\001m^\026E\004fy0^gfZ^ҨD@LU{\013\
+$*r@xFA\001{@T_\013!\032;><\033e\035y\\641\012}\004\
+ѳ,.EI\012sa\003PbP\007\020D\017F$\012\016\017%H@\0001c0V&\
+>',ԝ\\f1l\030UP\0023FT\030\016|\\`\000p4\0004L\030oi[q\026\
+%YU֏x\\g\012\002Ps\0174#\015\003{\0356\001p\011BYZA\
+\\.epҠ\036\007i]lYS\001\033}>t?M8ȇ]\011;\033\
+\035P\016Pt\010q\034\032)q.L%{6Z@xyk4\000@5\002C4`WU@w\
+\005 k\010lXY<_~\004a\016l\024Mv'bHЀFb!\012C\014\012\
+mF g\035?ucJm\020\024\031*Ê|\005s-Ȅ$v\024h\012qLB#)ɢD3\
+T2G;\0112h@9Ow\011~m\031,O\010rY\030-p\002ϓ+ю\004ŀ\003\
+(\002\0175]\033\017\0014Cn@\004'\034\025\013Am\004\036j?X\
+H\025\022\016T\021,wV_h1\011{BYl\023{źm<_\030%>\023\
+\000̂'R\003M'>\030.3`ȒS~ƍL\011\005p\013\016NNo{F8y៛\
+\"Pq\014#\003f\014e\003\016zڃSG\020Ԃ\014\177\031\026\
+\001\016D?\002Ay}\010\012_!5[1P9\002c7\\eh\0009..JYV\005z\
+\017n\014#tlc'\026E<h\025T6rFG')\034ƃ\026M?6,L\007S\001\
+/`:\012F&uX\001mn>.'w ;7E\023 oSpua\037)AӰ\004\021BQ\005\
+\001\011blP֤Hx\037(e[:/vh\177#\003 Ȧ\031)\000\033\
+/pQ#KI\037 \"OW<.B4D\026E\036\001.\037<_Hpt\
+((2\025D(u2i\025f\0165a/\"-5\"\003\"\027ɮ\020>rwj+\014\
+\")$\020_(s\0159-\004\037(<\000C\015\022@.\022kp1)\030\
+a\0020\020\006@\003{A\0267}\031$7\\(\002\034\005L\0024\017?\
+sZN\034C\003\0268\030SKcH]\024>D@W`~T(Mr\012 C*1\000m\
+%\016i\014\004c\022\005\017ҧ\033G%W\013thsLÍ_jHH>b\005\011\
+\016\021\034#OF\014o9N-i>)\033\024@\014lt\011\030p\010\001\
+$qLrjhT\000\005\0020Q\010\033~v\015P\002\034\035\
+\016\0218PTKu\014p\013H\034w\011( Ba\0000\"%X\001ض\034r\025H\
+cr \003X0`\000+\0364\007`Fy4+4\022\0214s\002\012A\024\
+ƚb1j2E\022ZwEZ,8&\001F\177)0\030+\0344\022r1X\
+jj%-\0060*Wvk`$\0036w\0328\005\026T!O\002HJW'|\021\\-(p\
+h>XiA\"P\"\021KЪ\027,`\014\022*ib\017n\034X\033aXĽwhXW\
+QXC\030Yв\015\006\\l%84B\014CH6\033\027;E^\"\000\"\015\
+Hu|\033\021/5W\007-\020FPv\000b\014OZAbr`;:Ȑ\
+cq(ZU\004_7\032Y!VbXiauS{\015\024\020CaR\025\
+\034R#\031\0201fJ:å\011\034LD\0304鰋pX\017S\020\030\
+U6h\002j\012_(sP\012#@\0114!\014\"Uť7,5T\002\
+ҵd>\001\006$!\023\012l\005n\"\004r\035\014فE(*\024cPe*\011\
+eB12*X\000mR\032hчgbN^%\004<_p[3\002G\032QSCU-LOҫ\006\
+X٬*AF\034ϓז\037F!AP2Y<M\006!}Gێ\0127ס\\\027\177/Fˌ\
+y\015y\0249\002\016\025\016\005\023^G=)`B\004Cc\"\025|zI¨\010d\
+\036K\027(42#R\017\032CL@.\026XϘ|QqC3f+\007v\
+\\\011\006F\016\\$ \037U\017ue\024\0005\001\003\010B\016Ws?\000\
+wp\001<\010\013\020WTDl.Xf^e.\024˧2`7cb4\027\003\013\
+*ug\035隩\002`pd\020\015\027RX\001D\000\020\026D3&L\\LY\
+;0~ɡW\010xAY]\022HKn\003\0304\004Yvz\\U\012\002`\037b!\
+\\h\000\024p\021\021-\011\007+\030\\YRFF d\005^AӚ\010ó1\
+Qv׎\027ԥБ\023/fѐ\003Ǵ3\026e|BTd\020Z\0308k~+\021|U*\
+q8߰\006?\"ÆbcO\001laKʂ\0300\020H\"\037ok\007a\032r\022\
+o(jpX\013C\010\\&2kGb\032Ty\032\001GE3#\010+t\020\020\0368\
+Q^mS/MB^\010rE\000Xf\020\027\0028@\007\033\003B\020|Ψ\
+;1ʄuh\021\017`D!3c\025BOLPp\033\010\177\014M\"WW\020\006\
+䩡pY\\q:@5In\001 `Y\0230W1N\"8Zq\020\007\037k\023i\0304\
+xֵ6i)\004\006iM89F6C~­h\015\024\025kZ\036W2\013׀c;vFJ9\
+Aơ:!=H/8\0002\001핹0Xd \001q\022W};BOq\001\
+Q\025\037rn\031!\027udڗB#2[Q(\005ˉ\005֠?<9\014+s\
+fi\017\012bgZd\017YrV߉ڱZ:/@%\012\035\002w=\023D(\025\033\
+#*:\\Łu\003SI\"w\003^2*d\003\025ie4\027\013\014\015򛀓_\
+]Yhb1t3U-b%NK\026K*, \023G\003\006\006\024\033!B\0140E\
+`K4,VleI\013RN\012N(0\004\006\001Dc3\\\020V(7&\
+b\177w\"\177\005@Ntoߪ<5v\012YW\011[رv.X4N\011!i\010\
+\031\033$W%@@8A;\032\002˻GM-;(;Ds\011wLR-符=[ƞh\
+\034KG\0011N7GPt\031vƸ;\005G!d\\q-\032i!8Y4r._@\027Q\
+H\025Kr7R,\000N콫JLū;\013\036n1bb5\177Z7>(\017\006\
+\020L\000[\"ryY܆L\020\027h\026\027XW٘=3,\022\0245#p\020\
+24K;/Dջ\007\015jLA(<uo Ŋ0K\031uDf\023\006p\
+\003\030Z?\"ja\021i\025\015B4.fQ܍`u4Ϣ؅\021&F2=\\\
+r3H,\"ȣ醚\013\031Pl( \0000;\010c1>cjӵ_8\036\"/\
+[n\005=̾\0006BJkQ\005\021\004Pk\\'\015fn£\005\005\031\023t\
+Rw+`L\0257p^B\025\027(\177\012oqǁP\"x\015뢰@!\006r5\
+P蘊mHQo/ղ\013%\027ZOS$,Qlya\013y#u$htE\
+\021\001\0357Z̶5\033~d8Ѯ&r\007ƀ\031Oe-i8\036KǅȺXӞ\
+aF\012lm'\022\027mg\024$,Nؙj=?\0247ԫ'g%׳6kqKRJ\
+:@\005H\030\001βǍop?Gb\016 *<\000jh7կ\006Z\033ή\037ʗp~_\\\
+r _];Gg_\035\034\0157Ȟ\025撘\031L܌]%yw6\037p\007\
+<i\021SG\022v՞{K>(Sӑt<]H<X\032-9d䟞rt'ѳ\031)lνg\
+^c34\010zf$2\010(ynY=֓\005\017\002Q}69u\014H\
+7r.\037\0344\037xG.aio\031\036op\177\007\032w6<ѻn\027\
+\033/\0115䩹#΍ϐqS$\036JG6@)SM홦^֔mL\035O7?\021M\
+0%m<\0357><H<h\\R\0202\003E[\013QUֆ_\001Ē9\
+\0367;C\023\0173~\006\022o9Œ,8P*\011f{\035R\031A\
+M864\017iJ'\001:F\011aC3݋_9\013\033^C|''\026D6\177D4ݼ\
+>DJZA\034#ͮ##\014tznR]6޿{\177LQ\032\017͞t\032\036\
+waXwA\023$=O\031F\004vBѝXv\015[Y6\011sH\021$\
+\036I;s4\016Kðg\014 7]2mi\036:U­Cm1kR-1mM(p\013\
+q}ewA?Rm5\013fm\"\0379RĠE\011b~Қ\0031oo\016YG0\033\014\
+\013b\033C\011:T{\031\035\006NF\005^k.v\"4wp:8<\013\
+V7]\0074y|lq2iI;.sm(6\007?JZ\033<\037<ű\006\
+n\015[V5۽Z+Ec'PMnage6c\032VQKi\017rL[<!\023\
+'|b:\004,.$L|\030u}V u\0171,l\025f\001&.Q\013t\023\
+T\035\005{\015L7q{]-'WN\025B \0367\015\0325\001yT~-\016\021\
+6Bcl$+nLa\006\027R4uznxZx\0301ikJ}ݹL?\017\020Wm$\
+\005w)\"\"-5P\032ː\013+n_\002L\016\001\037ӌS!\027\
+[t\005g\013j)ܵ(\003gjJ0\0155ؒh}<\007-v1\022\004\035~\
+(\004CM/HI}G-Suk9y3/7q\030\004\005\036dy%n2\016fs\
+Q\013F\010J\020Ǯ<n)l\015G/%2r:nH)߿rl\033U(\014\025\
+\035e\010>\025!|h\037v\177\013\004T\034B\0315\"d󽷎`\006\
+\006\030\030\014橃\013Zv\001OcgwC\011J\030\025\0378t\0167\"u6\
+`}\030mϟ\017\033R@7yi\030zλmA\036e,t<\177[Wht\
+/\027/_=Eȫ\0224a#$eJIk|\031\010\006\025\026Gh^\031\
+*\01319\027Gߛ\\$-;o\015cb/\007ǧ\"\022g4LO\000\027w\
+\032H\015\005\000\004G\022:ĕ\036ҍ=y\037\006\022jG\0321ko\000\
+x\012\037?\027\0233>Szn;,7J\027(\177\0163{?T\017\015\
+j^rh\031+\022\035w\037I;M\015k\027Tv5P3~ƭo8\003\
+!D4\024\015H'[\002&(\023\036\\ҕ:(0[iׄ\007\177:Fvg\020\
+}C8r\036D\001ndNMe_Z\011\033\036qO{韴h\013s\003Å\
+U{$R$[\004ܟx\021<Mr\017 p\010̀Ww\037B94h\024\021,nd\
+H\020\021\034d(\030\021\030\014t_3_c$@\030|O;@#\017₣[3e\
+\037U}Lϼ\007DŚ\",3?wzfz3*CjЧeŖ;iuNnWYs\
+|Y\020\005Hˈ\016,{\006rW\025\036g Z#\005.K\007i|W1y\
+֎\012\177!\022Q\037!G8\011)\011\015d\034!Nd\015\035,\007\
+P|T8\032'ÞCvsl\0232R\023d\023rN\030\023Ӈ4\
+Lm|@\002mW?\002\026/ݨ\033g\021\000~G{OJ\0023\036\
+Ǐzhoo j\024~fo\020y\026wpwǘ6u\006G-\014Ln>(7k\027\022\
+U'vlIltEE/\032\177۰jN弇\"Tũ\014\005\010lpM\034j_#\026\
+\0125oYe\177\011\003l\0343A1躻qN5SzVI˗xFnɟ5;j\
+3]XY-9SmtՉ\0073b=}|ђ-\016_\022p\032'\024\024\
+\012=ox ˭j\037h\031='\031\006&\024O\003-W\
+\0378pQ\026.\027\\a}X\025D窂Yk\003^A\020^hš\
+Л/O>jn%@`4|\005)\037\006+gz$L:X۞z;VM6<-\036\031\
+iYDXtM\177\005`L/NM\0001r:.x\177Sk0\\ʻks2zO2\021\
+XNUM^\027/\024hi\025uh\037\024H\031]\037N6\032̟ͬO4Wsu\
+L4\004~ͺl'\012\016\037@\026w.Y\033טn\022lpjfQ\006\
+tI`\025ngl-<m\006[y\027-97\017&ׁ`u.Yr\017\015S$SĭA[m\034m'\
+\021\001mʺ\177|l}lm}\001o--&_o^ˌ/Hbg\035>\0357,t򑛨:\007\
+x-!)\012uml\026\177\004\034u\013\"o\032nQ\026\021\037\
+0[d\034P(\004Ap[}_n\0104[_~m@i:m'D\037hڌ\034[\
+p;u4l\012\031gd{vԊն\004gؽoǀ\027\026\0071J?s\
+mV\017\027\013\012{\0177ՠ\026!-,'Om\000^E\007Yv\
+\007\012Bޤmıٛ_\177\011{^CN\031o[N(ݼjq\003ݹ\024\014\
+\014S?λPz\021֑<\024s\014?\003x\011a8+\007@CMu5nQ&z\001\
+˔z+ +>\013.c\026vȓgOOXvK:&m`lfv\036r&WDoy5\021\
+bmu\0138\025\035|\020}sIdOYیe.֕*7\033ưʆ\0111O\
+\033C\007H\035:HK5?u4\003OO\\n6mw\032m:IF\006\012\
+K\177\030+zU\037ps\000\012ѭ\006\016\030?yB+&x>\004\021\
+hw]S\036O큇\015_k`\032~Peׯ\016l\012>̺/dBmo'\017\
+=g<.ߙ2.\0315\023\027\030+\016mS)q>və\035uiQ9i-E\
+:w\015&$@0/oעF\034(7\033,DM\025g/vJcڨ15-2u\002\
+D7z\024eHbO`2}\021ǋ#W_y<\177ȥP\007w\0240\
+ns!6\025,t\006\177}<\037PGt\033g2/!\\^ʬu֨=n\
+q3X1\021@[ے:<&{tV\032\022w\017Cj]L\037V\025\021\
+\013g*X?qJzŋga7ɫU\037..]DK4\0146*u\033\010ލ^;tl\035\
+eYZ\017Yk\0044\003Vç\026\020͗1P²Go-h\"߄1\
+\0169,ַ­Z9#LBXئ1\027\033Un_dKgqsm\"Tvөm*q8\036X\
+\030oFE2(@z\022ݵ9\004<\022L\\`\032lN[\011\013\177\037FO\
+1,:|WC5\\IkPߏ\007~\020OxL=\024l`kv\"c5YZ٫\003! {\
+/\032\007\0302OAZe*p{Kƛ\021>\003W\034CcbQaJvTlW\011\
+n(x\025ߧi8]\177KOLYr5zv\177xQ_[ws\030\013\
+J\033\037\004vL\031z\027=;/&c~#=\011{H9u\011I\000\0362M@\002\
+q<\026ONON5H#2\036OGW\026Ȇi>\0371\"{\026s\014\0179\
+Nâz0?\017Y&\"XvC@Uqe \027}z*Q@قJWݝPSW.=\
+%<\025fo\002ݗ[\002k珿\177\001I")
 ### end
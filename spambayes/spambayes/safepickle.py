@@ -17,8 +17,63 @@ def pickle_read(filename):
     finally:
         lock.release()
 
-def pickle_write(filename, value, protocol=0):
-    '''Store value as a pickle without creating corruption'''
+def pickle_read_journal(filename, journal):
+    """Read pickle file contents, and the contents of the file named
+    journal (an empty string if there's no such file), with the pickle
+    file's lock.  Return the value, the journal contents, and the stamp
+    (see file_stamp()) of the pickle file that was read."""
+    lock = lockfile.FileLock(filename)
+    lock.acquire(timeout=20)
+    try:
+        fp = open(filename, 'rb')
+        try:
+            stamp = _stamp(os.fstat(fp.fileno()))
+            value = pickle.load(fp)
+        finally:
+            fp.close()
+        try:
+            fp = open(journal, 'rb')
+        except IOError:
+            return value, "", stamp
+        try:
+            return value, fp.read(), stamp
+        finally:
+            fp.close()
+    finally:
+        lock.release()
+
+def journal_write(filename, journal, offset, data):
+    """Write data to the file named journal at offset, cutting off whatever
+    follows, with the lock of the pickle file filename."""
+    lock = lockfile.FileLock(filename)
+    lock.acquire(timeout=20)
+    try:
+        if os.path.exists(journal):
+            fp = open(journal, 'r+b')
+        else:
+            fp = open(journal, 'wb')
+        try:
+            fp.truncate(offset)
+            fp.seek(offset)
+            fp.write(data)
+        finally:
+            fp.close()
+    finally:
+        lock.release()
+
+def file_stamp(filename):
+    """Return a string that changes whenever the file is replaced or
+    rewritten:  its inode, size and modification time."""
+    return _stamp(os.stat(filename))
+
+def _stamp(st):
+    return "%d,%d,%d" % (st.st_ino, st.st_size, st.st_mtime)
+
+def pickle_write(filename, value, protocol=0, journal=None):
+    '''Store value as a pickle without creating corruption
+
+    If journal is given, the file of that name (which holds changes to
+    the old value) is removed once the new pickle is in place.'''
 
     lock = lockfile.FileLock(filename)
     lock.acquire(timeout=20)
@@ -50,6 +105,8 @@ def pickle_write(filename, value, protocol=0):
             os.rename(filename, filename + '.bak')
             os.rename(tmp, filename)
             os.remove(filename + '.bak')
+        if journal is not None and os.path.exists(journal):
+            os.remove(journal)
     finally:
         lock.release()
 
@@ -0,0 +1,159 @@
+"""A pool of connections to an SQL database, for sharing between threads.
+
+A DB-API connection can't be used by several threads at once (and some
+modules won't let a connection be used by any thread but the one that
+made it), so an SQL classifier used by a threaded server (see
+threadsafe.py) keeps a pool of them.  Each thread that needs the
+database checks a connection out, has it to itself until it checks it
+back in, and may check it out again (getting the same one) in the
+meantime, so that a method that uses the database can call others that
+do:
+
+    pool.acquire()
+    try:
+        c = pool.connection().cursor()
+        ...
+    finally:
+        pool.release()
+
+At most size connections are opened; a thread that wants one when they
+are all checked out waits for one to be checked in.  A connection that
+has been idle for a while is checked, before being handed out, with a
+trivial query, and replaced if that fails (servers close connections
+that have been idle too long).
+"""
+
+# This module is part of the spambayes project, which is Copyright 2002-2007
+# The Python Software Foundation and is covered by the Python Software
+# Foundation license.
+
+import time
+try:
+    import threading
+except ImportError:
+    import dummy_threading as threading
+
+
+class ConnectionPool(object):
+    """Up to size connections, each made by calling connect()."""
+
+    # Connections idle for longer than this many seconds are checked with
+    # the ping query before they're handed out.
+    check_after = 60
+
+    def __init__(self, connect, size=1, ping="select 1"):
+        self.connect = connect
+        self.size = max(1, size)
+        self.ping = ping
+        self._cond = threading.Condition(threading.Lock())
+        # Idle connections, with the time each was checked in.
+        self._idle = []
+        # The connection each thread has checked out, and how many times.
+        self._held = {}
+        # The number of connections open or being opened.
+        self._count = 0
+        self.created = self.replaced = self.waits = 0
+
+    def __repr__(self):
+        return ("ConnectionPool(size=%d, open=%d, created=%d, replaced=%d, "
+                "waits=%d)" % (self.size, self._count, self.created,
+                               self.replaced, self.waits))
+
+    def acquire(self):
+        """Check out a connection for this thread, and return it."""
+        me = threading.currentThread()
+        self._cond.acquire()
+        try:
+            held = self._held.get(me)
+            if held is not None:
+                held[1] += 1
+                return held[0]
+            while not self._idle and self._count >= self.size:
+                self.waits += 1
+                self._cond.wait()
+            if self._idle:
+                conn, since = self._idle.pop()
+            else:
+                conn = since = None
+                self._count += 1
+        finally:
+            self._cond.release()
+
+        # Checking and connecting may take a while, so they're done
+        # without the lock.
+        if conn is not None and time.time() - since > self.check_after \
+           and not self._alive(conn):
+            self._close(conn)
+            self.replaced += 1
+            conn = None
+        if conn is None:
+            try:
+                conn = self.connect()
+            except:
+                self._cond.acquire()
+                try:
+                    self._count -= 1
+                    self._cond.notify()
+                finally:
+                    self._cond.release()
+                raise
+            self.created += 1
+
+        self._cond.acquire()
+        try:
+            self._held[me] = [conn, 1]
+        finally:
+            self._cond.release()
+        return conn
+
+    def release(self):
+        """Check in the connection this thread checked out, if this
+        matches the first acquire()."""
+        me = threading.currentThread()
+        self._cond.acquire()
+        try:
+            held = self._held.get(me)
+            if held is None:
+                raise RuntimeError("release of an unacquired connection")
+            held[1] -= 1
+            if not held[1]:
+                del self._held[me]
+                self._idle.append((held[0], time.time()))
+                self._cond.notify()
+        finally:
+            self._cond.release()
+
+    def connection(self):
+        """Return the connection this thread has checked out."""
+        held = self._held.get(threading.currentThread())
+        if held is None:
+            raise RuntimeError("no connection has been acquired")
+        return held[0]
+
+    def close(self):
+        """Close the idle connections (which should be all of them)."""
+        self._cond.acquire()
+        try:
+            idle = self._idle
+            self._idle = []
+            self._count -= len(idle)
+        finally:
+            self._cond.release()
+        for conn, _since in idle:
+            self._close(conn)
+
+    def _alive(self, conn):
+        try:
+            c = conn.cursor()
+            c.execute(self.ping)
+            c.fetchall()
+        except Exception:
+            return False
+        return True
+
+    def _close(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            # It's probably closed already.
+            pass
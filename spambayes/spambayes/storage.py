@@ -8,6 +8,7 @@ Classes:
     PGClassifier - Classifier that uses postgres
     mySQLClassifier - Classifier that uses mySQL
     CBDClassifier - Classifier that uses CDB
+    TableClassifier - Classifier that uses a read-only token table
     ZODBClassifier - Classifier that uses ZODB
     ZEOClassifier - Classifier that uses ZEO
     Trainer - Classifier training observer
@@ -22,7 +23,9 @@ Abstract:
 
     PickledClassifier is a Classifier class that uses a cPickle
     datastore.  This database is relatively small, but slower than other
-    databases.
+    databases.  Optionally, if [Storage] pickle_journal_percent isn't
+    zero, changes are appended to a journal next to the pickle, which is
+    then only rewritten when the journal gets big.
 
     DBDictClassifier is a Classifier class that uses a database
     store.
@@ -58,14 +61,24 @@ import os
 import sys
 import time
 import types
+import struct
 import tempfile
 from spambayes import classifier
 from spambayes.Options import options, get_pathname_option
 import errno
 import shelve
+try:
+    import threading
+except ImportError:
+    import dummy_threading as threading
 from spambayes import cdb
+from spambayes import tokentable
+from spambayes import bloom
+from spambayes.sqlpool import ConnectionPool
 from spambayes import dbmstorage
-from spambayes.safepickle import pickle_write, pickle_read
+from spambayes.port import md5
+from spambayes.safepickle import pickle_write, pickle_read_journal
+from spambayes.safepickle import journal_write, file_stamp
 
 # Make shelve use binary pickles by default.
 oldShelvePickler = shelve.Pickler
@@ -77,8 +90,54 @@ PICKLE_TYPE = 1
 NO_UPDATEPROBS = False   # Probabilities will not be autoupdated with training
 UPDATEPROBS = True       # Probabilities will be autoupdated with training
 
+# Databases created with the [Storage] x-hash_tokens option store the first
+# eight bytes of the MD5 digest of each token rather than the token itself.
+# HASHED_KEY marks such a database, and, if the text of the tokens is being
+# kept, it is stored under TEXT_PREFIX + the hash.
+HASHED_KEY = 'hashed tokens'
+TEXT_PREFIX = 'text '
+HASH_SIZE = 8
+
+class HashedToken(str):
+    """The hash of a token whose text wasn't kept.
+
+    A hashed-token database lists these as its words, when it can't give
+    the tokens themselves.  Passing one back where a token is expected
+    uses the hash as it is, rather than hashing it again.
+    """
+    __slots__ = ()
+
+def token_hash(word):
+    """Return the key a hashed-token database stores word under."""
+    if isinstance(word, HashedToken):
+        return word
+    if isinstance(word, unicode):
+        word = word.encode("utf-8")
+    return md5(word).digest()[:HASH_SIZE]
+
+def token_text(word):
+    """Return the text to keep for word, or None if it's already a hash."""
+    if isinstance(word, HashedToken):
+        return None
+    if isinstance(word, unicode):
+        word = word.encode("utf-8")
+    return word
+
+def _hashing_options():
+    """Return (hash_tokens, keep_token_text) for a new database."""
+    hash_tokens = options["Storage", "x-hash_tokens"]
+    keep_text = hash_tokens and options["Storage", "x-hash_tokens_keep_text"]
+    return hash_tokens, keep_text
+
 class PickledClassifier(classifier.Classifier):
-    '''Classifier object persisted in a pickle'''
+    '''Classifier object persisted in a pickle
+
+    If [Storage] pickle_journal_percent is set, then rather than pickling
+    everything each time, store() appends the records changed since the
+    last time to a journal next to the pickle (see _journal_entries()),
+    which load() applies, until the journal would be bigger than that
+    percentage of the pickle; then compact() writes a new pickle, and
+    removes the journal.  Otherwise store() always calls compact().'''
 
     def __init__(self, db_name):
         classifier.Classifier.__init__(self)
@@ -100,8 +159,15 @@ class PickledClassifier(classifier.Classifier):
         if options["globals", "verbose"]:
             print >> sys.stderr, 'Loading state from', self.db_name, 'pickle'
 
+        # The words changed since the journal was written, the length of
+        # the journal that belongs to the pickle and has been read, and
+        # the stamp of the pickle (None if there isn't one yet).
+        self.unsaved = {}
+        self.journal_size = 0
+        self.stamp = None
         try:
-            tempbayes = pickle_read(self.db_name)
+            tempbayes, journal, stamp = pickle_read_journal(
+                self.db_name, self.db_name + JOURNAL_SUFFIX)
         except:
             tempbayes = None
 
@@ -111,6 +177,8 @@ class PickledClassifier(classifier.Classifier):
             # PickledClassifier that overrides __setstate__.
             classifier.Classifier.__setstate__(self,
                                                tempbayes.__getstate__())
+            self.stamp = stamp
+            self._read_journal(journal)
             if options["globals", "verbose"]:
                 print >> sys.stderr, ('%s is an existing pickle,'
                                       ' with %d ham and %d spam') \
@@ -119,31 +187,260 @@ class PickledClassifier(classifier.Classifier):
             # new pickle
             if options["globals", "verbose"]:
                 print >> sys.stderr, self.db_name,'is a new pickle'
-            self.wordinfo = {}
+            self.wordinfo = self._new_wordinfo()
             self.nham = 0
             self.nspam = 0
 
     def store(self):
-        '''Store self as a pickle'''
+        '''Store the changes in the journal, or self as a pickle'''
+        if not self._write_journal():
+            self.compact()
+
+    def compact(self):
+        '''Store self as a pickle, and remove the journal'''
 
         if options["globals", "verbose"]:
             print >> sys.stderr, 'Persisting', self.db_name, 'as a pickle'
 
-        pickle_write(self.db_name, self, PICKLE_TYPE)
+        pickle_write(self.db_name, self, PICKLE_TYPE,
+                     self.db_name + JOURNAL_SUFFIX)
+        self.stamp = file_stamp(self.db_name)
+        self.journal_size = 0
+        self.unsaved = {}
+
+    def _read_journal(self, data):
+        '''Apply the changes in the journal data to the records in
+        memory, if it belongs to the pickle'''
+        entries, size = _journal_entries(data)
+        if not entries:
+            return
+        if entries[0] != (JOURNAL_KEY, self.stamp):
+            if options["globals", "verbose"]:
+                print >> sys.stderr, 'Ignoring the journal of', \
+                      self.db_name, 'as it belongs to an older pickle'
+            return
+        self.journal_size = size
+        for key, value in entries[1:]:
+            if key == STATE_KEY:
+                self.nspam, self.nham = [int(i) for i in value.split(',')]
+            elif value:
+                counts = tuple([int(i) for i in value.split(',')])
+                if len(counts) == 3:
+                    record = classifier.TimedWordInfo()
+                else:
+                    record = self.WordInfoClass()
+                record.__setstate__(counts)
+                self.wordinfo[_journal_word(key)] = record
+            else:
+                try:
+                    del self.wordinfo[_journal_word(key)]
+                except KeyError:
+                    pass
+        if options["globals", "verbose"]:
+            print >> sys.stderr, 'Read %d changes from the journal of %s' % \
+                  (len(entries) - 1, self.db_name)
+
+    def _write_journal(self):
+        '''Append the changes since the last store() to the journal, and
+        return True, or return False if there's no pickle yet, or if the
+        journal would get too big'''
+        if self.stamp is None:
+            return False
+        entries = []
+        for word in self.unsaved:
+            record = self.wordinfo.get(word)
+            if record is None:
+                value = ""
+            else:
+                value = ",".join([str(i) for i in record.__getstate__()])
+            entries.append(_journal_entry(_journal_key(word), value))
+        entries.append(_journal_entry(STATE_KEY, "%d,%d" %
+                                      (self.nspam, self.nham)))
+        pickle_size = int(self.stamp.split(',')[1])
+        size = _append_journal(self.db_name, self.journal_size, entries,
+                               self.stamp, pickle_size,
+                               options["Storage", "pickle_journal_percent"])
+        if size is None:
+            return False
+        self.journal_size = size
+        self.unsaved = {}
+        return True
+
+    def _wordinfoset(self, word, record):
+        self.wordinfo[word] = record
+        self.unsaved[word] = True
+
+    def _wordinfodel(self, word):
+        del self.wordinfo[word]
+        self.unsaved[word] = True
 
     def close(self):
         # we keep no resources open - nothing to do
         pass
 
+def _dbm_keys(db):
+    """Generate the keys of the dbm db, one at a time where the dbm module
+    can go through them without listing them all first."""
+    if hasattr(db, "firstkey"):
+        # gdbm
+        key = db.firstkey()
+        while key is not None:
+            yield key
+            key = db.nextkey(key)
+        return
+    try:
+        # bsddb, dumbdbm
+        keys = iter(db)
+    except TypeError:
+        keys = iter(db.keys())
+    for key in keys:
+        yield key
+
 # Values for our changed words map
 WORD_DELETED = "D"
 WORD_CHANGED = "C"
 
 STATE_KEY = 'saved state'
 
+class WordInfoCache(object):
+    """The WordInfo records a DBDictClassifier has read or changed.
+
+    Records read from the database are kept so that they needn't be read
+    (and unpickled) again, but only the most recently used are kept, so
+    that there are at most size records altogether, taking at most
+    maxbytes of memory (roughly estimated), with 0 meaning no limit.
+    Changed records are kept apart from those, and are never thrown away,
+    even if that means going over the limits, until store() has written
+    them and calls written().
+
+    The clean records are kept in a classifier.LRUList.  Several threads
+    may score at once (see threadsafe.py), so a lock guards it.
+    """
+
+    # A rough estimate of the memory used by a cached record, besides its
+    # key:  the list entry, the dict slot, the WordInfo and the key's
+    # string header.
+    ENTRY_BYTES = 250
+
+    def __init__(self, size=0, maxbytes=0):
+        self.size = size
+        self.maxbytes = maxbytes
+        self.hits = self.misses = self.evictions = 0
+        self.nbytes = 0
+        self._lock = threading.Lock()
+        self._dirty = {}
+        self._clean = classifier.LRUList()
+
+    def __repr__(self):
+        return "WordInfoCache(hits=%d, misses=%d, evictions=%d)" % \
+               (self.hits, self.misses, self.evictions)
+
+    def __len__(self):
+        return len(self._clean) + len(self._dirty)
+
+    def __contains__(self, key):
+        return key in self._dirty or key in self._clean
+
+    def __getitem__(self, key):
+        try:
+            return self._dirty[key]
+        except KeyError:
+            return self._clean[key]
+
+    def __setitem__(self, key, record):
+        """Keep a record just read from the database."""
+        self._lock.acquire()
+        try:
+            if key in self._dirty:
+                return
+            if key not in self._clean:
+                self.nbytes += self._cost(key)
+            self._clean.put(key, record)
+            self._trim()
+        finally:
+            self._lock.release()
+
+    def __delitem__(self, key):
+        self._lock.acquire()
+        try:
+            try:
+                del self._dirty[key]
+            except KeyError:
+                if not self._clean.remove(key):
+                    raise KeyError(key)
+            self.nbytes -= self._cost(key)
+        finally:
+            self._lock.release()
+
+    def get(self, key):
+        """Return the record for key, or None if it isn't here."""
+        self._lock.acquire()
+        try:
+            record = self._dirty.get(key)
+            if record is None:
+                record = self._clean.get(key)
+            if record is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return record
+        finally:
+            self._lock.release()
+
+    def change(self, key, record):
+        """Keep a changed record, until written() is called."""
+        self._lock.acquire()
+        try:
+            if not self._clean.remove(key) and key not in self._dirty:
+                self.nbytes += self._cost(key)
+            self._dirty[key] = record
+            self._trim()
+        finally:
+            self._lock.release()
+
+    def written(self):
+        """Note that the changed records have all been written, so that
+        they may be thrown away like the rest."""
+        self._lock.acquire()
+        try:
+            for key, record in self._dirty.iteritems():
+                self._clean.put(key, record)
+            self._dirty = {}
+            self._trim()
+        finally:
+            self._lock.release()
+
+    def hit_rate(self):
+        """Return the fraction of lookups that were answered from the
+        cache."""
+        lookups = self.hits + self.misses
+        if lookups:
+            return float(self.hits) / lookups
+        return 0.0
+
+    # The rest must be called with the lock held.
+
+    def _cost(self, key):
+        return self.ENTRY_BYTES + len(key)
+
+    def _trim(self):
+        """Throw away the least recently used clean records until there
+        are few enough records altogether, or there are none left."""
+        clean = self._clean
+        while clean and \
+              ((self.size and len(self) > self.size) or
+               (self.maxbytes and self.nbytes > self.maxbytes)):
+            key = clean.pop_oldest()
+            self.nbytes -= self._cost(key)
+            self.evictions += 1
+
+
 class DBDictClassifier(classifier.Classifier):
     '''Classifier object persisted in a caching database'''
 
+    # store() writes only the changed records.
+    incremental_store = True
+
     def __init__(self, db_name, mode='c'):
         '''Constructor(database name)'''
 
@@ -160,6 +457,12 @@ class DBDictClassifier(classifier.Classifier):
             pass
         getattr(self.db, "close", noop)()
         getattr(self.dbm, "close", noop)()
+        if options["globals", "verbose"]:
+            print >> sys.stderr, 'Record cache for', self.db_name, \
+                  self.wordinfo
+            if self.bloom is not None:
+                print >> sys.stderr, 'Negative lookup filter for', \
+                      self.db_name, self.bloom
         # should not be a need to drop the 'dbm' or 'db' attributes.
         # but we do anyway, because it makes it more clear what has gone
         # wrong if we try to keep using the database after we have closed
@@ -180,6 +483,16 @@ class DBDictClassifier(classifier.Classifier):
         self.dbm = dbmstorage.open(self.db_name, self.mode)
         self.db = shelve.Shelf(self.dbm)
 
+        if self.db.has_key(HASHED_KEY):
+            self.hash_tokens, self.keep_token_text = self.db[HASHED_KEY]
+        elif self.db.has_key(self.statekey) or self.mode == 'r':
+            # An existing database keeps the form it was created with.
+            self.hash_tokens = self.keep_token_text = False
+        else:
+            self.hash_tokens, self.keep_token_text = _hashing_options()
+            if self.hash_tokens:
+                self.db[HASHED_KEY] = (True, self.keep_token_text)
+
         if self.db.has_key(self.statekey):
             t = self.db[self.statekey]
             if t[0] != classifier.PICKLE_VERSION:
@@ -196,8 +509,21 @@ class DBDictClassifier(classifier.Classifier):
                 print >> sys.stderr, self.db_name,'is a new database'
             self.nspam = 0
             self.nham = 0
-        self.wordinfo = {}
+        self.wordinfo = WordInfoCache(
+            options["Storage", "wordinfo_cache_size"],
+            options["Storage", "wordinfo_cache_memory"] * 1024 * 1024)
         self.changed_words = {} # value may be one of the WORD_ constants
+        self.changed_text = {}
+        self.bloom = None
+        self._load_bloom()
+
+    def _load_bloom(self):
+        """Build the negative lookup filter, if there's to be one, from the
+        keys in the database."""
+        if options["Storage", "x-negative_lookup_filter"]:
+            self.bloom = bloom.build(self.dbm.keys(), self.bloom)
+        else:
+            self.bloom = None
 
     def store(self):
         '''Place state into persistent store'''
@@ -215,6 +541,8 @@ class DBDictClassifier(classifier.Classifier):
             if flag is WORD_CHANGED:
                 val = self.wordinfo[key]
                 self.db[key] = val.__getstate__()
+                if key in self.changed_text:
+                    self.db[TEXT_PREFIX + key] = self.changed_text[key]
             elif flag is WORD_DELETED:
                 assert key not in self.wordinfo, \
                        "Should not have a wordinfo for words flagged for delete"
@@ -223,14 +551,24 @@ class DBDictClassifier(classifier.Classifier):
                     del self.db[key]
                 except KeyError:
                     pass
+                if self.keep_token_text:
+                    try:
+                        del self.db[TEXT_PREFIX + key]
+                    except KeyError:
+                        pass
             else:
                 raise RuntimeError, "Unknown flag value"
 
-        # Reset the changed word list.
+        # Reset the changed word list.  The changed records can now be
+        # thrown out of the cache like any others.
         self.changed_words = {}
+        self.changed_text = {}
+        self.wordinfo.written()
         # Update the global state, then do the actual save.
         self._write_state_key()
         self.db.sync()
+        if self.bloom is not None and self.bloom.full():
+            self._load_bloom()
 
     def _write_state_key(self):
         self.db[self.statekey] = (classifier.PICKLE_VERSION,
@@ -242,20 +580,37 @@ class DBDictClassifier(classifier.Classifier):
         key."""
         self._write_state_key()
 
-    def _wordinfoget(self, word):
+    def _wordkey(self, word):
+        """Return the database key for word."""
+        if self.hash_tokens:
+            return token_hash(word)
         if isinstance(word, unicode):
             word = word.encode("utf-8")
-        try:
-            return self.wordinfo[word]
-        except KeyError:
-            ret = None
-            if self.changed_words.get(word) is not WORD_DELETED:
-                r = self.db.get(word)
-                if r:
-                    ret = self.WordInfoClass()
-                    ret.__setstate__(r)
-                    self.wordinfo[word] = ret
-            return ret
+        return word
+
+    def _wordinfoget(self, word):
+        word = self._wordkey(word)
+        ret = self.wordinfo.get(word)
+        if ret is None and self.changed_words.get(word) is not WORD_DELETED:
+            if self.bloom is not None and not self.bloom.might_contain(word):
+                return None
+            r = self.db.get(word)
+            if r:
+                ret = self._record(r)
+                self.wordinfo[word] = ret
+            elif self.bloom is not None:
+                self.bloom.missed()
+        return ret
+
+    def _record(self, state):
+        """Return a WordInfo record with the given stored state."""
+        if len(state) > 2:
+            # The record has a last-seen day.
+            record = classifier.TimedWordInfo()
+        else:
+            record = self.WordInfoClass()
+        record.__setstate__(state)
+        return record
 
     def _wordinfoset(self, word, record):
         # "Singleton" words (i.e. words that only have a single instance)
@@ -267,10 +622,16 @@ class DBDictClassifier(classifier.Classifier):
         # This seems to reduce the memory footprint of the DBDictClassifier by
         # as much as 60%!!!  This also has the effect of reducing the time it
         # takes to store the database
-        if isinstance(word, unicode):
-            word = word.encode("utf-8")
+        text = None
+        if self.keep_token_text:
+            text = token_text(word)
+        word = self._wordkey(word)
+        if self.bloom is not None:
+            self.bloom.add(word)
         if record.spamcount + record.hamcount <= 1:
             self.db[word] = record.__getstate__()
+            if text is not None:
+                self.db[TEXT_PREFIX + word] = text
             try:
                 del self.changed_words[word]
             except KeyError:
@@ -284,35 +645,187 @@ class DBDictClassifier(classifier.Classifier):
                 pass
 
         else:
-            self.wordinfo[word] = record
+            self.wordinfo.change(word, record)
             self.changed_words[word] = WORD_CHANGED
+            if text is not None:
+                self.changed_text[word] = text
 
     def _wordinfodel(self, word):
-        if isinstance(word, unicode):
-            word = word.encode("utf-8")
-        del self.wordinfo[word]
+        word = self._wordkey(word)
+        try:
+            del self.wordinfo[word]
+        except KeyError:
+            # The record may have been thrown out of the cache since it
+            # was read.
+            pass
         self.changed_words[word] = WORD_DELETED
+        try:
+            del self.changed_text[word]
+        except KeyError:
+            pass
+
+    def _note_seen(self, clues):
+        # A read-only database can't record anything.
+        if self.mode != 'r':
+            classifier.Classifier._note_seen(self, clues)
+
+    def prune(self, days, threshold=2, include_unknown=False):
+        # The records are read straight from the database, rather than
+        # through the wordinfo cache, so that the cache doesn't end up
+        # holding the whole database.  So any changes must be written
+        # out first.
+        self.store()
+        cutoff = classifier.today() - days
+        removed = 0
+        for word in self._wordinfokeys():
+            key = self._wordkey(word)
+            record = self._record(self.db[key])
+            if self._prunable(record, cutoff, threshold, include_unknown):
+                del self.db[key]
+                if self.keep_token_text:
+                    try:
+                        del self.db[TEXT_PREFIX + key]
+                    except KeyError:
+                        pass
+                try:
+                    del self.wordinfo[key]
+                except KeyError:
+                    pass
+                removed += 1
+        self.db.sync()
+        if removed:
+            self.generation += 1
+        return removed
 
     def _wordinfokeys(self):
         wordinfokeys = self.db.keys()
         del wordinfokeys[wordinfokeys.index(self.statekey)]
+        if self.hash_tokens:
+            # Give the text of each token, where it's been kept.
+            texts = {}
+            if self.keep_token_text:
+                for key in wordinfokeys:
+                    if key.startswith(TEXT_PREFIX) and \
+                       len(key) == len(TEXT_PREFIX) + HASH_SIZE:
+                        texts[key[len(TEXT_PREFIX):]] = self.db[key]
+            wordinfokeys = [texts.get(key) or HashedToken(key)
+                            for key in wordinfokeys if len(key) == HASH_SIZE]
         return wordinfokeys
 
+    def _wordinfoitems(self, batch=1000):
+        # The keys are walked through one at a time, where the dbm module
+        # allows it, and each record is read (but not cached) as its key
+        # comes up, rather than listing all the keys first.  The changed
+        # records that haven't been stored come last.
+        changed = self.changed_words
+        for key in _dbm_keys(self.dbm):
+            if key in changed:
+                continue
+            if self.hash_tokens:
+                # Which also skips the TEXT_PREFIX keys.
+                if len(key) != HASH_SIZE:
+                    continue
+            elif key in (self.statekey, HASHED_KEY):
+                continue
+            state = self.db.get(key)
+            if state:
+                yield self._keyword(key), self._record(state)
+        for key, flag in changed.items():
+            if flag is WORD_CHANGED:
+                yield self._keyword(key), self.wordinfo[key]
+
+    def _keyword(self, key):
+        """Return the word for the database key of a token record."""
+        if not self.hash_tokens:
+            return key
+        text = self.changed_text.get(key)
+        if text is None and self.keep_token_text:
+            text = self.db.get(TEXT_PREFIX + key)
+        return text or HashedToken(key)
+
 
 class SQLClassifier(classifier.Classifier):
+    # Not all the database modules let threads share a connection, so each
+    # thread uses one from a pool (see sqlpool.py), and scoring can only
+    # go on in several threads at once if the pool has more than one.
+    concurrent_reads = False
+
+    # Scoring or training on a message fetches all its tokens in as few
+    # queries as possible, rather than one query each.
+    batch_lookups = True
+
+    # store() writes only the changed records.
+    incremental_store = True
+
+    # The placeholder for parameters in queries (the database module's
+    # paramstyle).
+    _PARAM = "%s"
+
+    # The columns of the bayes table that make up a record (see _row() and
+    # _record()).
+    _RECORD_COLUMNS = ("word", "nspam", "nham")
+
+    # The most tokens asked for in one query.
+    _LOOKUP_BATCH = 500
+
     def __init__(self, db_name):
         '''Constructor(database name)'''
 
         classifier.Classifier.__init__(self)
         self.statekey = STATE_KEY
         self.db_name = db_name
+        self.hash_tokens = self.keep_token_text = False
+        self.bloom = None
+        self.pool = None
+        # The text of the lookup queries, by the number of keys.
+        self._lookup_queries = {}
+        # The changed records, by key (None for deleted ones), and the text
+        # of changed hashed tokens, until they're written by _flush().
+        self.pending = {}
+        self.pending_text = {}
         self.load()
 
     def close(self):
         '''Release all database resources'''
         # As we (presumably) aren't as constrained as we are by file locking,
         # don't force sub-classes to override
-        pass
+        self._report_bloom()
+        if self.pool is not None:
+            if options["globals", "verbose"]:
+                print >> sys.stderr, 'Connections to', self.db_name, \
+                      self.pool
+            self.pool.close()
+
+    def _connect(self):
+        '''Return a new connection to the database'''
+        raise NotImplementedError, "must be implemented in subclass"
+
+    def _open_pool(self):
+        '''Make the pool of connections, if it hasn't been made'''
+        if self.pool is None:
+            self.pool = ConnectionPool(self._connect,
+                                       options["Storage", "sql_pool_size"])
+            self.concurrent_reads = self.pool.size > 1
+
+    def _load_bloom(self):
+        '''Build the negative lookup filter, if there's to be one, from
+        the keys in the database'''
+        if options["Storage", "x-negative_lookup_filter"]:
+            self.pool.acquire()
+            try:
+                c = self.cursor()
+                c.execute("select word from bayes")
+                keys = [r[0] for r in c.fetchall()]
+            finally:
+                self.pool.release()
+            self.bloom = bloom.build(keys, self.bloom)
+        else:
+            self.bloom = None
+
+    def _report_bloom(self):
+        if self.bloom is not None and options["globals", "verbose"]:
+            print >> sys.stderr, 'Negative lookup filter for', \
+                  self.db_name, self.bloom
 
     def load(self):
         '''Load state from the database'''
@@ -320,11 +833,53 @@ class SQLClassifier(classifier.Classifier):
 
     def store(self):
         '''Save state to the database'''
+        self._flush()
         self._set_row(self.statekey, self.nspam, self.nham)
+        if self.bloom is not None and self.bloom.full():
+            self._load_bloom()
+
+    def _post_training(self):
+        '''Write the records changed by training, all in one
+        transaction'''
+        self._flush()
+
+    def _flush(self):
+        if self.pending:
+            self.pool.acquire()
+            try:
+                c = self.cursor()
+                self._write_pending(c)
+                self.commit(c)
+            finally:
+                self.pool.release()
+
+    def _write_pending(self, c):
+        '''Write the changed records, with as few statements as possible,
+        but don't commit them'''
+        p = self._PARAM
+        keys = [(key,) for key in self.pending]
+        rows = [self._row(key, record)
+                for key, record in self.pending.iteritems()
+                if record is not None]
+        # Not all databases can insert or update in one statement, so the
+        # old rows are deleted first.
+        c.executemany("delete from bayes where word=%s" % (p,), keys)
+        c.executemany("insert into bayes (%s) values (%s)" %
+                      (", ".join(self._RECORD_COLUMNS),
+                       ", ".join([p] * len(self._RECORD_COLUMNS))), rows)
+        if self.keep_token_text:
+            c.executemany("delete from bayes_text where word=%s" % (p,),
+                          keys)
+            c.executemany("insert into bayes_text (word, text)"
+                          "  values (%s, %s)" % (p, p),
+                          self.pending_text.items())
+        self.pending = {}
+        self.pending_text = {}
 
     def cursor(self):
-        '''Return a new db cursor'''
-        raise NotImplementedError, "must be implemented in subclass"
+        '''Return a new db cursor, on the connection this thread has
+        acquired from the pool'''
+        return self.pool.connection().cursor()
 
     def fetchall(self, c):
         '''Return all rows as a dict'''
@@ -332,25 +887,59 @@ class SQLClassifier(classifier.Classifier):
 
     def commit(self, c):
         '''Commit the current transaction - may commit at db or cursor'''
-        raise NotImplementedError, "must be implemented in subclass"
+        self.pool.connection().commit()
 
     def create_bayes(self):
         '''Create a new bayes table'''
-        c = self.cursor()
-        c.execute(self.table_definition)
-        self.commit(c)
+        self.pool.acquire()
+        try:
+            c = self.cursor()
+            c.execute(self.table_definition)
+            self.commit(c)
+        finally:
+            self.pool.release()
+
+    def _load_token_hashing(self, is_new):
+        '''Find out whether the database holds hashed tokens
+
+        The hashing is recorded in a row of its own, with nspam set and
+        nham giving whether the text of the tokens is kept (in the
+        bayes_text table).'''
+        self.hash_tokens = self.keep_token_text = False
+        if self._has_key(HASHED_KEY):
+            record = self._wordinfoget(HASHED_KEY)
+            self.hash_tokens = True
+            self.keep_token_text = bool(record.hamcount)
+        elif is_new:
+            hash_tokens, keep_text = _hashing_options()
+            if hash_tokens:
+                self._set_row(HASHED_KEY, 1, int(keep_text))
+                if keep_text:
+                    self.pool.acquire()
+                    try:
+                        c = self.cursor()
+                        c.execute(self.text_table_definition)
+                        self.commit(c)
+                    finally:
+                        self.pool.release()
+                self.hash_tokens = hash_tokens
+                self.keep_token_text = keep_text
 
     def _get_row(self, word):
         '''Return row matching word'''
+        self.pool.acquire()
         try:
-            c = self.cursor()
-            c.execute("select * from bayes"
-                      "  where word=%s",
-                      (word,))
-        except Exception, e:
-            print >> sys.stderr, "error:", (e, word)
-            raise
-        rows = self.fetchall(c)
+            try:
+                c = self.cursor()
+                c.execute("select * from bayes"
+                          "  where word=%s",
+                          (word,))
+            except Exception, e:
+                print >> sys.stderr, "error:", (e, word)
+                raise
+            rows = self.fetchall(c)
+        finally:
+            self.pool.release()
 
         if rows:
             return rows[0]
@@ -358,60 +947,220 @@ class SQLClassifier(classifier.Classifier):
             return {}
 
     def _set_row(self, word, nspam, nham):
-        c = self.cursor()
-        if self._has_key(word):
-            c.execute("update bayes"
-                      "  set nspam=%s,nham=%s"
-                      "  where word=%s",
-                      (nspam, nham, word))
-        else:
-            c.execute("insert into bayes"
-                      "  (nspam, nham, word)"
-                      "  values (%s, %s, %s)",
-                      (nspam, nham, word))
-        self.commit(c)
-
-    def _delete_row(self, word):
-        c = self.cursor()
-        c.execute("delete from bayes"
-                  "  where word=%s",
-                  (word,))
-        self.commit(c)
+        self.pool.acquire()
+        try:
+            c = self.cursor()
+            if self._has_key(word):
+                c.execute("update bayes"
+                          "  set nspam=%s,nham=%s"
+                          "  where word=%s",
+                          (nspam, nham, word))
+            else:
+                c.execute("insert into bayes"
+                          "  (nspam, nham, word)"
+                          "  values (%s, %s, %s)",
+                          (nspam, nham, word))
+            self.commit(c)
+        finally:
+            self.pool.release()
 
     def _has_key(self, key):
-        c = self.cursor()
-        c.execute("select word from bayes"
-                  "  where word=%s",
-                  (key,))
-        return len(self.fetchall(c)) > 0
-
-    def _wordinfoget(self, word):
+        self.pool.acquire()
+        try:
+            c = self.cursor()
+            c.execute("select word from bayes"
+                      "  where word=%s",
+                      (key,))
+            return len(self.fetchall(c)) > 0
+        finally:
+            self.pool.release()
+
+    def _row(self, key, record):
+        '''Return the values of the _RECORD_COLUMNS for record'''
+        return (key, record.spamcount, record.hamcount)
+
+    def _record(self, row):
+        '''Return a WordInfo record for a row of the _RECORD_COLUMNS'''
+        record = self.WordInfoClass()
+        record.__setstate__((int(row[1]), int(row[2])))
+        return record
+
+    def _wordkey(self, word):
+        '''Return the database key for word'''
+        # Hashes are stored in hex, so that they can go in a text column.
+        if self.hash_tokens:
+            return token_hash(word).encode("hex")
         if isinstance(word, unicode):
             word = word.encode("utf-8")
+        return word
 
-        row = self._get_row(word)
-        if row:
-            item = self.WordInfoClass()
-            item.__setstate__((row["nspam"], row["nham"]))
-            return item
-        else:
-            return self.WordInfoClass()
+    def _wordinfoget(self, word):
+        return self._wordinfoget_many([word]).get(word)
+
+    def _wordinfoget_many(self, words):
+        records = {}
+        keys = {}
+        for word in words:
+            key = self._wordkey(word)
+            try:
+                record = self.pending[key]
+            except KeyError:
+                if self.bloom is None or self.bloom.might_contain(key):
+                    keys[key] = word
+            else:
+                if record is not None:
+                    records[word] = record
+        if not keys:
+            return records
+        keys_list = keys.keys()
+        found = 0
+        self.pool.acquire()
+        try:
+            c = self.cursor()
+            for i in xrange(0, len(keys_list), self._LOOKUP_BATCH):
+                batch = keys_list[i:i+self._LOOKUP_BATCH]
+                # The batch is padded (with repeats of a key, which don't
+                # change the answer) to one of the few _lookup_sizes().
+                n = self._lookup_size(len(batch))
+                batch.extend(batch[:1] * (n - len(batch)))
+                c.execute(self._lookup_query(n), batch)
+                for row in c.fetchall():
+                    # MySQL compares words without regard to case (or
+                    # trailing spaces), so a row may be for a word that
+                    # only looks like one asked for.
+                    word = keys.get(str(row[0]))
+                    if word is None:
+                        continue
+                    records[word] = self._record(row)
+                    found += 1
+        finally:
+            self.pool.release()
+        if self.bloom is not None and found < len(keys):
+            self.bloom.missed(len(keys) - found)
+        return records
+
+    def _lookup_size(self, n):
+        '''Return the number of keys to look up n keys with:  the next
+        power of two, or _LOOKUP_BATCH'''
+        size = 1
+        while size < n:
+            size *= 2
+        return min(size, self._LOOKUP_BATCH)
+
+    def _lookup_query(self, n):
+        '''Return the query that fetches the records of n keys'''
+        # Only the text of the queries is kept, here, so that it's only
+        # built once; the DB-API has no portable way to prepare a
+        # statement.  sqlite3 keeps a cache of prepared statements on each
+        # connection, keyed by their text, and with the keys padded to
+        # _lookup_size() there are few enough queries for them all to stay
+        # in it.  psycopg and MySQLdb send the text to the server each
+        # time.
+        try:
+            return self._lookup_queries[n]
+        except KeyError:
+            query = ("select %s from bayes where word in (%s)" %
+                     (", ".join(self._RECORD_COLUMNS),
+                      ",".join([self._PARAM] * n)))
+            self._lookup_queries[n] = query
+            return query
 
     def _wordinfoset(self, word, record):
-        if isinstance(word, unicode):
-            word = word.encode("utf-8")
-        self._set_row(word, record.spamcount, record.hamcount)
+        key = self._wordkey(word)
+        if self.bloom is not None:
+            self.bloom.add(key)
+        if self.keep_token_text:
+            text = token_text(word)
+            if text is not None:
+                self.pending_text[key] = text
+        self.pending[key] = record
 
     def _wordinfodel(self, word):
-        if isinstance(word, unicode):
-            word = word.encode("utf-8")
-        self._delete_row(word)
+        key = self._wordkey(word)
+        self.pending[key] = None
+        try:
+            del self.pending_text[key]
+        except KeyError:
+            pass
 
     def _wordinfokeys(self):
-        c = self.cursor()
-        c.execute("select word from bayes")
-        rows = self.fetchall(c)
-        return [r[0] for r in rows]
+        self.pool.acquire()
+        try:
+            c = self.cursor()
+            c.execute("select word from bayes")
+            keys = dict([(str(r[0]), 1) for r in c.fetchall()])
+            texts = {}
+            if self.hash_tokens and self.keep_token_text:
+                c.execute("select word, text from bayes_text")
+                for r in c.fetchall():
+                    texts[str(r[0])] = r[1]
+        finally:
+            self.pool.release()
+        for key, record in self.pending.iteritems():
+            if record is None:
+                keys.pop(key, None)
+            else:
+                keys[key] = 1
+        keys.pop(self.statekey, None)
+        keys.pop(HASHED_KEY, None)
+        if not self.hash_tokens:
+            return keys.keys()
+        texts.update(self.pending_text)
+        return [texts.get(key) or HashedToken(key.decode("hex"))
+                for key in keys if len(key) == 2 * HASH_SIZE]
+
+    def _wordinfoitems(self, batch=1000):
+        # The records are fetched a batch at a time, in key order, each
+        # batch starting after the last key of the one before, so that no
+        # query is left open in between.
+        texts = {}
+        if self.hash_tokens and self.keep_token_text:
+            self.pool.acquire()
+            try:
+                c = self.cursor()
+                c.execute("select word, text from bayes_text")
+                for r in c.fetchall():
+                    texts[str(r[0])] = r[1]
+            finally:
+                self.pool.release()
+            texts.update(self.pending_text)
+        query = "select %s from bayes%%s order by word limit %d" % \
+                (", ".join(self._RECORD_COLUMNS), batch)
+        after = " where word > %s" % (self._PARAM,)
+        rows = None
+        while rows is None or len(rows) == batch:
+            self.pool.acquire()
+            try:
+                c = self.cursor()
+                if rows is None:
+                    c.execute(query % ("",))
+                else:
+                    c.execute(query % (after,), (str(rows[-1][0]),))
+                rows = c.fetchall()
+            finally:
+                self.pool.release()
+            for row in rows:
+                key = str(row[0])
+                if key not in self.pending:
+                    word = self._keyword(key, texts)
+                    if word is not None:
+                        yield word, self._record(row)
+        for key, record in self.pending.items():
+            if record is not None:
+                word = self._keyword(key, texts)
+                if word is not None:
+                    yield word, record
+
+    def _keyword(self, key, texts):
+        '''Return the word a key of the bayes table is for, or None for
+        the special keys'''
+        if self.hash_tokens:
+            if len(key) != 2 * HASH_SIZE:
+                return None
+            return texts.get(key) or HashedToken(key.decode("hex"))
+        if key in (self.statekey, HASHED_KEY):
+            return None
+        return key
 
 
 class PGClassifier(SQLClassifier):
@@ -423,16 +1172,19 @@ class PGClassifier(SQLClassifier):
                                  "  nham integer not null default 0,"
                                  "  primary key(word)"
                                  ")")
+        self.text_table_definition = ("create table bayes_text ("
+                                      "  word bytea not null default '',"
+                                      "  text bytea not null default '',"
+                                      "  primary key(word)"
+                                      ")")
         SQLClassifier.__init__(self, db_name)
 
-    def cursor(self):
-        return self.db.cursor()
-
     def fetchall(self, c):
         return c.dictfetchall()
 
-    def commit(self, _c):
-        self.db.commit()
+    def _connect(self):
+        import psycopg
+        return psycopg.connect('dbname=' + self.db_name)
 
     def load(self):
         '''Load state from database'''
@@ -442,16 +1194,20 @@ class PGClassifier(SQLClassifier):
         if options["globals", "verbose"]:
             print >> sys.stderr, 'Loading state from', self.db_name, 'database'
 
-        self.db = psycopg.connect('dbname=' + self.db_name)
-
-        c = self.cursor()
+        self._open_pool()
+        self.pool.acquire()
         try:
-            c.execute("select count(*) from bayes")
-        except psycopg.ProgrammingError:
-            self.db.rollback()
-            self.create_bayes()
-
-        if self._has_key(self.statekey):
+            c = self.cursor()
+            try:
+                c.execute("select count(*) from bayes")
+            except psycopg.ProgrammingError:
+                self.pool.connection().rollback()
+                self.create_bayes()
+        finally:
+            self.pool.release()
+
+        is_new = not self._has_key(self.statekey)
+        if not is_new:
             row = self._get_row(self.statekey)
             self.nspam = row["nspam"]
             self.nham = row["nham"]
@@ -465,6 +1221,8 @@ class PGClassifier(SQLClassifier):
                 print >> sys.stderr, self.db_name,'is a new database'
             self.nspam = 0
             self.nham = 0
+        self._load_token_hashing(is_new)
+        self._load_bloom()
 
 
 class mySQLClassifier(SQLClassifier):
@@ -480,6 +1238,11 @@ class mySQLClassifier(SQLClassifier):
                                  "  nham integer not null default 0,"
                                  "  primary key(word)"
                                  ");")
+        self.text_table_definition = ("create table bayes_text ("
+                                      "  word varchar(16) not null default '',"
+                                      "  text varchar(255) not null default '',"
+                                      "  primary key(word)"
+                                      ");")
         self.host = "localhost"
         self.username = "root"
         self.password = ""
@@ -499,14 +1262,17 @@ class mySQLClassifier(SQLClassifier):
                 self.charset = info[8:]
         SQLClassifier.__init__(self, db_name)
 
-    def cursor(self):
-        return self.db.cursor()
-
     def fetchall(self, c):
         return c.fetchall()
 
-    def commit(self, _c):
-        self.db.commit()
+    def _connect(self):
+        import MySQLdb
+        params = {
+          'host': self.host, 'db': self.db_name,
+          'user': self.username, 'passwd': self.password,
+          'charset': self.charset
+        }
+        return MySQLdb.connect(**params)
 
     def load(self):
         '''Load state from database'''
@@ -516,27 +1282,26 @@ class mySQLClassifier(SQLClassifier):
         if options["globals", "verbose"]:
             print >> sys.stderr, 'Loading state from', self.db_name, 'database'
 
-        params = {
-          'host': self.host, 'db': self.db_name,
-          'user': self.username, 'passwd': self.password,
-          'charset': self.charset
-        }
-        self.db = MySQLdb.connect(**params)
-
-        c = self.cursor()
+        self._open_pool()
+        self.pool.acquire()
         try:
-            c.execute("select count(*) from bayes")
-        except MySQLdb.ProgrammingError:
+            c = self.cursor()
             try:
-                self.db.rollback()
-            except MySQLdb.NotSupportedError:
-                # Server doesn't support rollback, so just assume that
-                # we can keep going and create the db.  This should only
-                # happen once, anyway.
-                pass
-            self.create_bayes()
+                c.execute("select count(*) from bayes")
+            except MySQLdb.ProgrammingError:
+                try:
+                    self.pool.connection().rollback()
+                except MySQLdb.NotSupportedError:
+                    # Server doesn't support rollback, so just assume that
+                    # we can keep going and create the db.  This should only
+                    # happen once, anyway.
+                    pass
+                self.create_bayes()
+        finally:
+            self.pool.release()
 
-        if self._has_key(self.statekey):
+        is_new = not self._has_key(self.statekey)
+        if not is_new:
             row = self._get_row(self.statekey)
             self.nspam = int(row[1])
             self.nham = int(row[2])
@@ -550,19 +1315,228 @@ class mySQLClassifier(SQLClassifier):
                 print >> sys.stderr, self.db_name,'is a new database'
             self.nspam = 0
             self.nham = 0
+        self._load_token_hashing(is_new)
+        self._load_bloom()
 
-    def _wordinfoget(self, word):
-        if isinstance(word, unicode):
-            word = word.encode("utf-8")
 
-        row = self._get_row(word)
-        if row:
-            item = self.WordInfoClass()
-            item.__setstate__((row[1], row[2]))
-            return item
-        else:
-            return None
+class SQLiteClassifier(SQLClassifier):
+    '''Classifier object persisted in an SQLite database
 
+    Unlike the other SQL classifiers, this needs no database server: the
+    database is a single file, which is put in WAL mode, so that scoring
+    in other processes isn't held up while it's being written.  As with
+    a dbm database, changes are kept in memory until store(), which
+    writes them all in one transaction.  The records keep the last-seen
+    day, for [Classifier] x-track_last_seen.'''
+
+    _PARAM = "?"
+    _RECORD_COLUMNS = ("word", "nspam", "nham", "lastseen")
+
+    # SQLite allows 999 parameters by default.
+    _LOOKUP_BATCH = 500
+
+    def __init__(self, db_name):
+        self.table_definition = ("create table bayes ("
+                                 "  word text not null primary key,"
+                                 "  nspam integer not null default 0,"
+                                 "  nham integer not null default 0,"
+                                 "  lastseen integer not null default 0"
+                                 ")")
+        self.text_table_definition = ("create table bayes_text ("
+                                      "  word text not null primary key,"
+                                      "  text text not null default ''"
+                                      ")")
+        SQLClassifier.__init__(self, db_name)
+
+    def fetchall(self, c):
+        return c.fetchall()
+
+    def _connect(self):
+        try:
+            import sqlite3
+        except ImportError:
+            from pysqlite2 import dbapi2 as sqlite3
+        # The pool makes sure only one thread uses a connection at a time,
+        # but not always the thread that made it.
+        db = sqlite3.connect(self.db_name, check_same_thread=False)
+        # Tokens aren't necessarily valid UTF-8, so keep them as they are.
+        db.text_factory = str
+        db.execute("pragma journal_mode=wal")
+        # With WAL, this is still safe from corruption, and only a power
+        # cut can lose the last transaction.
+        db.execute("pragma synchronous=normal")
+        return db
+
+    def load(self):
+        '''Load state from database'''
+
+        try:
+            import sqlite3
+        except ImportError:
+            from pysqlite2 import dbapi2 as sqlite3
+
+        if options["globals", "verbose"]:
+            print >> sys.stderr, 'Loading state from', self.db_name, 'database'
+
+        # Any changes that weren't stored are lost.
+        self.pending = {}
+        self.pending_text = {}
+
+        self._open_pool()
+        self.pool.acquire()
+        try:
+            c = self.cursor()
+            try:
+                c.execute("select count(*) from bayes")
+            except sqlite3.OperationalError:
+                self.create_bayes()
+
+            is_new = not self._has_key(self.statekey)
+            if not is_new:
+                row = self._get_row(self.statekey)
+                self.nspam = row[1]
+                self.nham = row[2]
+                if options["globals", "verbose"]:
+                    print >> sys.stderr, ('%s is an existing database,'
+                                          ' with %d spam and %d ham') \
+                          % (self.db_name, self.nspam, self.nham)
+            else:
+                # new database
+                if options["globals", "verbose"]:
+                    print >> sys.stderr, self.db_name,'is a new database'
+                self.nspam = 0
+                self.nham = 0
+            self._load_token_hashing(is_new)
+            self.commit(c)
+        finally:
+            self.pool.release()
+        self._load_bloom()
+
+    def store(self):
+        '''Save state to the database'''
+        if options["globals", "verbose"]:
+            print >> sys.stderr, 'Persisting', self.db_name,
+            print >> sys.stderr, 'state in database'
+        self.pool.acquire()
+        try:
+            c = self.cursor()
+            self._write_pending(c)
+            c.execute("insert or replace into bayes"
+                      "  (word, nspam, nham) values (?, ?, ?)",
+                      (self.statekey, self.nspam, self.nham))
+            self.commit(c)
+        finally:
+            self.pool.release()
+        if self.bloom is not None and self.bloom.full():
+            self._load_bloom()
+
+    def _post_training(self):
+        # The changes are kept until store().
+        pass
+
+    def _get_row(self, word):
+        self.pool.acquire()
+        try:
+            c = self.cursor()
+            c.execute("select * from bayes where word=?", (word,))
+            return c.fetchone()
+        finally:
+            self.pool.release()
+
+    def _set_row(self, word, nspam, nham):
+        self.pool.acquire()
+        try:
+            c = self.cursor()
+            c.execute("insert or replace into bayes"
+                      "  (word, nspam, nham) values (?, ?, ?)",
+                      (word, nspam, nham))
+        finally:
+            self.pool.release()
+
+    def _has_key(self, key):
+        return self._get_row(key) is not None
+
+    def _row(self, key, record):
+        return (key, record.spamcount, record.hamcount,
+                getattr(record, "lastseen", 0))
+
+    def _record(self, row):
+        if row[3]:
+            record = classifier.TimedWordInfo()
+            record.__setstate__(row[1:])
+        else:
+            record = self.WordInfoClass()
+            record.__setstate__(row[1:3])
+        return record
+
+
+# A CDB database or a pickle may have a journal of the changes made since
+# the file was written, in a file named after it with JOURNAL_SUFFIX.  The
+# journal is a series of (key, value) entries, each stored as in a CDB
+# file:  the lengths of the key and value as 32-bit little-endian numbers,
+# then the key and the value.  The first entry has JOURNAL_KEY as its key,
+# and, as its value, the inode, size and modification time of the file it
+# belongs to, so that a journal left behind by an older file is ignored.
+# Every other entry gives the new value of a key, an empty value meaning
+# that the key was deleted.  A pickle's tokens may be unicode as well as
+# str, so their keys are marked with which (see _journal_key()).
+JOURNAL_SUFFIX = '.journal'
+JOURNAL_KEY = 'journal of'
+
+def _journal_entries(data):
+    """Return the (key, value) entries in the journal data, and the length
+    of the data they take up.
+
+    An incomplete entry at the end (from a write that was cut short) is
+    ignored."""
+    entries = []
+    pos = 0
+    while pos + 8 <= len(data):
+        klen, vlen = struct.unpack("<LL", data[pos:pos+8])
+        end = pos + 8 + klen + vlen
+        if end > len(data):
+            break
+        entries.append((data[pos+8:pos+8+klen], data[pos+8+klen:end]))
+        pos = end
+    return entries, pos
+
+def _journal_entry(key, value):
+    return struct.pack("<LL", len(key), len(value)) + key + value
+
+def _append_journal(db_name, journal_size, entries, stamp, file_size,
+                    percent):
+    """Append the _journal_entry()s entries to the journal of the file
+    db_name, which already holds journal_size bytes of it, and return the
+    journal's new size.
+
+    A new journal starts with a JOURNAL_KEY entry of stamp.  If the
+    journal would be bigger than percent of file_size, nothing is written
+    and None is returned, as the file should be rewritten instead.
+    Anything in the journal after journal_size (a journal left by an
+    older file, or the end of a write that was cut short) is cut off."""
+    if not journal_size:
+        entries.insert(0, _journal_entry(JOURNAL_KEY, stamp))
+    data = "".join(entries)
+    size = journal_size + len(data)
+    if size * 100 > file_size * percent:
+        return None
+    if options["globals", "verbose"]:
+        print >> sys.stderr, 'Appending %d entries to the journal of %s' % \
+              (len(entries), db_name)
+    journal_write(db_name, db_name + JOURNAL_SUFFIX, journal_size, data)
+    return size
+
+def _journal_key(word):
+    """Return the key of a pickle's journal entries for word."""
+    if isinstance(word, types.UnicodeType):
+        return "U" + word.encode("utf-8")
+    return "S" + word
+
+def _journal_word(key):
+    """Return the word a _journal_key() is for."""
+    if key[0] == "U":
+        return key[1:].decode("utf-8")
+    return key[1:]
 
 class CDBClassifier(classifier.Classifier):
     """A classifier that uses a CDB database.
@@ -570,11 +1544,23 @@ class CDBClassifier(classifier.Classifier):
     A CDB wordinfo database is quite small and fast but is slow to update.
     It is appropriate if training is done rarely (e.g. monthly or weekly
     using archived ham and spam).
+
+    The file is mmapped, and only the tokens of the messages being scored
+    are looked up, so opening even a large database is quick.  Training
+    changes only the records held in memory (wordinfo, and deleted for
+    the deleted ones).  store() merges all the changes with the file into
+    a new one (which is put in place by a rename, so that other processes
+    reading the old one aren't disturbed).  If [Storage]
+    cdb_journal_percent is set, store() instead appends the records
+    changed since the last store() to a journal, which load() reads back,
+    until the journal would grow past that percentage of the size of the
+    CDB file; then the file is merged as before and the journal removed.
     """
     def __init__(self, db_name):
         classifier.Classifier.__init__(self)
         self.db_name = db_name
         self.statekey = STATE_KEY
+        self.db = None
         self.load()
 
     def _WordInfoFactory(self, counts):
@@ -589,29 +1575,33 @@ class CDBClassifier(classifier.Classifier):
         wi.spamcount = int(spam)
         return wi
 
-    # Stolen from sb_dbexpimp.py
-    # Heaven only knows what encoding non-ASCII stuff will be in
-    # Try a few common western encodings and punt if they all fail
-    def uunquote(self, s):
-        for encoding in ("utf-8", "cp1252", "iso-8859-1"):
-            try:
-                return unicode(s, encoding)
-            except UnicodeDecodeError:
-                pass
-        # punt
-        return s
-
     def load(self):
+        self.close()
+        # The records changed, and the keys of those deleted, since the
+        # file was written, and the text of changed hashed tokens.
+        self.wordinfo = {}
+        self.deleted = {}
+        self.token_text = {}
+        # The keys changed since the journal was written, and the length
+        # of the journal that belongs to the file and has been read.
+        self.unsaved = {}
+        self.journal_size = 0
         if os.path.exists(self.db_name):
-            db = open(self.db_name, "rb")
-            data = dict(cdb.Cdb(db))
-            db.close()
+            fp = open(self.db_name, "rb")
+            try:
+                self.db = cdb.Cdb(fp)
+            except:
+                fp.close()
+                raise
             self.nham, self.nspam = [int(i) for i in \
-                                     data[self.statekey].split(',')]
-            self.wordinfo = dict([(self.uunquote(k),
-                                   self._WordInfoFactory(v)) \
-                                  for k, v in data.iteritems() \
-                                      if k != self.statekey])
+                                     self.db[self.statekey].split(',')]
+            hashed = self.db.get(HASHED_KEY)
+            if hashed is not None:
+                self.hash_tokens = True
+                self.keep_token_text = bool(int(hashed))
+            else:
+                self.hash_tokens = self.keep_token_text = False
+            self._read_journal()
             if options["globals", "verbose"]:
                 print >> sys.stderr, ('%s is an existing CDB,'
                                       ' with %d ham and %d spam') \
@@ -620,24 +1610,504 @@ class CDBClassifier(classifier.Classifier):
         else:
             if options["globals", "verbose"]:
                 print >> sys.stderr, self.db_name, 'is a new CDB'
-            self.wordinfo = {}
             self.nham = 0
             self.nspam = 0
+            self.hash_tokens, self.keep_token_text = _hashing_options()
 
     def store(self):
+        if not self._write_journal():
+            self.compact()
+
+    def compact(self):
+        """Write all the records, and the changes to them, to a new CDB
+        file, and remove the journal."""
         items = [(self.statekey, "%d,%d" % (self.nham, self.nspam))]
-        for word, wi in self.wordinfo.iteritems():
-            if isinstance(word, types.UnicodeType):
-                word = word.encode("utf-8")
-            items.append((word, "%d,%d" % (wi.hamcount, wi.spamcount)))
-        db = open(self.db_name, "wb")
-        cdb.cdb_make(db, items)
+        if self.hash_tokens:
+            items.append((HASHED_KEY, str(int(self.keep_token_text))))
+            for key, text in self._token_texts().iteritems():
+                items.append((TEXT_PREFIX + key, text))
+        for key, counts in self._stored_items():
+            if key not in self.wordinfo:
+                items.append((key, counts))
+        for key, wi in self.wordinfo.iteritems():
+            items.append((key, "%d,%d" % (wi.hamcount, wi.spamcount)))
+        # The file can't be replaced while it's mapped (on Windows).
+        self.close()
+        try:
+            _write_cdb(self.db_name, items)
+            # If this doesn't happen, the journal is ignored anyway, as
+            # it belongs to the old file.
+            try:
+                os.remove(self.db_name + JOURNAL_SUFFIX)
+            except OSError:
+                pass
+        finally:
+            self.load()
+
+    def _journal_stamp(self):
+        """Return the value of the JOURNAL_KEY entry for the CDB file."""
+        stat = os.fstat(self.db.fp.fileno())
+        return "%d,%d,%d" % (stat.st_ino, stat.st_size, stat.st_mtime)
+
+    def _read_journal(self):
+        """Apply the changes in the journal, if there is one, to the
+        records in memory."""
+        name = self.db_name + JOURNAL_SUFFIX
+        try:
+            f = open(name, "rb")
+        except IOError:
+            return
+        try:
+            entries, size = _journal_entries(f.read())
+        finally:
+            f.close()
+        if not entries or entries[0] != (JOURNAL_KEY, self._journal_stamp()):
+            if options["globals", "verbose"]:
+                print >> sys.stderr, 'Ignoring', name, \
+                      'as it belongs to an older', self.db_name
+            return
+        self.journal_size = size
+        for key, value in entries[1:]:
+            if key == self.statekey:
+                self.nham, self.nspam = [int(i) for i in value.split(',')]
+            elif key.startswith(TEXT_PREFIX) and self.hash_tokens and \
+                 len(key) == len(TEXT_PREFIX) + HASH_SIZE:
+                self.token_text[key[len(TEXT_PREFIX):]] = value
+            elif value:
+                self.wordinfo[key] = self._WordInfoFactory(value)
+                try:
+                    del self.deleted[key]
+                except KeyError:
+                    pass
+            else:
+                try:
+                    del self.wordinfo[key]
+                except KeyError:
+                    pass
+                try:
+                    del self.token_text[key]
+                except KeyError:
+                    pass
+                self.deleted[key] = True
+        if options["globals", "verbose"]:
+            print >> sys.stderr, 'Read %d changes from %s' % \
+                  (len(entries) - 1, name)
+
+    def _write_journal(self):
+        """Append the changes since the last store() to the journal, and
+        return True, or return False if there's no CDB file yet, or if the
+        journal would get too big."""
+        if self.db is None:
+            return False
+        entries = []
+        for key in self.unsaved:
+            record = self.wordinfo.get(key)
+            if record is None:
+                entries.append(_journal_entry(key, ""))
+            else:
+                entries.append(_journal_entry(key, "%d,%d" %
+                                              (record.hamcount,
+                                               record.spamcount)))
+                if key in self.token_text:
+                    entries.append(_journal_entry(TEXT_PREFIX + key,
+                                                  self.token_text[key]))
+        entries.append(_journal_entry(self.statekey, "%d,%d" %
+                                      (self.nham, self.nspam)))
+        size = _append_journal(self.db_name, self.journal_size, entries,
+                               self._journal_stamp(), self.db.size,
+                               options["Storage", "cdb_journal_percent"])
+        if size is None:
+            return False
+        self.journal_size = size
+        self.unsaved = {}
+        return True
+
+    def close(self):
+        if self.db is not None:
+            self.db.close()
+            self.db.fp.close()
+            self.db = None
+
+    def _stored_items(self):
+        """Return the (key, counts) pairs of the token records in the file
+        that haven't been deleted since."""
+        if self.db is None:
+            return []
+        deleted = self.deleted
+        if self.hash_tokens:
+            return [(key, counts) for key, counts in self.db.iteritems()
+                    if len(key) == HASH_SIZE and key not in deleted]
+        special = (self.statekey, HASHED_KEY)
+        return [(key, counts) for key, counts in self.db.iteritems()
+                if key not in special and key not in deleted]
+
+    def _token_texts(self):
+        """Return a dict mapping hashes to the text of their tokens."""
+        texts = {}
+        if self.db is not None and self.keep_token_text:
+            for key, text in self.db.iteritems():
+                if key.startswith(TEXT_PREFIX) and \
+                   len(key) == len(TEXT_PREFIX) + HASH_SIZE:
+                    key = key[len(TEXT_PREFIX):]
+                    if key not in self.deleted:
+                        texts[key] = text
+        texts.update(self.token_text)
+        return texts
+
+    def _wordkey(self, word):
+        """Return the database key for word."""
+        if self.hash_tokens:
+            return token_hash(word)
+        if isinstance(word, types.UnicodeType):
+            word = word.encode("utf-8")
+        return word
+
+    def _wordinfoget(self, word):
+        key = self._wordkey(word)
+        try:
+            return self.wordinfo[key]
+        except KeyError:
+            pass
+        if self.db is None or key in self.deleted or \
+           key in (self.statekey, HASHED_KEY):
+            return None
+        counts = self.db.get(key)
+        if counts is None:
+            return None
+        return self._WordInfoFactory(counts)
+
+    def _wordinfoset(self, word, record):
+        key = self._wordkey(word)
+        if self.keep_token_text:
+            text = token_text(word)
+            if text is not None:
+                self.token_text[key] = text
+        self.wordinfo[key] = record
+        self.unsaved[key] = True
+        try:
+            del self.deleted[key]
+        except KeyError:
+            pass
+
+    def _wordinfodel(self, word):
+        key = self._wordkey(word)
+        try:
+            del self.wordinfo[key]
+        except KeyError:
+            pass
+        try:
+            del self.token_text[key]
+        except KeyError:
+            pass
+        self.deleted[key] = True
+        self.unsaved[key] = True
+
+    def _wordinfokeys(self):
+        keys = dict(self._stored_items())
+        keys.update(self.wordinfo)
+        if self.hash_tokens:
+            texts = self._token_texts()
+            return [texts.get(key) or HashedToken(key) for key in keys]
+        return keys.keys()
+
+    def _wordinfoitems(self, batch=1000):
+        # The records in the file are read from the map as they're needed.
+        if self.hash_tokens:
+            texts = self._token_texts()
+        if self.db is not None:
+            special = (self.statekey, HASHED_KEY)
+            for key, counts in self.db.iteritems():
+                if key in self.wordinfo or key in self.deleted:
+                    continue
+                if self.hash_tokens:
+                    if len(key) == HASH_SIZE:
+                        yield (texts.get(key) or HashedToken(key),
+                               self._WordInfoFactory(counts))
+                elif key not in special:
+                    yield key, self._WordInfoFactory(counts)
+        for key, record in self.wordinfo.items():
+            if self.hash_tokens:
+                yield texts.get(key) or HashedToken(key), record
+            else:
+                yield key, record
+
+
+def _write_cdb(db_name, items):
+    """Write a CDB file of items to the file db_name."""
+    _write_file(db_name, cdb.cdb_make, items)
+
+def _write_file(db_name, write, *args):
+    """Write the file db_name with write(fp, *args).
+
+    It's written to a temporary file which is then renamed to db_name, so
+    anything reading the old file keeps it until it opens the new one."""
+    tmp = db_name + ".tmp"
+    db = open(tmp, "wb")
+    try:
+        write(db, *args)
+    finally:
         db.close()
+    try:
+        os.rename(tmp, db_name)
+    except OSError:
+        # Windows won't rename over an existing file.
+        os.remove(db_name)
+        os.rename(tmp, db_name)
+
+
+# A frozen snapshot keeps the options its probabilities were worked out
+# with under FROZEN_KEY.
+FROZEN_KEY = 'frozen settings'
+
+def _frozen_settings():
+    return (options["Classifier", "unknown_word_prob"],
+            options["Classifier", "unknown_word_strength"],
+            options["Classifier", "minimum_prob_strength"])
+
+def freeze(bayes, db_name):
+    """Write a snapshot of classifier bayes, for FrozenClassifier, to the
+    file db_name.
+
+    The probability of every token is worked out now, with the current
+    options, and stored in a CDB file; tokens too close to 0.5 ever to
+    be clues are left out.  The snapshot is written to a temporary file
+    which is then renamed to db_name, so anything reading the old
+    snapshot keeps it until it notices the new one.
+    """
+    _write_cdb(db_name, _frozen_items(bayes))
+
+def _frozen_items(bayes):
+    """Yield the (key, value) items of a snapshot of bayes.
+
+    The records are read one at a time as the file is written, so the
+    database needn't all be in memory at once."""
+    unknown_prob, unknown_strength, mindist = _frozen_settings()
+    # Unless unknown words can be clues, neither can the tokens that are
+    # as close to 0.5, so they're as good as unknown.
+    keep_all = abs(unknown_prob - 0.5) >= mindist
+    hashed = getattr(bayes, "hash_tokens", False)
+    yield STATE_KEY, "%d,%d" % (bayes.nham, bayes.nspam)
+    yield FROZEN_KEY, "%r,%r,%r" % _frozen_settings()
+    if hashed:
+        yield HASHED_KEY, "0"
+    for word, record in bayes._wordinfoitems():
+        prob = bayes.probability(record)
+        if keep_all or abs(prob - 0.5) >= mindist:
+            if hashed:
+                word = token_hash(word)
+            elif isinstance(word, types.UnicodeType):
+                word = word.encode("utf-8")
+            yield word, repr(prob)
+
+
+class FrozenClassifier(classifier.Classifier):
+    """A read-only snapshot of a classifier, for hosts that only score.
+
+    The snapshot is made by freeze(), and holds the probability of each
+    token rather than its counts, so scoring doesn't call probability()
+    or make any WordInfo records.  The file is mmapped, and only the
+    tokens of the messages being scored are looked up, so opening even a
+    large snapshot is quick.  The files hammie2cdb.py used to make for
+    cdb_classifier.py can be opened too.
+
+    A new snapshot can be published over the old one at any time;
+    refresh() switches to it.  Trying to train raises
+    FrozenClassifierError.
+    """
+    def __init__(self, db_name):
+        classifier.Classifier.__init__(self)
+        self.db_name = db_name
+        self.db = None
+        self.load()
+
+    def load(self):
+        """Switch to the snapshot that's in the file now."""
+        fp = open(self.db_name, "rb")
+        try:
+            db = cdb.Cdb(fp)
+        except:
+            fp.close()
+            raise
+        stat = os.fstat(fp.fileno())
+        state = db.get(STATE_KEY)
+        if state is None:
+            nham = nspam = 0
+        else:
+            nham, nspam = [int(i) for i in state.split(',')]
+        settings = db.get(FROZEN_KEY)
+        if settings is not None and \
+           tuple([float(i) for i in settings.split(',')]) != \
+           _frozen_settings():
+            print >> sys.stderr, ("Warning: %s was frozen with different "
+                                  "[Classifier] unknown_word_prob, "
+                                  "unknown_word_strength or "
+                                  "minimum_prob_strength options, so its "
+                                  "scores will not be the same as those of "
+                                  "the database it was frozen from.") % \
+                                  (self.db_name,)
+        if options["globals", "verbose"]:
+            print >> sys.stderr, ('%s is a frozen snapshot,'
+                                  ' with %d ham and %d spam') % \
+                                  (self.db_name, nham, nspam)
+        old = self.db
+        self.db = db
+        self.hash_tokens = db.get(HASHED_KEY) is not None
+        self.nham = nham
+        self.nspam = nspam
+        self.loaded_stat = (stat.st_ino, stat.st_size, stat.st_mtime)
+        self.generation += 1
+        if old is not None:
+            old.close()
+            old.fp.close()
+
+    def refresh(self):
+        """Switch to a new snapshot, if one has been published since this
+        one was loaded.  Return True if there was one."""
+        try:
+            stat = os.stat(self.db_name)
+        except OSError:
+            # It's being replaced (on Windows), so try again next time.
+            return False
+        if (stat.st_ino, stat.st_size, stat.st_mtime) == self.loaded_stat:
+            return False
+        self.load()
+        return True
 
     def close(self):
-        # We keep no resources open - nothing to do.
+        if self.db is not None:
+            self.db.close()
+            self.db.fp.close()
+            self.db = None
+
+    def _read_only(self, *args):
+        raise FrozenClassifierError(self.db_name)
+
+    store = prune = _read_only
+    _add_msg = _remove_msg = _train_many = _read_only
+    _wordinfoset = _wordinfodel = _read_only
+
+    def _note_seen(self, clues):
+        # Nothing can be recorded in a snapshot.
         pass
 
+    def probability(self, record):
+        # The "records" are the probabilities, as strings.
+        return float(record)
+
+    def _wordinfoget(self, word):
+        if self.hash_tokens:
+            word = token_hash(word)
+        elif isinstance(word, types.UnicodeType):
+            word = word.encode("utf-8")
+        return self.db.get(word)
+
+    def _wordinfokeys(self):
+        keys = [key for key in self.db.iterkeys()
+                if key not in (STATE_KEY, FROZEN_KEY, HASHED_KEY)]
+        if self.hash_tokens:
+            return [HashedToken(key) for key in keys]
+        return keys
+
+
+def write_table(bayes, db_name):
+    """Write the records of classifier bayes, of any storage type, to the
+    file db_name, as a token table for TableClassifier.
+
+    The table keeps the text of the tokens unless bayes holds only their
+    hashes.  As with a frozen snapshot, it's written to a temporary file
+    which is then renamed to db_name.
+    """
+    if isinstance(bayes, FrozenClassifier) and \
+       not isinstance(bayes, TableClassifier):
+        raise ValueError("a frozen snapshot holds probabilities rather "
+                         "than counts, so can't be made into a token table")
+    keep_text = not getattr(bayes, "hash_tokens", False) or \
+                getattr(bayes, "keep_token_text", False)
+    # The records are read one at a time, and each is kept only as its
+    # item, a [key, spamcount, hamcount, text] list.
+    items = {}
+    for word, record in bayes._wordinfoitems():
+        key = token_hash(word)
+        item = items.get(key)
+        if item is None:
+            text = None
+            if keep_text:
+                text = token_text(word)
+            items[key] = [key, record.spamcount, record.hamcount, text]
+        else:
+            # Two tokens with the same hash, which a hashed-token database
+            # would have merged too.
+            item[1] += record.spamcount
+            item[2] += record.hamcount
+    _write_file(db_name, tokentable.table_make, items.itervalues(),
+                bayes.nspam, bayes.nham, keep_text)
+
+
+class TableClassifier(FrozenClassifier):
+    """A read-only token table (see tokentable.py), for filters that are
+    started for each message.
+
+    write_table() makes one from any classifier.  It holds the counts of
+    each token (so, unlike a frozen snapshot, its scores follow the
+    current options) in fixed-width records, sorted by the hash of the
+    token, in a file that is mmapped rather than read, so opening it
+    costs next to nothing, and a token's WordInfo record is only made
+    when the token is looked up.  Like a frozen snapshot, it can be
+    replaced while in use (see refresh()), and can't be trained.
+    """
+    def load(self):
+        """Switch to the table that's in the file now."""
+        fp = open(self.db_name, "rb")
+        try:
+            db = tokentable.TokenTable(fp)
+        except:
+            fp.close()
+            raise
+        stat = os.fstat(fp.fileno())
+        if options["globals", "verbose"]:
+            print >> sys.stderr, ('%s is a token table,'
+                                  ' with %d ham and %d spam') % \
+                                  (self.db_name, db.nham, db.nspam)
+        old = self.db
+        self.db = db
+        self.hash_tokens = True
+        self.keep_token_text = db.has_text
+        self.nham = db.nham
+        self.nspam = db.nspam
+        self.loaded_stat = (stat.st_ino, stat.st_size, stat.st_mtime)
+        self.generation += 1
+        if old is not None:
+            old.close()
+            old.fp.close()
+
+    def probability(self, record):
+        return classifier.Classifier.probability(self, record)
+
+    def _wordinfoget(self, word):
+        counts = self.db.get(token_hash(word))
+        if counts is None:
+            return None
+        record = self.WordInfoClass()
+        record.__setstate__(counts)
+        return record
+
+    def _wordinfokeys(self):
+        db = self.db
+        if db.has_text:
+            return [db.text(i) for i in xrange(len(db))]
+        return [HashedToken(key) for key, _spam, _ham in db]
+
+    def _wordinfoitems(self, batch=1000):
+        db = self.db
+        for i in xrange(len(db)):
+            key, spamcount, hamcount = db.record(i)
+            record = self.WordInfoClass()
+            record.__setstate__((spamcount, hamcount))
+            if db.has_text:
+                yield db.text(i), record
+            else:
+                yield HashedToken(key), record
+
 
 # If ZODB isn't available, then this class won't be useable, but we
 # still need to be able to import this module.  So we pretend that all
@@ -662,6 +2132,12 @@ class ZODBClassifier(object):
     # Allow subclasses to override classifier class.
     ClassifierClass = _PersistentClassifier
 
+    # A ZODB connection belongs to a single thread.
+    concurrent_reads = False
+
+    # store() commits a transaction of the changes.
+    incremental_store = True
+
     def __init__(self, db_name, mode='c'):
         self.db_filename = db_name
         self.db_name = os.path.basename(db_name)
@@ -972,13 +2448,24 @@ class MutuallyExclusiveError(Exception):
     def __str__(self):
         return "Only one type of database can be specified"
 
+class FrozenClassifierError(Exception):
+    def __init__(self, db_name):
+        Exception.__init__(self, db_name)
+        self.db_name = db_name
+    def __str__(self):
+        return "%s is a frozen snapshot, and can't be changed" % \
+               (self.db_name,)
+
 # values are classifier class, True if it accepts a mode
 # arg, and True if the argument is a pathname
 _storage_types = {"dbm" : (DBDictClassifier, True, True),
                   "pickle" : (PickledClassifier, False, True),
                   "pgsql" : (PGClassifier, False, False),
                   "mysql" : (mySQLClassifier, False, False),
+                  "sqlite" : (SQLiteClassifier, False, True),
                   "cdb" : (CDBClassifier, False, True),
+                  "frozen" : (FrozenClassifier, False, True),
+                  "table" : (TableClassifier, False, True),
                   "zodb" : (ZODBClassifier, True, True),
                   "zeo" : (ZEOClassifier, False, False),
                   }
@@ -1015,6 +2502,7 @@ def open_storage(data_source_name, db_type="dbm", mode=None):
 # must be a valid key for the _storage_types dictionary).
 _storage_options = { "-p" : "pickle",
                      "-d" : "dbm",
+                     "-F" : "frozen",
                      }
 
 def database_type(opts, default_type=("Storage", "persistent_use_database"),
@@ -1034,6 +2522,7 @@ def database_type(opts, default_type=("Storage", "persistent_use_database"),
     Currently supports:
        -p  :  pickle
        -d  :  dbm
+       -F  :  frozen
     """
     nm, typ = None, None
     for opt, arg in opts:
@@ -1054,9 +2543,13 @@ def database_type(opts, default_type=("Storage", "persistent_use_database"),
             nm = options[default_name]
     return nm, typ
 
-def convert(old_name=None, old_type=None, new_name=None, new_type=None):
+def convert(old_name=None, old_type=None, new_name=None, new_type=None,
+            hash_tokens=None, keep_text=None):
     # The expected need is to convert the existing hammie.db dbm
     # database to a hammie.fs ZODB database.
+    # If hash_tokens (or keep_text) is given, it overrides the [Storage]
+    # x-hash_tokens (or x-hash_tokens_keep_text) option for the new
+    # database.
     if old_name is None:
         old_name = "hammie.db"
     if old_type is None:
@@ -1069,9 +2562,35 @@ def convert(old_name=None, old_type=None, new_name=None, new_type=None):
             new_type = auto_type
 
     old_bayes = open_storage(old_name, old_type, 'r')
-    new_bayes = open_storage(new_name, new_type)
-    words = old_bayes._wordinfokeys()
-
+    if new_type == "table":
+        # A token table can't be trained, so is written in one go.
+        print >> sys.stderr, "Converting %s (%s database) to " \
+              "%s (token table)." % (old_name, old_type, new_name)
+        try:
+            write_table(old_bayes, new_name)
+        finally:
+            old_bayes.close()
+        print >> sys.stderr, "Conversion complete."
+        return
+    old_hash_tokens = options["Storage", "x-hash_tokens"]
+    old_keep_text = options["Storage", "x-hash_tokens_keep_text"]
+    if hash_tokens is not None:
+        options["Storage", "x-hash_tokens"] = hash_tokens
+    if keep_text is not None:
+        options["Storage", "x-hash_tokens_keep_text"] = keep_text
+    try:
+        new_bayes = open_storage(new_name, new_type)
+    finally:
+        options["Storage", "x-hash_tokens"] = old_hash_tokens
+        options["Storage", "x-hash_tokens_keep_text"] = old_keep_text
+    if getattr(old_bayes, "hash_tokens", False) and \
+       not getattr(old_bayes, "keep_token_text", False) and \
+       not getattr(new_bayes, "hash_tokens", False):
+        old_bayes.close()
+        new_bayes.close()
+        raise ValueError("%s holds only hashed tokens, so can only be "
+                         "converted to another hashed-token database" %
+                         (old_name,))
     try:
         new_bayes.nham = old_bayes.nham
     except AttributeError:
@@ -1083,18 +2602,53 @@ def convert(old_name=None, old_type=None, new_name=None, new_type=None):
 
     print >> sys.stderr, "Converting %s (%s database) to " \
           "%s (%s database)." % (old_name, old_type, new_name, new_type)
-    print >> sys.stderr, "Database has %s ham, %s spam, and %s words." % \
-          (new_bayes.nham, new_bayes.nspam, len(words))
+    print >> sys.stderr, "Database has %s ham and %s spam." % \
+          (new_bayes.nham, new_bayes.nspam)
 
-    for word in words:
-        new_bayes._wordinfoset(word, old_bayes._wordinfoget(word))
-    old_bayes.close()
+    try:
+        count = copy_records(new_bayes, old_bayes._wordinfoitems(),
+                             progress=True)
+    finally:
+        old_bayes.close()
 
     print >> sys.stderr, "Storing database, please be patient..."
     new_bayes.store()
-    print >> sys.stderr, "Conversion complete."
+    print >> sys.stderr, "Conversion complete (%s words)." % (count,)
     new_bayes.close()
 
+def copy_records(bayes, records, batch=10000, merge=False, progress=False):
+    """Set the (word, record) pairs from the iterable records in bayes,
+    and return how many there were.
+
+    The records are taken one at a time, so a whole database can be
+    copied from one storage to another without holding it in memory:
+    every batch records, a storage whose store() writes only what has
+    changed (incremental_store) is stored, and if progress is true, the
+    number copied so far and the rate are reported.  If merge is true,
+    the counts are added to those of any record bayes already has.
+    """
+    count = 0
+    start = time.time()
+    for word, record in records:
+        if merge:
+            old = bayes._wordinfoget(word)
+            if old is not None:
+                # A new record, so that the one given isn't changed.
+                new = bayes.WordInfoClass()
+                new.spamcount = record.spamcount + old.spamcount
+                new.hamcount = record.hamcount + old.hamcount
+                record = new
+        bayes._wordinfoset(word, record)
+        count += 1
+        if count % batch == 0:
+            if bayes.incremental_store:
+                bayes.store()
+            if progress:
+                elapsed = max(time.time() - start, 1e-6)
+                print >> sys.stderr, "%d words (%d a second)..." % \
+                      (count, count / elapsed)
+    return count
+
 def ensureDir(dirname):
     """Ensure that the given directory exists - in other words, if it
     does not exist, attempt to create it."""
@@ -0,0 +1,241 @@
+"""Benchmarks of the storage types, for comparing them with each other and
+from one release to the next.
+
+A synthetic corpus of messages, the same each time for the same size, is
+used to train a classifier of each storage type, which is then stored,
+reopened, and used to score more messages.  For each type and corpus
+size, run() reports:
+
+    load_s            seconds to open the stored database
+    train_msgs_per_s  messages trained on per second
+    store_s           seconds taken by store()
+    cold_ms, warm_ms  percentiles of the milliseconds taken to score a
+                      message, the first time after reopening and then
+                      again (when whatever the type caches is warm)
+    disk_bytes        the size of the database's files
+    peak_rss_kb       the most memory the process has used (only where
+                      the resource module is available)
+
+The results are a dictionary, which dumps() turns into JSON.  Peak memory
+is a high-water mark for the whole process, so unless each benchmark is
+run in a process of its own (isolate=True), it's the peak of all the runs
+so far.  Types that can't be used here (for want of a module) are skipped,
+with the reason.
+
+utilities/storage_bench.py runs this from the command line.
+"""
+
+# This module is part of the spambayes project, which is Copyright 2002-2007
+# The Python Software Foundation and is covered by the Python Software
+# Foundation license.
+
+import os
+import sys
+import glob
+import time
+import random
+try:
+    import json
+except ImportError:
+    import simplejson as json
+try:
+    import resource
+except ImportError:
+    # Not available on Windows.
+    resource = None
+
+import spambayes
+from spambayes import storage
+
+# The storage types that need only a file name; the SQL servers and ZEO
+# need a server, and a frozen snapshot can't be trained.
+FILE_TYPES = ("pickle", "dbm", "cdb", "sqlite", "zodb")
+
+
+def make_corpus(nmsgs, seed=42, msglen=150, new_per_msg=5):
+    """Return a list of nmsgs (tokens, is_spam) pairs, the same for the
+    same arguments.
+
+    Ham and spam draw their tokens from overlapping two thirds of a
+    vocabulary that grows with the corpus, with Zipf-like frequencies (a
+    few very common tokens, and many rare ones), and each message also
+    has a few tokens nothing else has, as real mail does.
+    """
+    vocab_size = max(1000, nmsgs * 10)
+    third = vocab_size // 3
+    rand = random.Random(seed)
+    msgs = []
+    for i in xrange(nmsgs):
+        is_spam = rand.random() < 0.5
+        if is_spam:
+            offset = third
+        else:
+            offset = 0
+        tokens = []
+        for _j in xrange(msglen):
+            # (2*third) ** random() is log-uniform over [1, 2*third].
+            index = int((2 * third) ** rand.random()) - 1
+            tokens.append("w%d" % (offset + index,))
+        for j in xrange(new_per_msg):
+            tokens.append("s%d.%d.%d" % (seed, i, j))
+        msgs.append((tokens, is_spam))
+    return msgs
+
+def percentiles(times):
+    """Return the median, 90th and 99th percentiles and maximum of a list
+    of times in seconds, in milliseconds."""
+    times = sorted(times)
+    def at(fraction):
+        return 1000 * times[min(len(times) - 1, int(fraction * len(times)))]
+    return {"p50": at(0.5), "p90": at(0.9), "p99": at(0.99),
+            "max": 1000 * times[-1]}
+
+def peak_rss():
+    """Return the most memory this process has had, in KB, or None if
+    that can't be found out."""
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin":
+        # Reported in bytes there, and KB elsewhere.
+        rss //= 1024
+    return rss
+
+def disk_size(db_name):
+    """Return the number of bytes in the files of the database db_name."""
+    total = 0
+    for name in glob.glob(db_name + "*"):
+        total += os.path.getsize(name)
+    return total
+
+def remove(db_name):
+    for name in glob.glob(db_name + "*"):
+        os.remove(name)
+
+def _open(db_type, db_name):
+    # Not open_storage(), which exits when there's no dbm module.
+    return storage._storage_types[db_type][0](db_name)
+
+def available(db_type, directory):
+    """Return None if the db_type storage can be used here, or why not."""
+    if db_type not in storage._storage_types:
+        return "no such storage type"
+    db_name = os.path.join(directory, "available." + db_type)
+    try:
+        try:
+            _open(db_type, db_name).close()
+        except Exception, e:
+            return str(e) or e.__class__.__name__
+    finally:
+        remove(db_name)
+    return None
+
+def _score_times(bayes, scoring):
+    times = []
+    for tokens, _is_spam in scoring:
+        start = time.time()
+        bayes.spamprob(tokens)
+        times.append(time.time() - start)
+    return times
+
+def bench(db_type, db_name, training, scoring):
+    """Train a db_type classifier stored in db_name on the training
+    messages, store it, reopen it and score the scoring messages, and
+    return the measurements."""
+    remove(db_name)
+    bayes = _open(db_type, db_name)
+    start = time.time()
+    for tokens, is_spam in training:
+        bayes.learn(tokens, is_spam)
+    trained = time.time()
+    bayes.store()
+    stored = time.time()
+    bayes.close()
+
+    start_load = time.time()
+    bayes = _open(db_type, db_name)
+    loaded = time.time()
+    cold = _score_times(bayes, scoring)
+    warm = _score_times(bayes, scoring)
+    bayes.close()
+
+    vocab = {}
+    for tokens, _is_spam in training:
+        for token in tokens:
+            vocab[token] = 1
+    return {"storage": db_type,
+            "messages": len(training),
+            "tokens": len(vocab),
+            "scored": len(scoring),
+            "load_s": loaded - start_load,
+            "train_msgs_per_s": len(training) / max(trained - start, 1e-6),
+            "store_s": stored - trained,
+            "cold_ms": percentiles(cold),
+            "warm_ms": percentiles(warm),
+            "disk_bytes": disk_size(db_name),
+            "peak_rss_kb": peak_rss(),
+            }
+
+def bench_corpus(db_type, directory, nmsgs, nscore):
+    """Run bench() for db_type on the corpus of nmsgs messages, scoring
+    nscore others, and remove the database afterwards."""
+    db_name = os.path.join(directory, "bench%d.%s" % (nmsgs, db_type))
+    try:
+        return bench(db_type, db_name, make_corpus(nmsgs),
+                     make_corpus(nscore, seed=7))
+    finally:
+        remove(db_name)
+
+def _bench_isolated(db_type, directory, nmsgs, nscore):
+    import subprocess
+    # Make sure the child imports this copy of spambayes.
+    env = os.environ.copy()
+    path = os.path.dirname(os.path.dirname(os.path.abspath(
+        spambayes.__file__)))
+    if env.get("PYTHONPATH"):
+        path = path + os.pathsep + env["PYTHONPATH"]
+    env["PYTHONPATH"] = path
+    child = subprocess.Popen([sys.executable, "-c",
+                              "from spambayes import storagebench; "
+                              "storagebench._child()",
+                              db_type, directory, str(nmsgs), str(nscore)],
+                             stdout=subprocess.PIPE, env=env)
+    output = child.communicate()[0]
+    if child.returncode:
+        raise RuntimeError("benchmark of %s storage failed" % (db_type,))
+    return json.loads(output)
+
+def _child():
+    db_type, directory, nmsgs, nscore = sys.argv[1:]
+    result = bench_corpus(db_type, directory, int(nmsgs), int(nscore))
+    sys.stdout.write(json.dumps(result))
+
+def run(db_types, sizes, nscore, directory, isolate=False):
+    """Benchmark each of the db_types storage types that is available,
+    with a corpus of each of the sizes (numbers of messages to train on),
+    putting the databases in directory, and return the results."""
+    results = []
+    skipped = {}
+    for db_type in db_types:
+        reason = available(db_type, directory)
+        if reason is not None:
+            skipped[db_type] = reason
+            continue
+        for nmsgs in sizes:
+            if isolate:
+                result = _bench_isolated(db_type, directory, nmsgs, nscore)
+            else:
+                result = bench_corpus(db_type, directory, nmsgs, nscore)
+            results.append(result)
+    return {"version": spambayes.__version__,
+            "python": sys.version.split()[0],
+            "platform": sys.platform,
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "isolated": bool(isolate),
+            "results": results,
+            "skipped": skipped,
+            }
+
+def dumps(report):
+    """Return the results of run() as JSON."""
+    return json.dumps(report, indent=1, sort_keys=True)
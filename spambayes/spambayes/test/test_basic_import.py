@@ -23,6 +23,7 @@ def test_basic_import():
     from spambayes import cdb
     from spambayes import cdb_classifier
     from spambayes import chi2
+    from spambayes import chi2array
     from spambayes import classifier
     from spambayes import dbmstorage
     from spambayes import dnscache
@@ -0,0 +1,73 @@
+# Test the Bloom filter used to skip lookups of unknown tokens.
+
+import unittest, sys
+
+import sb_test_support
+sb_test_support.fix_sys_path()
+
+from spambayes.bloom import BloomFilter, build
+
+class BloomFilterTestCase(unittest.TestCase):
+    def setUp(self):
+        self.keys = ["token%d" % i for i in range(5000)]
+        self.bloom = build(self.keys)
+
+    def testNoFalseNegatives(self):
+        for key in self.keys:
+            self.assert_(self.bloom.might_contain(key))
+        self.assertEqual(self.bloom.rejections, 0)
+
+    def testFalsePositiveRate(self):
+        bloom = self.bloom
+        let_through = 0
+        for i in range(10000):
+            if bloom.might_contain("other%d" % i):
+                let_through += 1
+                bloom.missed()
+        # Sized for twice as many keys, so well under the 1% it's built
+        # for.
+        self.assert_(let_through < 100)
+        self.assertEqual(bloom.checks, 10000)
+        self.assertEqual(bloom.rejections, 10000 - let_through)
+        self.assertEqual(bloom.false_positive_rate(), let_through / 10000.0)
+
+    def testAdd(self):
+        bloom = BloomFilter(10)
+        self.failIf(bloom.might_contain("new"))
+        bloom.add("new")
+        self.assert_(bloom.might_contain("new"))
+        self.assertEqual(len(bloom), 1)
+
+    def testAddAgain(self):
+        # Adding the keys that are already there doesn't fill the filter.
+        bloom = self.bloom
+        for _i in range(5):
+            for key in self.keys:
+                self.failIf(bloom.add(key))
+        self.assertEqual(len(bloom), len(self.keys))
+        self.failIf(bloom.full())
+
+    def testFull(self):
+        bloom = self.bloom
+        self.failIf(bloom.full())
+        # Full after about capacity distinct keys (a few more, as a key
+        # that seems to be there already isn't counted).
+        added = len(self.keys)
+        while not bloom.full():
+            bloom.add("more%d" % added)
+            added += 1
+        self.assert_(bloom.capacity < added < bloom.capacity * 1.05)
+        bloom.might_contain("other")
+        rebuilt = build(self.keys, bloom)
+        self.failIf(rebuilt.full())
+        self.assertEqual(rebuilt.checks, 1)
+
+def suite():
+    suite = unittest.TestSuite()
+    for cls in (BloomFilterTestCase,
+                ):
+        suite.addTest(unittest.makeSuite(cls))
+    return suite
+
+if __name__=='__main__':
+    sb_test_support.unittest_main(argv=sys.argv + ['suite'])
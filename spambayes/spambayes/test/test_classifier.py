@@ -0,0 +1,689 @@
+# Test the scoring and training operations of the classifier.
+
+import unittest, sys
+import random
+import pickle
+
+import sb_test_support
+sb_test_support.fix_sys_path()
+
+from spambayes.Options import options
+from spambayes.classifier import Classifier, WordInfo, CompactWordInfo
+from spambayes.classifier import TimedWordInfo, LRUList
+from spambayes import classifier
+from spambayes import chi2, chi2array
+
+def make_corpus(nmsgs, seed=1, vocab=400, msglen=60):
+    """Return a reproducible list of (tokens, is_spam) pairs."""
+    rand = random.Random(seed)
+    words = ["w%d" % i for i in xrange(vocab)]
+    msgs = []
+    for i in xrange(nmsgs):
+        is_spam = i & 1
+        # Bias spam towards the high end of the vocabulary, so that there
+        # are strong clues both ways.
+        if is_spam:
+            pool = words[vocab//3:]
+        else:
+            pool = words[:2*vocab//3]
+        msgs.append(([rand.choice(pool) for _j in xrange(msglen)],
+                     bool(is_spam)))
+    return msgs
+
+class _ClassifierTestBase(unittest.TestCase):
+    def setUp(self):
+        self.classifier = Classifier()
+        for tokens, is_spam in make_corpus(200):
+            self.classifier.learn(tokens, is_spam)
+        self.msgs = [tokens + ["unknown%d" % i]
+                     for i, (tokens, _s) in enumerate(make_corpus(50, 2))]
+
+class SpamprobManyTestCase(_ClassifierTestBase):
+    # Combine one message at a time, so that the scores are exactly those
+    # spamprob() gives.
+    def setUp(self):
+        _ClassifierTestBase.setUp(self)
+        self.numpy = chi2array.numpy
+        chi2array.numpy = None
+
+    def tearDown(self):
+        chi2array.numpy = self.numpy
+
+    def testSameScores(self):
+        c = self.classifier
+        expected = [c.spamprob(msg) for msg in self.msgs]
+        self.assertEqual(c.spamprob_many(self.msgs), expected)
+
+    def testSameEvidence(self):
+        c = self.classifier
+        expected = [c.spamprob(msg, True) for msg in self.msgs]
+        self.assertEqual(c.spamprob_many(self.msgs, True), expected)
+
+    def testIterators(self):
+        c = self.classifier
+        expected = [c.spamprob(msg) for msg in self.msgs]
+        self.assertEqual(c.spamprob_many(iter([iter(msg) for msg in
+                                               self.msgs])), expected)
+
+    def testEmpty(self):
+        self.assertEqual(self.classifier.spamprob_many([]), [])
+        self.assertEqual(self.classifier.spamprob_many([[]]), [0.5])
+
+    def testLookupsShared(self):
+        c = self.classifier
+        looked_up = []
+        def _wordinfoget(word, get=c._wordinfoget):
+            looked_up.append(word)
+            return get(word)
+        c._wordinfoget = _wordinfoget
+        c.spamprob_many(self.msgs + self.msgs)
+        self.assertEqual(len(looked_up), len(set(looked_up)))
+
+    def testBigrams(self):
+        old_bigrams = options["Classifier", "use_bigrams"]
+        options["Classifier", "use_bigrams"] = True
+        try:
+            c = Classifier()
+            for tokens, is_spam in make_corpus(100):
+                c.learn(tokens, is_spam)
+            expected = [c.spamprob(msg, True) for msg in self.msgs]
+            self.assertEqual(c.spamprob_many(self.msgs, True), expected)
+        finally:
+            options["Classifier", "use_bigrams"] = old_bigrams
+
+class ProbabilityCacheTestCase(_ClassifierTestBase):
+    def _record(self, spamcount, hamcount):
+        record = WordInfo()
+        record.__setstate__((spamcount, hamcount))
+        return record
+
+    def _uncached(self, record):
+        self.classifier.probcache.clear()
+        return self.classifier.probability(record)
+
+    def testCachedSame(self):
+        c = self.classifier
+        for counts in ((0, 1), (1, 0), (3, 7), (63, 2), (64, 0), (100, 99)):
+            record = self._record(*counts)
+            expected = self._uncached(record)
+            self.assertEqual(c.probability(record), expected)
+            self.assertEqual(c.probability(record), expected)
+
+    def testHitRate(self):
+        c = self.classifier
+        record = self._record(1, 2)
+        large_record = self._record(90, 90)
+        c.probcache.hits = c.probcache.misses = 0
+        for i in xrange(4):
+            c.probability(record)
+            c.probability(large_record)
+        self.assertEqual(c.probcache.misses, 2)
+        self.assertEqual(c.probcache.hits, 6)
+        self.assertEqual(c.probcache.hit_rate(), 0.75)
+
+    def testTrainingInvalidates(self):
+        c = self.classifier
+        record = self._record(5, 5)
+        before = c.probability(record)
+        c.learn(["tony"], True)
+        after = c.probability(record)
+        self.assertNotEqual(before, after)
+        self.assertEqual(after, self._uncached(record))
+        # Back to the original counts, so the original probability.
+        c.unlearn(["tony"], True)
+        self.assertEqual(c.probability(record), before)
+
+class LRUListTestCase(unittest.TestCase):
+    def testOrder(self):
+        lru = LRUList()
+        for key in "abcd":
+            lru.put(key, key.upper())
+        self.assertEqual(lru.get("a"), "A")
+        lru.put("b", "B2")
+        self.assertEqual(lru.get("x"), None)
+        self.assertEqual(lru["c"], "C")
+        self.assertEqual(len(lru), 4)
+        # c was looked at with [], which doesn't count as using it.
+        self.assertEqual([lru.pop_oldest() for _i in range(3)],
+                         ["c", "d", "a"])
+        self.assert_("b" in lru)
+        self.assert_(lru.remove("b"))
+        self.failIf(lru.remove("b"))
+        self.assertEqual(len(lru), 0)
+
+class ScoreCacheTestCase(_ClassifierTestBase):
+    def setUp(self):
+        _ClassifierTestBase.setUp(self)
+        self.old_size = options["Storage", "score_cache_size"]
+        self.tokenized = []
+
+    def tearDown(self):
+        options["Storage", "score_cache_size"] = self.old_size
+
+    def _tokenizer(self, i):
+        def tokenize():
+            self.tokenized.append(i)
+            return self.msgs[i]
+        return tokenize
+
+    def _score(self, i, evidence=False):
+        return self.classifier.spamprob_cached("message %d" % (i,),
+                                               self._tokenizer(i), evidence)
+
+    def testSameScores(self):
+        c = self.classifier
+        for i in xrange(len(self.msgs)):
+            expected = c.spamprob(self.msgs[i], True)
+            self.assertEqual(self._score(i), expected[0])
+            self.assertEqual(self._score(i), expected[0])
+            self.assertEqual(self._score(i, True), expected)
+            self.assertEqual(self._score(i, True), expected)
+        # The score with the evidence is remembered separately.
+        self.assertEqual(self.tokenized,
+                         [i for i in xrange(len(self.msgs)) for _j in (1, 2)])
+        self.assertEqual(c.scorecache.hits, 2 * len(self.msgs))
+        self.assertEqual(c.scorecache.misses, 2 * len(self.msgs))
+
+    def testLeastRecentlyUsedDropped(self):
+        options["Storage", "score_cache_size"] = 3
+        for i in (0, 1, 2, 0, 3, 0, 1):
+            self._score(i)
+        # 1 was dropped for 3, so had to be scored again.
+        self.assertEqual(self.tokenized, [0, 1, 2, 3, 1])
+        self.assertEqual(len(self.classifier.scorecache), 3)
+
+    def testTrainingInvalidates(self):
+        c = self.classifier
+        before = self._score(0)
+        c.learn(self.msgs[0], True)
+        after = self._score(0)
+        self.assertNotEqual(before, after)
+        self.assertEqual(after, c.spamprob(self.msgs[0]))
+        c.unlearn(self.msgs[0], True)
+        self.assertEqual(self._score(0), before)
+        c.learn_many([(self.msgs[1], False)])
+        self._score(0)
+        self.assertEqual(self.tokenized, [0, 0, 0, 0])
+
+    def testDisabled(self):
+        options["Storage", "score_cache_size"] = 0
+        self._score(0)
+        self._score(0)
+        self.assertEqual(self.tokenized, [0, 0])
+        self.assertEqual(len(self.classifier.scorecache), 0)
+
+    def testPickle(self):
+        c = self.classifier
+        self._score(0)
+        c = pickle.loads(pickle.dumps(c))
+        self.assertEqual(len(c.scorecache), 0)
+        self.assertEqual(c.generation, 0)
+
+class Chi2QTestCase(unittest.TestCase):
+    def _assertClose(self, a, b, tolerance):
+        self.assert_(abs(a - b) <= tolerance * b, "%r != %r" % (a, b))
+
+    def testSameAsDirect(self):
+        rand = random.Random(3)
+        for v in range(2, 1202, 2):
+            for x2 in (0.0, v / 10.0, v - 3 * v ** 0.5, float(v),
+                       v + 3 * v ** 0.5, 2.0 * v, rand.uniform(0, 1400)):
+                # Past 1400, exp(-x2/2) gets too near underflow for the
+                # full sum to be accurate (testUnderflow covers that).
+                if x2 < 0.0 or x2 > 1400.0:
+                    continue
+                q = chi2.chi2Q(x2, v)
+                direct = chi2.chi2Q_direct(x2, v)
+                self.assert_(0.0 <= q <= 1.0)
+                # Within roundoff of the full sum, in what matters to a
+                # score, 1 - q, as well as in q.
+                self.assert_(abs(q - direct) < 1e-14, (x2, v, q, direct))
+                if direct > 1e-290:
+                    self._assertClose(q, direct, 1e-12)
+
+    def testUnderflow(self):
+        # The full sum underflows to 0 for all but the last of these; the
+        # expected values are the sums done with 60 digits.
+        for x2, v, expected in ((1500.0, 100, 2.52543202888637e-248),
+                                (1600.0, 300, 4.299097512221525e-176),
+                                (2000.0, 1000, 4.1436785914549916e-69),
+                                (1200.0, 1200, 0.49457103312038736)):
+            self.assertEqual(chi2.chi2Q_direct(x2, v) == 0.0, x2 > 1200.0)
+            self._assertClose(chi2.chi2Q(x2, v), expected, 1e-12)
+
+    def testBounds(self):
+        for v in range(2, 602, 4):
+            for x2 in (0.0, 0.5, v / 4.0, v - 1.0, float(v), v + 1.0,
+                       2.0 * v, 10.0 * v, 1500.0):
+                lo, hi = chi2.chi2Q_bounds(x2, v)
+                q = chi2.chi2Q(x2, v)
+                self.assert_(lo <= q <= hi, (x2, v, lo, q, hi))
+        # Useful in the tails.
+        self.assert_(chi2.chi2Q_bounds(600.0, 150)[1] < 1e-50)
+        self.assert_(chi2.chi2Q_bounds(15.0, 150)[0] > 1.0 - 1e-11)
+
+class EarlyExitTestCase(_ClassifierTestBase):
+    def setUp(self):
+        _ClassifierTestBase.setUp(self)
+        self.old_early = options["Classifier", "x-early_exit_scoring"]
+        # Early exit is only tried on messages with plenty of clues.  Mix
+        # spam and ham tokens in varying proportions, so that there are
+        # messages of every classification.
+        self.mixed = []
+        corpus = make_corpus(40, 3, msglen=240)
+        for i in xrange(0, len(corpus), 2):
+            ham, spam = corpus[i][0], corpus[i+1][0]
+            for k in xrange(0, 241, 24):
+                self.mixed.append(ham[k:] + spam[:k])
+
+    def tearDown(self):
+        options["Classifier", "x-early_exit_scoring"] = self.old_early
+
+    def _classify(self, prob):
+        if prob < options["Categorization", "ham_cutoff"]:
+            return "ham"
+        if prob > options["Categorization", "spam_cutoff"]:
+            return "spam"
+        return "unsure"
+
+    def _classifications(self, msgs):
+        return [self._classify(self.classifier.spamprob(msg))
+                for msg in msgs]
+
+    def testSameClassifications(self):
+        c = self.classifier
+        options["Classifier", "x-early_exit_scoring"] = False
+        msgs = self.mixed
+        expected = self._classifications(msgs)
+        self.assertEqual(c.scoringstats.messages, 0)
+        for cut in (0.2, 0.5, 0.8):
+            self.assertNotEqual(expected, [self._classify(cut)] * len(msgs))
+        options["Classifier", "x-early_exit_scoring"] = True
+        self.assertEqual(self._classifications(msgs), expected)
+        self.assertEqual(c.scoringstats.messages, len(msgs))
+        # Most of these messages are clear-cut.
+        self.assert_(c.scoringstats.mean_skipped() > 5.0,
+                     c.scoringstats)
+
+    def testSkipped(self):
+        c = self.classifier
+        options["Classifier", "x-early_exit_scoring"] = True
+        prob = c.spamprob(self.mixed[10])
+        self.assertEqual(self._classify(prob), "spam")
+        self.assert_(c.scoringstats.skipped > 0)
+        self.assert_(c.scoringstats.skipped < c.scoringstats.clues)
+
+    def testEvidenceUnchanged(self):
+        c = self.classifier
+        expected = [c.spamprob(msg, True) for msg in self.msgs]
+        options["Classifier", "x-early_exit_scoring"] = True
+        self.assertEqual([c.spamprob(msg, True) for msg in self.msgs],
+                         expected)
+        self.assertEqual(c.scoringstats.messages, 0)
+
+    def testSpamprobMany(self):
+        c = self.classifier
+        options["Classifier", "x-early_exit_scoring"] = True
+        expected = [c.spamprob(msg) for msg in self.mixed]
+        self.assertEqual(c.spamprob_many(self.mixed), expected)
+
+    def testNoClues(self):
+        options["Classifier", "x-early_exit_scoring"] = True
+        self.assertEqual(self.classifier.spamprob([]), 0.5)
+
+class NumPyCombiningTestCase(_ClassifierTestBase):
+    def _assertClose(self, a, b):
+        self.assert_(abs(a - b) <= 1e-12, "%r != %r" % (a, b))
+
+    def testChi2Q(self):
+        x2s = []
+        vs = []
+        for v in (2, 4, 10, 100, 300):
+            for x2 in (0.0, 0.01, 1.0, 50.0, 100.0, 299.5, 600.0, 1500.0):
+                x2s.append(x2)
+                vs.append(v)
+        got = chi2array.chi2Q(x2s, vs)
+        for x2, v, q in zip(x2s, vs, got):
+            self._assertClose(q, chi2.chi2Q(x2, v))
+
+    def testSameScores(self):
+        c = self.classifier
+        msgs = self.msgs + [[], ["unknown"]]
+        expected = [c.spamprob(msg, True) for msg in msgs]
+        got = c.spamprob_many(msgs, True)
+        for (prob, clues), (eprob, eclues) in zip(got, expected):
+            self._assertClose(prob, eprob)
+            self.assertEqual([w for w, _p in clues],
+                             [w for w, _p in eclues])
+            for (_w, p), (_w, ep) in zip(clues, eclues):
+                self._assertClose(p, ep)
+
+class CompactWordInfoTestCase(_ClassifierTestBase):
+    def setUp(self):
+        self.old_compact = options["Classifier", "x-use_compact_wordinfo"]
+        options["Classifier", "x-use_compact_wordinfo"] = True
+        _ClassifierTestBase.setUp(self)
+
+    def tearDown(self):
+        options["Classifier", "x-use_compact_wordinfo"] = self.old_compact
+
+    def _counts(self, wordinfo):
+        counts = {}
+        for word, record in wordinfo.iteritems():
+            counts[word] = record.__getstate__()
+        return counts
+
+    def testSameAsDict(self):
+        options["Classifier", "x-use_compact_wordinfo"] = False
+        plain = Classifier()
+        for tokens, is_spam in make_corpus(200):
+            plain.learn(tokens, is_spam)
+        c = self.classifier
+        self.assert_(isinstance(c.wordinfo, CompactWordInfo))
+        self.assertEqual(self._counts(c.wordinfo),
+                         self._counts(plain.wordinfo))
+        self.assertEqual(c.spamprob_many(self.msgs, True),
+                         plain.spamprob_many(self.msgs, True))
+
+    def testReuseIds(self):
+        c = self.classifier
+        c.learn(["hapax1", "hapax2"], True)
+        size = len(c.wordinfo.spamcounts)
+        c.unlearn(["hapax1", "hapax2"], True)
+        self.assertEqual(c._wordinfoget("hapax1"), None)
+        self.failIf("hapax2" in c.wordinfo)
+        c.learn(["hapax3"], False)
+        self.assertEqual(len(c.wordinfo.spamcounts), size)
+        self.assertEqual(c._wordinfoget("hapax3").__getstate__(), (0, 1))
+        self.assertEqual(len(c.wordinfo), len(c._wordinfokeys()))
+
+    def testMapping(self):
+        # Random insertions and deletions, checked against a dict.
+        rand = random.Random(3)
+        wordinfo = CompactWordInfo()
+        expected = {}
+        record = WordInfo()
+        for i in xrange(5000):
+            word = "w%d" % rand.randrange(600)
+            if word in expected and rand.random() < 0.5:
+                del wordinfo[word]
+                del expected[word]
+            else:
+                record.__setstate__((i, rand.randrange(100)))
+                wordinfo[word] = record
+                expected[word] = record.__getstate__()
+            self.assertEqual(len(wordinfo), len(expected))
+        self.assertEqual(self._counts(wordinfo), expected)
+        self.assertEqual(sorted(wordinfo.keys()), sorted(expected.keys()))
+        self.assertEqual(wordinfo.get("missing"), None)
+        self.assertRaises(KeyError, wordinfo.__getitem__, "missing")
+        self.assertRaises(KeyError, wordinfo.__delitem__, "missing")
+
+    def testRehash(self):
+        # A table pickled under a different string hash has to be rebuilt.
+        wordinfo = self.classifier.wordinfo
+        state = list(wordinfo.__getstate__())
+        state[0] += 1
+        clone = CompactWordInfo()
+        clone.__setstate__(tuple(state))
+        self.assertEqual(self._counts(clone), self._counts(wordinfo))
+
+    def testPickle(self):
+        c = self.classifier
+        clone = pickle.loads(pickle.dumps(c, 2))
+        self.assert_(isinstance(clone.wordinfo, CompactWordInfo))
+        self.assertEqual(self._counts(clone.wordinfo),
+                         self._counts(c.wordinfo))
+
+    def testConvertOnLoad(self):
+        options["Classifier", "x-use_compact_wordinfo"] = False
+        plain = Classifier()
+        for tokens, is_spam in make_corpus(20):
+            plain.learn(tokens, is_spam)
+        data = pickle.dumps(plain, 2)
+        options["Classifier", "x-use_compact_wordinfo"] = True
+        c = pickle.loads(data)
+        self.assert_(isinstance(c.wordinfo, CompactWordInfo))
+        self.assertEqual(self._counts(c.wordinfo),
+                         self._counts(plain.wordinfo))
+
+def sorted_clues(c, wordstream):
+    """Return the clues for wordstream, found the slow and obvious way
+    (by sorting every candidate)."""
+    mindist = options["Classifier", "minimum_prob_strength"]
+    maxdisc = options["Classifier", "max_discriminators"]
+    wordstream = list(wordstream)
+    raw = []
+    for i, token in enumerate(wordstream):
+        raw.append((c._worddistanceget(token), (i,)))
+        if i and options["Classifier", "use_bigrams"]:
+            pair = "bi:%s %s" % (wordstream[i-1], token)
+            raw.append((c._worddistanceget(pair), (i-1, i)))
+    uniq = {}
+    for tup, indices in raw:
+        if tup[2] not in uniq and tup[0] >= mindist:
+            uniq[tup[2]] = (tup, indices)
+    raw = uniq.values()
+    raw.sort()
+    raw.reverse()
+    clues = []
+    seen = {}
+    for tup, indices in raw:
+        if not [i for i in indices if i in seen]:
+            for i in indices:
+                seen[i] = 1
+            clues.append(tup)
+    clues = clues[:maxdisc]
+    clues.reverse()
+    return [t[1:] for t in clues]
+
+class GetCluesTestCase(_ClassifierTestBase):
+    def _check(self, c):
+        big = []
+        for msg in self.msgs:
+            big.extend(msg)
+        for msg in self.msgs[:10] + [big, big[:40], []]:
+            self.assertEqual(c._getclues(msg), sorted_clues(c, msg))
+
+    def testUnigrams(self):
+        self._check(self.classifier)
+
+    def testFewDiscriminators(self):
+        old_maxdisc = options["Classifier", "max_discriminators"]
+        for maxdisc in (1, 5, 20):
+            options["Classifier", "max_discriminators"] = maxdisc
+            try:
+                self._check(self.classifier)
+            finally:
+                options["Classifier", "max_discriminators"] = old_maxdisc
+
+    def testBigrams(self):
+        old_bigrams = options["Classifier", "use_bigrams"]
+        old_maxdisc = options["Classifier", "max_discriminators"]
+        options["Classifier", "use_bigrams"] = True
+        try:
+            c = Classifier()
+            for tokens, is_spam in make_corpus(100):
+                c.learn(tokens, is_spam)
+            for maxdisc in (1, 5, 150, 1000):
+                options["Classifier", "max_discriminators"] = maxdisc
+                self._check(c)
+        finally:
+            options["Classifier", "use_bigrams"] = old_bigrams
+            options["Classifier", "max_discriminators"] = old_maxdisc
+
+def counts(c):
+    """Return the classifier's training counts, for comparison."""
+    words = {}
+    for word in c._wordinfokeys():
+        record = c._wordinfoget(word)
+        words[word] = (record.spamcount, record.hamcount)
+    return c.nspam, c.nham, words
+
+class CountingClassifier(Classifier):
+    def __init__(self):
+        Classifier.__init__(self)
+        self.flushes = 0
+
+    def _post_training(self):
+        self.flushes += 1
+
+class LearnManyTestCase(unittest.TestCase):
+    def setUp(self):
+        self.corpus = make_corpus(200)
+        self.expected = Classifier()
+        for tokens, is_spam in self.corpus:
+            self.expected.learn(tokens, is_spam)
+        self.buffer_size = options["Storage", "training_buffer_size"]
+
+    def tearDown(self):
+        options["Storage", "training_buffer_size"] = self.buffer_size
+
+    def testSameCounts(self):
+        c = CountingClassifier()
+        c.learn_many(iter(self.corpus))
+        self.assertEqual(counts(c), counts(self.expected))
+        self.assertEqual(c.flushes, 1)
+
+    def testFlushes(self):
+        # With no memory to spare, the counts are written out after every
+        # message, but end up the same.
+        options["Storage", "training_buffer_size"] = 0
+        c = CountingClassifier()
+        c.learn_many(self.corpus)
+        self.assertEqual(counts(c), counts(self.expected))
+        self.assertEqual(c.flushes, len(self.corpus) + 1)
+
+    def testUnlearnMany(self):
+        c = Classifier()
+        c.learn_many(self.corpus)
+        c.unlearn_many(self.corpus[:150])
+        for tokens, is_spam in self.corpus[:150]:
+            self.expected.unlearn(tokens, is_spam)
+        self.assertEqual(counts(c), counts(self.expected))
+        c.unlearn_many(self.corpus[150:])
+        self.assertEqual(counts(c), (0, 0, {}))
+
+    def testUnlearnTooMany(self):
+        # The messages before the one that can't be untrained stay
+        # untrained.
+        c = Classifier()
+        c.learn_many(self.corpus[:4])
+        self.assertRaises(ValueError, c.unlearn_many,
+                          self.corpus[:4] + self.corpus[:4])
+        self.assertEqual(counts(c), (0, 0, {}))
+
+    def testBigrams(self):
+        old_bigrams = options["Classifier", "use_bigrams"]
+        options["Classifier", "use_bigrams"] = True
+        try:
+            expected = Classifier()
+            for tokens, is_spam in self.corpus:
+                expected.learn(tokens, is_spam)
+            c = Classifier()
+            c.learn_many(self.corpus)
+        finally:
+            options["Classifier", "use_bigrams"] = old_bigrams
+        self.assertEqual(counts(c), counts(expected))
+
+class LastSeenTestCase(unittest.TestCase):
+    def setUp(self):
+        self.track = options["Classifier", "x-track_last_seen"]
+        options["Classifier", "x-track_last_seen"] = True
+        self.today = classifier.today
+        self.day = 1000
+        classifier.today = lambda: self.day
+        self.classifier = Classifier()
+
+    def tearDown(self):
+        options["Classifier", "x-track_last_seen"] = self.track
+        classifier.today = self.today
+
+    def testTraining(self):
+        c = self.classifier
+        c.learn(["a", "b"], True)
+        self.day += 1
+        c.learn_many([(["b", "c"], False)])
+        self.assertEqual(c._wordinfoget("a").__getstate__(), (1, 0, 1000))
+        self.assertEqual(c._wordinfoget("b").__getstate__(), (1, 1, 1001))
+        self.assertEqual(c._wordinfoget("c").__getstate__(), (0, 1, 1001))
+
+    def testScoring(self):
+        c = self.classifier
+        for tokens, is_spam in make_corpus(20):
+            c.learn(tokens, is_spam)
+        self.day += 10
+        clues = c._getclues(["w1", "w399"])
+        c.spamprob(["w1", "w399", "unknown"])
+        for prob, word, record in clues:
+            self.assertEqual(c._wordinfoget(word).lastseen, self.day)
+        self.day += 1
+        c.spamprob_many([["w1"]])
+        self.assertEqual(c._wordinfoget("w1").lastseen, self.day)
+
+    def testOldRecords(self):
+        # Records from before tracking have no last-seen day, and are
+        # upgraded when seen.
+        c = self.classifier
+        record = WordInfo()
+        record.spamcount = 1
+        c._wordinfoset("old", record)
+        c._wordinfoset("older", WordInfo())
+        c.learn(["old"], False)
+        self.assertEqual(c._wordinfoget("old").__getstate__(), (1, 1, 1000))
+        self.assert_(isinstance(c._wordinfoget("older"), WordInfo))
+
+    def testState(self):
+        record = TimedWordInfo()
+        record.__setstate__((2, 3))
+        self.assertEqual(record.__getstate__(), (2, 3, 0))
+        copy = pickle.loads(pickle.dumps(TimedWordInfo(), 2))
+        self.assertEqual(copy.__getstate__(), (0, 0, 0))
+
+    def testPrune(self):
+        c = self.classifier
+        c.learn(["old", "common", "oldish"], True)
+        c.learn(["common"], False)
+        record = WordInfo()
+        record.hamcount = 1
+        c._wordinfoset("unknown", record)
+        self.day += 30
+        c.learn(["oldish", "new"], False)
+        nspam, nham = c.nspam, c.nham
+        self.assertEqual(c.prune(30), 1)
+        self.assertEqual(c._wordinfoget("old"), None)
+        for word in ("common", "oldish", "new", "unknown"):
+            self.assertNotEqual(c._wordinfoget(word), None)
+        self.assertEqual((c.nspam, c.nham), (nspam, nham))
+        # A higher threshold takes "common" as well.
+        self.assertEqual(c.prune(30, 3), 1)
+        self.assertEqual(c._wordinfoget("common"), None)
+        # Tokens without a day are only removed on request.
+        self.assertEqual(c.prune(30, 3, True), 1)
+        self.assertEqual(c._wordinfoget("unknown"), None)
+        self.assertEqual(c.prune(0), 1)
+        self.assertEqual(c._wordinfokeys(), ["oldish"])
+
+def suite():
+    suite = unittest.TestSuite()
+    clses = (SpamprobManyTestCase,
+             ProbabilityCacheTestCase,
+             LRUListTestCase,
+             ScoreCacheTestCase,
+             Chi2QTestCase,
+             EarlyExitTestCase,
+             GetCluesTestCase,
+             CompactWordInfoTestCase,
+             LearnManyTestCase,
+             LastSeenTestCase,
+             )
+    if chi2array.numpy is None:
+        print "Skipping NumPy combining tests, NumPy not available"
+    else:
+        clses += (NumPyCombiningTestCase,)
+    for cls in clses:
+        suite.addTest(unittest.makeSuite(cls))
+    return suite
+
+if __name__=='__main__':
+    sb_test_support.unittest_main(argv=sys.argv + ['suite'])
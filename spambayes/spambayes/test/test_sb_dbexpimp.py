@@ -7,6 +7,8 @@ import unittest
 from spambayes.tokenizer import tokenize
 from spambayes.storage import open_storage
 from spambayes.storage import PickledClassifier, DBDictClassifier
+from spambayes.storage import CDBClassifier
+from spambayes.Options import options
 
 import sb_test_support
 sb_test_support.fix_sys_path()
@@ -23,12 +25,15 @@ from test_sb_server import good1, spam1
 TEMP_PICKLE_NAME = os.path.join(os.path.dirname(__file__), "temp.pik")
 TEMP_CSV_NAME = os.path.join(os.path.dirname(__file__), "temp.csv")
 TEMP_DBM_NAME = os.path.join(os.path.dirname(__file__), "temp.dbm")
+TEMP_DUMP_NAME = os.path.join(os.path.dirname(__file__), "temp.dump")
+TEMP_DUMP2_NAME = os.path.join(os.path.dirname(__file__), "temp2.dump")
 # The chances of anyone having files with these names in the test
 # directory is minute, but we don't want to wipe anything, so make
 # sure that they don't already exist.  Our tearDown code gets rid
 # of our copies (whether the tests pass or fail) so they shouldn't
 # be ours.
-for fn in [TEMP_PICKLE_NAME, TEMP_CSV_NAME, TEMP_DBM_NAME]:
+for fn in [TEMP_PICKLE_NAME, TEMP_CSV_NAME, TEMP_DBM_NAME, TEMP_DUMP_NAME,
+           TEMP_DUMP2_NAME]:
     if os.path.exists(fn):
         print fn, "already exists.  Please remove this file before " \
               "running these tests (a file by that name will be " \
@@ -37,18 +42,12 @@ for fn in [TEMP_PICKLE_NAME, TEMP_CSV_NAME, TEMP_DBM_NAME]:
 
 class dbexpimpTest(unittest.TestCase):
     def tearDown(self):
-        try:
-            os.remove(TEMP_PICKLE_NAME)
-        except OSError:
-            pass
-        try:
-            os.remove(TEMP_CSV_NAME)
-        except OSError:
-            pass
-        try:
-            os.remove(TEMP_DBM_NAME)
-        except OSError:
-            pass
+        for fn in [TEMP_PICKLE_NAME, TEMP_CSV_NAME, TEMP_DBM_NAME,
+                   TEMP_DUMP_NAME, TEMP_DUMP2_NAME]:
+            try:
+                os.remove(fn)
+            except OSError:
+                pass
         
     def test_csv_module_import(self):
         """Check that we don't import the old object craft csv module."""
@@ -234,6 +233,79 @@ class dbexpimpTest(unittest.TestCase):
             self.assertEqual(h, wi2.hamcount)
             self.assertEqual(s, wi2.spamcount)
 
+    def test_binary_export_and_import(self):
+        bayes = PickledClassifier(TEMP_PICKLE_NAME)
+        bayes.learn(tokenize(spam1), True)
+        bayes.learn(tokenize(good1), False)
+        bayes.learn([u"caf\xe9"], False)
+        bayes.store()
+        sb_dbexpimp.runExport(TEMP_PICKLE_NAME, "pickle", TEMP_DUMP_NAME,
+                              True)
+        self.assert_(os.path.getsize(TEMP_DUMP_NAME) <
+                     os.path.getsize(TEMP_PICKLE_NAME))
+        os.remove(TEMP_PICKLE_NAME)
+        sb_dbexpimp.runImport(TEMP_PICKLE_NAME, "pickle", True,
+                              TEMP_DUMP_NAME)
+        bayes2 = open_storage(TEMP_PICKLE_NAME, "pickle")
+        self.assertEqual(bayes2.nham, bayes.nham)
+        self.assertEqual(bayes2.nspam, bayes.nspam)
+        words = bayes._wordinfokeys()
+        words2 = bayes2._wordinfokeys()
+        words.sort()
+        words2.sort()
+        self.assertEqual(words2, words)
+        for word in words:
+            self.assertEqual(bayes2._wordinfoget(word).__getstate__(),
+                             bayes._wordinfoget(word).__getstate__())
+
+    def test_hashed_export(self):
+        # Hashed tokens without their text can't be told from text in a
+        # CSV file, so they're only exported to a token dump.
+        old_hash = options["Storage", "x-hash_tokens"]
+        old_keep_text = options["Storage", "x-hash_tokens_keep_text"]
+        options["Storage", "x-hash_tokens"] = True
+        options["Storage", "x-hash_tokens_keep_text"] = False
+        try:
+            bayes = CDBClassifier(TEMP_DBM_NAME)
+            bayes.learn(tokenize(spam1), True)
+            bayes.store()
+            bayes.close()
+        finally:
+            options["Storage", "x-hash_tokens"] = old_hash
+            options["Storage", "x-hash_tokens_keep_text"] = old_keep_text
+        self.assertRaises(ValueError, sb_dbexpimp.runExport, TEMP_DBM_NAME,
+                          "cdb", TEMP_CSV_NAME)
+        self.failIf(os.path.exists(TEMP_CSV_NAME))
+        sb_dbexpimp.runExport(TEMP_DBM_NAME, "cdb", TEMP_DUMP_NAME, True)
+        sb_dbexpimp.runImport(TEMP_PICKLE_NAME, "pickle", True,
+                              TEMP_DUMP_NAME)
+        bayes2 = open_storage(TEMP_PICKLE_NAME, "pickle")
+        self.assertEqual(bayes2.nspam, 1)
+        self.assert_(bayes2._wordinfokeys())
+
+    def test_merge_several(self):
+        # Two token dumps and a CSV file are all imported together.
+        for fn, tokens, is_spam in ((TEMP_DUMP_NAME, ["a", "b"], True),
+                                    (TEMP_DUMP2_NAME, ["b", "c"], False)):
+            bayes = PickledClassifier(TEMP_PICKLE_NAME)
+            bayes.learn(tokens, is_spam)
+            bayes.store()
+            sb_dbexpimp.runExport(TEMP_PICKLE_NAME, "pickle", fn, True)
+            os.remove(TEMP_PICKLE_NAME)
+        temp = open(TEMP_CSV_NAME, "wb")
+        temp.write("3,4\nc,1,2\nd,0,1\n")
+        temp.close()
+        sb_dbexpimp.runImport(TEMP_PICKLE_NAME, "pickle", True,
+                              [TEMP_DUMP_NAME, TEMP_CSV_NAME,
+                               TEMP_DUMP2_NAME])
+        bayes = open_storage(TEMP_PICKLE_NAME, "pickle")
+        self.assertEqual(bayes.nham, 4)
+        self.assertEqual(bayes.nspam, 5)
+        for word, spam, ham in (("a", 1, 0), ("b", 1, 1), ("c", 2, 2),
+                                ("d", 1, 0)):
+            wi = bayes._wordinfoget(word)
+            self.assertEqual((wi.spamcount, wi.hamcount), (spam, ham))
+
 
 def suite():
     suite = unittest.TestSuite()
@@ -0,0 +1,143 @@
+# Test the pool of SQL connections shared between threads.
+
+import unittest, sys
+import threading
+import time
+
+import sb_test_support
+sb_test_support.fix_sys_path()
+
+from spambayes.sqlpool import ConnectionPool
+
+class _Cursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def execute(self, query, params=()):
+        if self.conn.broken:
+            raise RuntimeError("server has gone away")
+        self.conn.queries.append(query)
+
+    def fetchall(self):
+        return [(1,)]
+
+class _Connection:
+    """A stand-in DB-API connection, which counts its queries."""
+    def __init__(self):
+        self.broken = self.closed = False
+        self.queries = []
+
+    def cursor(self):
+        return _Cursor(self)
+
+    def close(self):
+        self.closed = True
+
+class ConnectionPoolTestCase(unittest.TestCase):
+    def setUp(self):
+        self.made = []
+        self.pool = ConnectionPool(self.connect, 2)
+
+    def connect(self):
+        conn = _Connection()
+        self.made.append(conn)
+        return conn
+
+    def testReentrant(self):
+        pool = self.pool
+        self.assertRaises(RuntimeError, pool.connection)
+        conn = pool.acquire()
+        self.assert_(pool.acquire() is conn)
+        self.assert_(pool.connection() is conn)
+        pool.release()
+        self.assert_(pool.connection() is conn)
+        pool.release()
+        self.assertRaises(RuntimeError, pool.connection)
+        self.assertRaises(RuntimeError, pool.release)
+        # The connection is reused, rather than a new one made.
+        self.assert_(pool.acquire() is conn)
+        pool.release()
+        self.assertEqual(len(self.made), 1)
+
+    def testThreadsWait(self):
+        # Each thread gets a connection of its own, and when they're all
+        # in use, a thread waits for one to be released.
+        pool = self.pool
+        mine = pool.acquire()
+        got = []
+        holding = threading.Event()
+        done = threading.Event()
+        def hold():
+            got.append(pool.acquire())
+            holding.set()
+            done.wait()
+            pool.release()
+        def wait():
+            got.append(pool.acquire())
+            pool.release()
+        holder = threading.Thread(target=hold)
+        holder.start()
+        holding.wait()
+        self.assert_(got[0] is not mine)
+        waiter = threading.Thread(target=wait)
+        waiter.start()
+        while not pool.waits:
+            time.sleep(0.01)
+        self.assertEqual(len(got), 1)
+        pool.release()
+        waiter.join()
+        done.set()
+        holder.join()
+        self.assert_(got[1] is mine)
+        self.assertEqual(len(self.made), 2)
+
+    def testHealthCheck(self):
+        pool = self.pool
+        conn = pool.acquire()
+        pool.release()
+        # Recently used connections aren't checked.
+        self.assert_(pool.acquire() is conn)
+        pool.release()
+        self.assertEqual(conn.queries, [])
+        pool.check_after = -1
+        self.assert_(pool.acquire() is conn)
+        pool.release()
+        self.assertEqual(conn.queries, ["select 1"])
+        # A broken connection is closed and replaced.
+        conn.broken = True
+        new = pool.acquire()
+        pool.release()
+        self.assert_(new is not conn)
+        self.assert_(conn.closed)
+        self.assertEqual(pool.replaced, 1)
+
+    def testConnectFails(self):
+        # A failure to connect doesn't use up a place in the pool.
+        def fail():
+            raise RuntimeError("can't connect")
+        pool = ConnectionPool(fail, 1)
+        self.assertRaises(RuntimeError, pool.acquire)
+        pool.connect = self.connect
+        pool.acquire()
+        pool.release()
+        self.assertEqual(pool.waits, 0)
+
+    def testClose(self):
+        pool = self.pool
+        pool.acquire()
+        pool.release()
+        pool.close()
+        self.assert_(self.made[0].closed)
+        # A closed pool can still make new connections.
+        self.assert_(pool.acquire() is not self.made[0])
+        pool.release()
+
+def suite():
+    suite = unittest.TestSuite()
+    for cls in (ConnectionPoolTestCase,
+                ):
+        suite.addTest(unittest.makeSuite(cls))
+    return suite
+
+if __name__=='__main__':
+    sb_test_support.unittest_main(argv=sys.argv + ['suite'])
@@ -8,8 +8,19 @@ import cStringIO as StringIO
 import sb_test_support
 sb_test_support.fix_sys_path()
 
+from spambayes.Options import options
 from spambayes.storage import ZODBClassifier, CDBClassifier
 from spambayes.storage import DBDictClassifier, PickledClassifier
+from spambayes.storage import HashedToken, convert, copy_records
+from spambayes.storage import FrozenClassifier, FrozenClassifierError, freeze
+from spambayes.storage import SQLClassifier, SQLiteClassifier, WordInfoCache
+from spambayes.storage import JOURNAL_SUFFIX
+from spambayes.storage import TableClassifier, write_table, token_text
+from spambayes.storage import open_storage
+from spambayes.classifier import Classifier
+from spambayes.cdb_classifier import CdbClassifier
+
+from test_classifier import make_corpus
 
 class _StorageTestBase(unittest.TestCase):
     # Subclass must define a concrete StorageClass.
@@ -66,6 +77,40 @@ class _StorageTestBase(unittest.TestCase):
             self.assertEqual(c.nham, count-i-1)
             self.assertEqual(c.nspam, 0)
 
+    def testItems(self):
+        # _wordinfoitems() gives the records, stored or not, and the same
+        # ones as looking each of _wordinfokeys() up.
+        c = self.classifier
+        for i in range(7):
+            c.learn(["some", "tokens", "token%d" % i], i % 2)
+        c.store()
+        c.unlearn(["some", "tokens", "token0"], False)
+        c.learn(["other"], True)
+        items = list(c._wordinfoitems(batch=2))
+        self.assertEqual(len(items), 9)
+        for word, record in items:
+            self.assertEqual(record.__getstate__(),
+                             c._wordinfoget(word).__getstate__())
+        c.store()
+        self.assertEqual(len(list(c._wordinfoitems(batch=2))),
+                         len(c._wordinfokeys()))
+
+    def testCopyRecords(self):
+        bayes = Classifier()
+        for i in range(25):
+            bayes.learn(["some", "token%d" % i], True)
+        c = self.classifier
+        c.learn(["some", "other"], False)
+        count = copy_records(c, bayes._wordinfoitems(), batch=10, merge=True)
+        self.assertEqual(count, 26)
+        self._checkAllWordCounts((("some", 1, 25),
+                                  ("other", 1, 0),
+                                  ("token0", 0, 1),
+                                  ("token24", 0, 1)), True)
+        # The records copied from are left as they were.
+        self.assertEqual(bayes._wordinfoget("some").spamcount, 25)
+        self.assertEqual(bayes._wordinfoget("some").hamcount, 0)
+
     def _checkWordCounts(self, word, expected_ham, expected_spam):
         assert word
         info = self.classifier._wordinfoget(word)
@@ -145,7 +190,7 @@ class _StorageTestBase(unittest.TestCase):
         self._checkAllWordCounts([(word, 2, 0)], False)
 
         # Clone word's WordInfo record.
-        record = self.classifier.wordinfo[word]
+        record = self.classifier._wordinfoget(word)
         newrecord = type(record)()
         newrecord.__setstate__(record.__getstate__())
         self.assertEqual(newrecord.hamcount, 2)
@@ -171,6 +216,118 @@ class _StorageTestBase(unittest.TestCase):
 class PickleStorageTestCase(_StorageTestBase):
     StorageClass = PickledClassifier
 
+class CompactPickleStorageTestCase(PickleStorageTestCase):
+    def setUp(self):
+        self.old_compact = options["Classifier", "x-use_compact_wordinfo"]
+        options["Classifier", "x-use_compact_wordinfo"] = True
+        PickleStorageTestCase.setUp(self)
+
+    def tearDown(self):
+        PickleStorageTestCase.tearDown(self)
+        options["Classifier", "x-use_compact_wordinfo"] = self.old_compact
+
+class PickleJournalTestCase(unittest.TestCase):
+    def setUp(self):
+        self.db_name = tempfile.mktemp("spambayestest")
+        self.journal = self.db_name + JOURNAL_SUFFIX
+        self.old_percent = options["Storage", "pickle_journal_percent"]
+        options["Storage", "pickle_journal_percent"] = 50
+        self.classifier = PickledClassifier(self.db_name)
+        words = ["word%d" % i for i in range(100)]
+        self.classifier.learn(words, True)
+        self.classifier.learn(words[:50], False)
+        self.classifier.store()
+
+    def tearDown(self):
+        options["Storage", "pickle_journal_percent"] = self.old_percent
+        for name in glob.glob(self.db_name+"*"):
+            if os.path.isfile(name):
+                os.remove(name)
+
+    def _reopen(self):
+        self.classifier = PickledClassifier(self.db_name)
+        return self.classifier
+
+    def _counts(self, word):
+        record = self.classifier._wordinfoget(word)
+        if record is None:
+            return None
+        return record.spamcount, record.hamcount
+
+    def testJournal(self):
+        # Small changes go in the journal, leaving the pickle alone.
+        c = self.classifier
+        self.failIf(os.path.exists(self.journal))
+        f = open(self.db_name, "rb")
+        pickled = f.read()
+        f.close()
+        c.learn(["word1", "new", u"caf\xe9"], False)
+        c.unlearn(["word99"], True)
+        c.store()
+        self.assert_(os.path.exists(self.journal))
+        c.learn(["new"], True)
+        c.store()
+        f = open(self.db_name, "rb")
+        self.assertEqual(f.read(), pickled)
+        f.close()
+        c = self._reopen()
+        self.assertEqual(self._counts("word1"), (1, 2))
+        self.assertEqual(self._counts("new"), (1, 1))
+        self.assertEqual(self._counts(u"caf\xe9"), (0, 1))
+        self.assertEqual(self._counts("word99"), None)
+        self.assertEqual((c.nspam, c.nham), (1, 2))
+
+    def testCompaction(self):
+        # When the journal gets too big, the pickle is rewritten.
+        c = self.classifier
+        c.learn(["other%d" % i for i in range(1000)], False)
+        c.store()
+        self.failIf(os.path.exists(self.journal))
+        c = self._reopen()
+        self.assertEqual(self._counts("other999"), (0, 1))
+        self.assertEqual(c.nham, 2)
+        # And the next changes start a new journal.
+        c.learn(["new"], False)
+        c.store()
+        self.assert_(os.path.exists(self.journal))
+        c = self._reopen()
+        self.assertEqual(self._counts("new"), (0, 1))
+
+    def testCutShort(self):
+        # The end of a write that was cut short is ignored, and then
+        # overwritten.
+        c = self.classifier
+        c.learn(["new"], False)
+        c.store()
+        f = open(self.journal, "ab")
+        f.write("\x07\x00\x00\x00\x03\x00\x00\x00Sword")
+        f.close()
+        c = self._reopen()
+        self.assertEqual(self._counts("new"), (0, 1))
+        c.learn(["new"], False)
+        c.store()
+        c = self._reopen()
+        self.assertEqual(self._counts("new"), (0, 2))
+
+    def testOldJournalIgnored(self):
+        # A journal left behind by an older pickle isn't used.
+        c = self.classifier
+        c.learn(["new"], False)
+        c.store()
+        f = open(self.journal, "rb")
+        journal = f.read()
+        f.close()
+        c.compact()
+        self.failIf(os.path.exists(self.journal))
+        c.learn(["other"], True)
+        c.compact()
+        f = open(self.journal, "wb")
+        f.write(journal)
+        f.close()
+        c = self._reopen()
+        self.assertEqual(self._counts("new"), (0, 1))
+        self.assertEqual((c.nspam, c.nham), (2, 2))
+
 class DBStorageTestCase(_StorageTestBase):
     StorageClass = DBDictClassifier
 
@@ -195,25 +352,961 @@ class DBStorageTestCase(_StorageTestBase):
             if os.path.isfile(name):
                 os.remove(name)
 
+    def testItemsWalked(self):
+        # The records are read as the dbm's keys are walked through, not
+        # looked up from a list of all the keys.
+        c = self.classifier
+        c.learn(["some", "tokens"], True)
+        c.learn(["some"], False)
+        c.store()
+        c.learn(["other"], False)
+        def listed():
+            raise AssertionError("all the keys were listed")
+        c._wordinfokeys = listed
+        c.dbm.keys = listed
+        items = [(word, record.__getstate__())
+                 for word, record in c._wordinfoitems()]
+        items.sort()
+        self.assertEqual(items, [("other", (0, 1)), ("some", (1, 1)),
+                                 ("tokens", (1, 0))])
+
+    def testPrune(self):
+        from spambayes import classifier
+        old_track = options["Classifier", "x-track_last_seen"]
+        old_today = classifier.today
+        options["Classifier", "x-track_last_seen"] = True
+        try:
+            c = self.classifier
+            classifier.today = lambda: 1000
+            c.learn(["old", "common"], True)
+            classifier.today = lambda: 1100
+            c.learn(["new", "common"], False)
+            c.store()
+            self.assertEqual(c.prune(30), 1)
+            c.close()
+            self.classifier = self.StorageClass(self.db_name)
+            self._checkAllWordCounts((("old", 0, 0),
+                                      ("common", 1, 1),
+                                      ("new", 1, 0)), False)
+            self.assertEqual(self.classifier._wordinfoget("new").lastseen,
+                             1100)
+            self.assertEqual((self.classifier.nspam, self.classifier.nham),
+                             (1, 1))
+        finally:
+            options["Classifier", "x-track_last_seen"] = old_track
+            classifier.today = old_today
+
+    def testBoundedCache(self):
+        # Only the most recently used records are kept, but changed ones
+        # are kept until they're stored.
+        old_size = options["Storage", "wordinfo_cache_size"]
+        options["Storage", "wordinfo_cache_size"] = 2
+        try:
+            self.classifier.close()
+            self.classifier = self.StorageClass(self.db_name)
+            c = self.classifier
+            words = ["w%d" % i for i in range(5)]
+            c.learn(words, True)
+            c.learn(words, True)
+            self.assertEqual(len(c.wordinfo), 5)
+            c.store()
+            self.assertEqual(len(c.wordinfo), 2)
+            for word in words:
+                self.assertEqual(c._wordinfoget(word).spamcount, 2)
+            self.assertEqual(len(c.wordinfo), 2)
+            self.assert_(c.wordinfo.evictions >= 3)
+        finally:
+            options["Storage", "wordinfo_cache_size"] = old_size
+
+class WordInfoCacheTestCase(unittest.TestCase):
+    def setUp(self):
+        self.cache = WordInfoCache(3)
+
+    def testLeastRecentlyUsedEvicted(self):
+        cache = self.cache
+        for key in "abc":
+            cache[key] = key.upper()
+        self.assertEqual(cache.get("a"), "A")
+        cache["d"] = "D"
+        self.failIf("b" in cache)
+        self.assertEqual(cache.get("b"), None)
+        self.assertEqual([cache.get(key) for key in "acd"], ["A", "C", "D"])
+        self.assertEqual((cache.hits, cache.misses, cache.evictions),
+                         (4, 1, 1))
+
+    def testChangedKept(self):
+        cache = self.cache
+        for key in "abcde":
+            cache.change(key, key.upper())
+        # There's no room for anything else.
+        cache["f"] = "F"
+        self.failIf("f" in cache)
+        self.assertEqual(len(cache), 5)
+        self.assertEqual([cache[key] for key in "abcde"],
+                         ["A", "B", "C", "D", "E"])
+        # A record read from the database doesn't replace a changed one.
+        cache["a"] = "old"
+        self.assertEqual(cache["a"], "A")
+        cache.written()
+        self.assertEqual(len(cache), 3)
+        self.assertEqual(cache.evictions, 3)
+
+    def testDelete(self):
+        cache = self.cache
+        cache["a"] = "A"
+        cache.change("b", "B")
+        del cache["a"]
+        del cache["b"]
+        self.assertEqual(len(cache), 0)
+        self.assertRaises(KeyError, cache.__delitem__, "a")
+
+    def testMemoryLimit(self):
+        cache = WordInfoCache(0, 2 * WordInfoCache.ENTRY_BYTES + 10)
+        for key in ["k%d" % i for i in range(10)]:
+            cache[key] = 1
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.nbytes, 2 * (WordInfoCache.ENTRY_BYTES + 2))
+
 class CDBStorageTestCase(_StorageTestBase):
     StorageClass = CDBClassifier
 
+    def testLazyLoad(self):
+        # Opening the database reads no records; they are looked up as
+        # they're needed, and only changed ones are kept.
+        c = self.classifier
+        c.learn(["some", "simple", "tokens"], True)
+        c.learn(["some", "other"], False)
+        c.store()
+        self.assertEqual(c.wordinfo, {})
+        c.close()
+        self.classifier = c = self.StorageClass(self.db_name)
+        self.assertEqual(c.wordinfo, {})
+        self.assertEqual(c._wordinfoget("some").spamcount, 1)
+        self.assertEqual(c._wordinfoget("missing"), None)
+        self.assertEqual(c._wordinfoget(c.statekey), None)
+        c.spamprob(["some", "simple", "missing"])
+        self.assertEqual(c.wordinfo, {})
+
+    def testMergeChanges(self):
+        # store() writes the file's records along with the changes.
+        c = self.classifier
+        c.learn(["some", "simple", "tokens"], True)
+        c.store()
+        c.unlearn(["some", "simple", "tokens"], True)
+        c.learn(["some", "other"], False)
+        keys = c._wordinfokeys()
+        keys.sort()
+        self.assertEqual(keys, ["other", "some"])
+        c.store()
+        c.close()
+        self.classifier = c = self.StorageClass(self.db_name)
+        keys = c._wordinfokeys()
+        keys.sort()
+        self.assertEqual(keys, ["other", "some"])
+        self._checkAllWordCounts((("some", 1, 0),
+                                  ("other", 1, 0),
+                                  ("simple", 0, 0)), False)
+
+class CDBJournalTestCase(unittest.TestCase):
+    def setUp(self):
+        self.db_name = tempfile.mktemp("spambayestest")
+        self.journal = self.db_name + JOURNAL_SUFFIX
+        self.old_percent = options["Storage", "cdb_journal_percent"]
+        options["Storage", "cdb_journal_percent"] = 50
+        self.classifier = CDBClassifier(self.db_name)
+        words = ["word%d" % i for i in range(100)]
+        self.classifier.learn(words, True)
+        self.classifier.learn(words[:50], False)
+        self.classifier.store()
+
+    def tearDown(self):
+        self.classifier.close()
+        options["Storage", "cdb_journal_percent"] = self.old_percent
+        for name in glob.glob(self.db_name+"*"):
+            if os.path.isfile(name):
+                os.remove(name)
+
+    def _reopen(self):
+        self.classifier.close()
+        self.classifier = CDBClassifier(self.db_name)
+        return self.classifier
+
+    def _counts(self, word):
+        record = self.classifier._wordinfoget(word)
+        if record is None:
+            return None
+        return record.spamcount, record.hamcount
+
+    def testJournal(self):
+        # Small changes go in the journal, leaving the CDB file alone.
+        c = self.classifier
+        self.failIf(os.path.exists(self.journal))
+        size = os.path.getsize(self.db_name)
+        c.learn(["word1", "new"], False)
+        c.unlearn(["word99"], True)
+        c.store()
+        self.assert_(os.path.exists(self.journal))
+        self.assertEqual(os.path.getsize(self.db_name), size)
+        c = self._reopen()
+        self.assertEqual((c.nspam, c.nham), (0, 2))
+        self.assertEqual(self._counts("word1"), (1, 2))
+        self.assertEqual(self._counts("new"), (0, 1))
+        self.assertEqual(self._counts("word99"), None)
+        self.failIf("word99" in c._wordinfokeys())
+        # More changes are added to the same journal.
+        c.learn(["new"], False)
+        c.store()
+        c = self._reopen()
+        self.assertEqual(self._counts("new"), (0, 2))
+        self.assertEqual(c.nham, 3)
+
+    def testCompaction(self):
+        # Once the journal would be too big, the file is rewritten.
+        c = self.classifier
+        c.learn(["new"], False)
+        c.store()
+        self.assert_(os.path.exists(self.journal))
+        c.learn(["other%d" % i for i in range(1000)], False)
+        c.store()
+        self.failIf(os.path.exists(self.journal))
+        self.assertEqual(c.wordinfo, {})
+        c = self._reopen()
+        self.assertEqual(self._counts("new"), (0, 1))
+        self.assertEqual(self._counts("other999"), (0, 1))
+        self.assertEqual(c.nham, 3)
+
+    def testCutShort(self):
+        # The end of a write that was cut short is ignored, and then
+        # overwritten.
+        c = self.classifier
+        c.learn(["new"], False)
+        c.store()
+        f = open(self.journal, "ab")
+        f.write("\x07\x00\x00\x00\x03\x00\x00\x00word")
+        f.close()
+        c = self._reopen()
+        self.assertEqual(self._counts("new"), (0, 1))
+        c.learn(["new"], False)
+        c.store()
+        c = self._reopen()
+        self.assertEqual(self._counts("new"), (0, 2))
+
+    def testOldJournalIgnored(self):
+        # A journal left behind by an older file isn't used.
+        c = self.classifier
+        c.learn(["new"], False)
+        c.store()
+        f = open(self.journal, "rb")
+        journal = f.read()
+        f.close()
+        c.compact()
+        c.learn(["other"], True)
+        c.compact()
+        f = open(self.journal, "wb")
+        f.write(journal)
+        f.close()
+        c = self._reopen()
+        self.assertEqual(self._counts("new"), (0, 1))
+        self.assertEqual((c.nspam, c.nham), (2, 2))
+
 class ZODBStorageTestCase(_StorageTestBase):
     StorageClass = ZODBClassifier
 
+class SQLiteStorageTestCase(_StorageTestBase):
+    StorageClass = SQLiteClassifier
+
+    def testBatchedLookups(self):
+        # Scoring fetches all of a message's tokens in one query, and gets
+        # the same answer as looking them up one at a time.
+        corpus = make_corpus(60)
+        bayes = Classifier()
+        for tokens, is_spam in corpus[:40]:
+            self.classifier.learn(tokens, is_spam)
+            bayes.learn(tokens, is_spam)
+        self.classifier.store()
+        queries = []
+        real_get_many = self.classifier._wordinfoget_many
+        def get_many(words):
+            queries.append(words)
+            return real_get_many(words)
+        self.classifier._wordinfoget_many = get_many
+        for tokens, is_spam in corpus[40:]:
+            self.assertEqual(self.classifier.spamprob(tokens),
+                             bayes.spamprob(tokens))
+        self.assertEqual(len(queries), len(corpus[40:]))
+        # The messages have all sorts of numbers of tokens, but they're
+        # looked up with only a few different queries.
+        sizes = self.classifier._lookup_queries.keys()
+        for n in sizes:
+            self.assert_(n & (n - 1) == 0 or
+                         n == self.classifier._LOOKUP_BATCH)
+        self.assert_(len(sizes) < len(corpus[40:]))
+
+    def testUnstoredChanges(self):
+        # Changes are only written by store(), but are seen before then.
+        c = self.classifier
+        c.learn(["some", "tokens"], True)
+        c.store()
+        c.unlearn(["some", "tokens"], True)
+        c.learn(["other"], False)
+        self.assertEqual(c._wordinfoget("some"), None)
+        self.assertEqual(c._wordinfoget_many(["some", "other"]).keys(),
+                         ["other"])
+        self.assertEqual(c._wordinfokeys(), ["other"])
+        c.close()
+        self.classifier = self.StorageClass(self.db_name)
+        keys = self.classifier._wordinfokeys()
+        keys.sort()
+        self.assertEqual(keys, ["some", "tokens"])
+
+    def testPooledScoring(self):
+        # With a pool of connections, several threads score at once, each
+        # with a connection of its own, and get the same answers as one.
+        import threading
+        old_size = options["Storage", "sql_pool_size"]
+        options["Storage", "sql_pool_size"] = 3
+        try:
+            self.classifier.close()
+            self.classifier = c = self.StorageClass(self.db_name)
+        finally:
+            options["Storage", "sql_pool_size"] = old_size
+        self.assert_(c.concurrent_reads)
+        corpus = make_corpus(60)
+        for tokens, is_spam in corpus[:40]:
+            c.learn(tokens, is_spam)
+        c.store()
+        expected = [c.spamprob(tokens) for tokens, _is_spam in corpus[40:]]
+        results = {}
+        def score(n):
+            results[n] = [c.spamprob(tokens)
+                          for tokens, _is_spam in corpus[40:]]
+        threads = [threading.Thread(target=score, args=(n,))
+                   for n in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        for n in range(5):
+            self.assertEqual(results[n], expected)
+        self.assert_(c.pool.created <= 3)
+
+class _FormatCursor:
+    """An sqlite3 cursor that takes queries with %s placeholders, like the
+    PostgreSQL and MySQL modules, and logs them."""
+    def __init__(self, cursor, log):
+        self.cursor = cursor
+        self.log = log
+
+    def execute(self, query, params=()):
+        self.log.append(query)
+        return self.cursor.execute(query.replace("%s", "?"), params)
+
+    def executemany(self, query, seq):
+        self.log.append(query)
+        return self.cursor.executemany(query.replace("%s", "?"), seq)
+
+    def fetchall(self):
+        return self.cursor.fetchall()
+
+    def fetchone(self):
+        return self.cursor.fetchone()
+
+class FormatSQLClassifier(SQLClassifier):
+    """SQLClassifier, as PGClassifier and mySQLClassifier use it, on an
+    sqlite3 database."""
+    word_column = "word text not null primary key"
+
+    def __init__(self, db_name):
+        self.table_definition = ("create table bayes ("
+                                 "  " + self.word_column + ","
+                                 "  nspam integer not null default 0,"
+                                 "  nham integer not null default 0"
+                                 ")")
+        self.text_table_definition = ("create table bayes_text ("
+                                      "  word text not null primary key,"
+                                      "  text text not null default ''"
+                                      ")")
+        self.log = []
+        SQLClassifier.__init__(self, db_name)
+
+    def cursor(self):
+        return _FormatCursor(SQLClassifier.cursor(self), self.log)
+
+    def fetchall(self, c):
+        return c.fetchall()
+
+    def _connect(self):
+        import sqlite3
+        db = sqlite3.connect(self.db_name, check_same_thread=False)
+        db.text_factory = str
+        return db
+
+    def load(self):
+        import sqlite3
+        self._open_pool()
+        self.pool.acquire()
+        try:
+            try:
+                self.cursor().execute("select count(*) from bayes")
+            except sqlite3.OperationalError:
+                self.create_bayes()
+        finally:
+            self.pool.release()
+        is_new = not self._has_key(self.statekey)
+        if is_new:
+            self.nspam = self.nham = 0
+        else:
+            row = self._get_row(self.statekey)
+            self.nspam, self.nham = row[1], row[2]
+        self._load_token_hashing(is_new)
+        self._load_bloom()
+
+class FoldingSQLClassifier(FormatSQLClassifier):
+    """FormatSQLClassifier with words compared without regard to case, as
+    MySQL's default collation does."""
+    word_column = "word text not null primary key collate nocase"
+
+class FormatSQLStorageTestCase(_StorageTestBase):
+    StorageClass = FormatSQLClassifier
+
+    def testBatchedQueries(self):
+        # Training on or scoring a message takes one query to fetch all
+        # its tokens' records, and training one more to delete the old
+        # ones and another to insert the new ones.
+        c = self.classifier
+        corpus = make_corpus(20)
+        for tokens, is_spam in corpus[:10]:
+            del c.log[:]
+            c.learn(tokens, is_spam)
+            self.assertEqual([query.split()[0] for query in c.log],
+                             ["select", "delete", "insert"])
+        c.store()
+        bayes = Classifier()
+        for tokens, is_spam in corpus[:10]:
+            bayes.learn(tokens, is_spam)
+        for tokens, is_spam in corpus[10:]:
+            del c.log[:]
+            self.assertEqual(c.spamprob(tokens), bayes.spamprob(tokens))
+            self.assertEqual(len(c.log), 1)
+        c.close()
+        self.classifier = c = self.StorageClass(self.db_name)
+        for tokens, is_spam in corpus[10:]:
+            self.assertEqual(c.spamprob(tokens), bayes.spamprob(tokens))
+
+    def testFoldedMatches(self):
+        # A row for a word that only matches one asked for without regard
+        # to case isn't taken for it.
+        self.classifier.close()
+        os.remove(self.db_name)
+        self.classifier = c = FoldingSQLClassifier(self.db_name)
+        c.learn(["subject:free"], True)
+        c.store()
+        self.assertEqual(c._wordinfoget("Subject:FREE"), None)
+        self.assertEqual(c._wordinfoget_many(["Subject:FREE",
+                                              "subject:free"]).keys(),
+                         ["subject:free"])
+        self.assertEqual(c.spamprob(["Subject:FREE"]),
+                         Classifier().spamprob(["Subject:FREE"]))
+        self._checkWordCounts("subject:free", 0, 1)
+
+class _BloomStorageTests:
+    # Mixed in ahead of _StorageTestBase by a subclass, which must define
+    # a concrete StorageClass.
+    def setUp(self):
+        self.old_bloom = options["Storage", "x-negative_lookup_filter"]
+        options["Storage", "x-negative_lookup_filter"] = True
+        try:
+            _StorageTestBase.setUp(self)
+        except:
+            options["Storage", "x-negative_lookup_filter"] = self.old_bloom
+            raise
+
+    def tearDown(self):
+        try:
+            _StorageTestBase.tearDown(self)
+        finally:
+            options["Storage", "x-negative_lookup_filter"] = self.old_bloom
+
+    def testUnknownNotLookedUp(self):
+        c = self.classifier
+        c.learn(["some", "tokens"], True)
+        c.learn(["some", "tokens"], False)
+        c.store()
+        c.close()
+        self.classifier = c = self.StorageClass(self.db_name)
+        self.assertEqual(len(c.bloom), len(c._wordinfokeys()) + 1)
+        for word in ["unknown%d" % i for i in range(100)]:
+            record = c._wordinfoget(word)
+            self.failIf(record and (record.spamcount or record.hamcount))
+        self.assert_(c.bloom.rejections > 90)
+        self.assertEqual(c.bloom.checks,
+                         c.bloom.rejections + c.bloom.false_positives)
+        # Known and newly trained tokens are still found.
+        c.learn(["new"], True)
+        self._checkAllWordCounts((("some", 1, 1),
+                                  ("tokens", 1, 1),
+                                  ("new", 0, 1)), False)
+
+class _HashedStorageTests:
+    # Mixed in ahead of _StorageTestBase by a subclass, which must define
+    # a concrete StorageClass; not a TestCase itself, so that it isn't
+    # collected on its own.
+    keep_text = False
+
+    def setUp(self):
+        self.old_hash = options["Storage", "x-hash_tokens"]
+        self.old_keep_text = options["Storage", "x-hash_tokens_keep_text"]
+        options["Storage", "x-hash_tokens"] = True
+        options["Storage", "x-hash_tokens_keep_text"] = self.keep_text
+        try:
+            _StorageTestBase.setUp(self)
+        except:
+            # tearDown() isn't run when setUp() fails.
+            self._restore_options()
+            raise
+
+    def tearDown(self):
+        try:
+            _StorageTestBase.tearDown(self)
+        finally:
+            self._restore_options()
+
+    def _restore_options(self):
+        options["Storage", "x-hash_tokens"] = self.old_hash
+        options["Storage", "x-hash_tokens_keep_text"] = self.old_keep_text
+
+    def testHashingKept(self):
+        # The database stays hashed, whatever the options say later.
+        c = self.classifier
+        c.learn(["some", "tokens"], True)
+        c.learn(["some"], False)
+        c.store()
+        c.close()
+        options["Storage", "x-hash_tokens"] = False
+        self.classifier = self.StorageClass(self.db_name)
+        self.assert_(self.classifier.hash_tokens)
+        self._checkAllWordCounts((("some", 1, 1), ("tokens", 0, 1)), False)
+
+    def testKeys(self):
+        c = self.classifier
+        c.learn(["some", "tokens"], True)
+        c.learn(["some"], False)
+        c.store()
+        keys = c._wordinfokeys()
+        keys.sort()
+        if self.keep_text:
+            self.assertEqual(keys, ["some", "tokens"])
+        else:
+            self.assertEqual(len(keys), 2)
+            for key in keys:
+                self.assert_(isinstance(key, HashedToken))
+        # Either way, the keys can be used to fetch the records.
+        counts = [(c._wordinfoget(key).spamcount,
+                   c._wordinfoget(key).hamcount) for key in keys]
+        counts.sort()
+        self.assertEqual(counts, [(1, 0), (1, 1)])
+
+class HashedCDBStorageTestCase(_HashedStorageTests, _StorageTestBase):
+    StorageClass = CDBClassifier
+
+class HashedTextCDBStorageTestCase(_HashedStorageTests, _StorageTestBase):
+    StorageClass = CDBClassifier
+    keep_text = True
+
+class HashedDBStorageTestCase(_HashedStorageTests, _StorageTestBase):
+    StorageClass = DBDictClassifier
+
+class HashedTextDBStorageTestCase(_HashedStorageTests, _StorageTestBase):
+    StorageClass = DBDictClassifier
+    keep_text = True
+
+class HashedSQLiteStorageTestCase(_HashedStorageTests, _StorageTestBase):
+    StorageClass = SQLiteClassifier
+
+class HashedTextSQLiteStorageTestCase(_HashedStorageTests, _StorageTestBase):
+    StorageClass = SQLiteClassifier
+    keep_text = True
+
+class HashedFormatSQLStorageTestCase(_HashedStorageTests, _StorageTestBase):
+    StorageClass = FormatSQLClassifier
+
+class HashedTextFormatSQLStorageTestCase(_HashedStorageTests,
+                                         _StorageTestBase):
+    StorageClass = FormatSQLClassifier
+    keep_text = True
+
+class BloomDBStorageTestCase(_BloomStorageTests, _StorageTestBase):
+    StorageClass = DBDictClassifier
+
+class BloomSQLiteStorageTestCase(_BloomStorageTests, _StorageTestBase):
+    StorageClass = SQLiteClassifier
+
+class ConvertHashedTestCase(unittest.TestCase):
+    def setUp(self):
+        self.db_name = tempfile.mktemp("spambayestest")
+        bayes = PickledClassifier(self.db_name + ".pck")
+        bayes.learn(["some", "simple", "tokens"], True)
+        bayes.learn(["some", "other"], False)
+        bayes.store()
+        self.stderr = sys.stderr
+        sys.stderr = StringIO.StringIO()
+
+    def tearDown(self):
+        sys.stderr = self.stderr
+        for name in glob.glob(self.db_name+"*"):
+            if os.path.isfile(name):
+                os.remove(name)
+
+    def _check(self, bayes):
+        self.assertEqual((bayes.nspam, bayes.nham), (1, 1))
+        for word, spamcount, hamcount in (("some", 1, 1),
+                                          ("simple", 1, 0),
+                                          ("other", 0, 1)):
+            record = bayes._wordinfoget(word)
+            self.assertEqual((record.spamcount, record.hamcount),
+                             (spamcount, hamcount))
+
+    def testConvert(self):
+        convert(self.db_name + ".pck", "pickle",
+                self.db_name + ".cdb", "cdb", hash_tokens=True)
+        self.failIf(options["Storage", "x-hash_tokens"])
+        bayes = CDBClassifier(self.db_name + ".cdb")
+        self.assert_(bayes.hash_tokens)
+        self._check(bayes)
+        # The hashes can be converted to another hashed database.
+        convert(self.db_name + ".cdb", "cdb",
+                self.db_name + "2.cdb", "cdb", hash_tokens=True)
+        self._check(CDBClassifier(self.db_name + "2.cdb"))
+        # But there are no tokens to convert back to.
+        self.assertRaises(ValueError, convert,
+                          self.db_name + ".cdb", "cdb",
+                          self.db_name + ".pck2", "pickle")
+
+    def testConvertKeepingText(self):
+        convert(self.db_name + ".pck", "pickle",
+                self.db_name + ".cdb", "cdb", hash_tokens=True,
+                keep_text=True)
+        convert(self.db_name + ".cdb", "cdb",
+                self.db_name + ".pck2", "pickle")
+        bayes = PickledClassifier(self.db_name + ".pck2")
+        self._check(bayes)
+        words = bayes._wordinfokeys()
+        words.sort()
+        self.assertEqual(words, ["other", "simple", "some", "tokens"])
+
+class StreamedClassifier(Classifier):
+    # A classifier that can only give its records one at a time, to check
+    # that a whole database is never listed at once.
+    def _wordinfokeys(self):
+        raise AssertionError("all the words were listed")
+
+    def _wordinfoget_many(self, words):
+        raise AssertionError("records were fetched by key")
+
+    def _wordinfoitems(self, batch=1000):
+        return self.wordinfo.iteritems()
+
+class FrozenClassifierTestCase(unittest.TestCase):
+    def setUp(self):
+        self.db_name = tempfile.mktemp("spambayestest")
+        self.bayes = Classifier()
+        for tokens, is_spam in make_corpus(200):
+            self.bayes.learn(tokens, is_spam)
+        self.msgs = [tokens + ["unknown%d" % i]
+                     for i, (tokens, _s) in enumerate(make_corpus(50, 2))]
+        self.frozen = None
+
+    def tearDown(self):
+        if self.frozen is not None:
+            self.frozen.close()
+        for name in glob.glob(self.db_name+"*"):
+            if os.path.isfile(name):
+                os.remove(name)
+
+    def _freeze(self, bayes=None):
+        if bayes is None:
+            bayes = self.bayes
+        freeze(bayes, self.db_name)
+        if self.frozen is None:
+            self.frozen = open_storage(self.db_name, "frozen")
+        return self.frozen
+
+    def testSameScores(self):
+        frozen = self._freeze()
+        self.assert_(isinstance(frozen, FrozenClassifier))
+        self.assertEqual((frozen.nspam, frozen.nham),
+                         (self.bayes.nspam, self.bayes.nham))
+        for msg in self.msgs:
+            self.assertEqual(frozen.spamprob(msg, True),
+                             self.bayes.spamprob(msg, True))
+        self.assertEqual(frozen.spamprob_many(self.msgs),
+                         self.bayes.spamprob_many(self.msgs))
+
+    def testStreamed(self):
+        # The records are read one at a time, not all fetched at once.
+        bayes = StreamedClassifier()
+        bayes.nham, bayes.nspam = self.bayes.nham, self.bayes.nspam
+        bayes.wordinfo = self.bayes.wordinfo
+        frozen = self._freeze(bayes)
+        for msg in self.msgs:
+            self.assertEqual(frozen.spamprob(msg), self.bayes.spamprob(msg))
+
+    def testWeakTokensLeftOut(self):
+        frozen = self._freeze()
+        mindist = options["Classifier", "minimum_prob_strength"]
+        keys = frozen._wordinfokeys()
+        self.assert_(0 < len(keys) < len(self.bayes._wordinfokeys()))
+        for word in keys:
+            prob = frozen.probability(frozen._wordinfoget(word))
+            self.assert_(abs(prob - 0.5) >= mindist)
+            self.assertEqual(prob, self.bayes.probability(
+                self.bayes._wordinfoget(word)))
+
+    def testReadOnly(self):
+        frozen = self._freeze()
+        tokens = self.msgs[0]
+        self.assertRaises(FrozenClassifierError, frozen.learn, tokens, True)
+        self.assertRaises(FrozenClassifierError, frozen.unlearn, tokens, True)
+        self.assertRaises(FrozenClassifierError, frozen.learn_many,
+                          [(tokens, True)])
+        self.assertRaises(FrozenClassifierError, frozen.prune, 0)
+        self.assertRaises(FrozenClassifierError, frozen.store)
+        self.assertEqual((frozen.nspam, frozen.nham),
+                         (self.bayes.nspam, self.bayes.nham))
+
+    def testRefresh(self):
+        frozen = self._freeze()
+        self.failIf(frozen.refresh())
+        before = frozen.spamprob(self.msgs[0])
+        generation = frozen.generation
+        for tokens in self.msgs[:10]:
+            self.bayes.learn(tokens, True)
+        freeze(self.bayes, self.db_name)
+        self.assert_(frozen.refresh())
+        self.assert_(frozen.generation > generation)
+        self.assertEqual(frozen.nspam, self.bayes.nspam)
+        self.assertNotEqual(frozen.spamprob(self.msgs[0]), before)
+        self.assertEqual(frozen.spamprob(self.msgs[0]),
+                         self.bayes.spamprob(self.msgs[0]))
+        self.failIf(frozen.refresh())
+
+    def testHashed(self):
+        old_hash = options["Storage", "x-hash_tokens"]
+        options["Storage", "x-hash_tokens"] = True
+        try:
+            bayes = CDBClassifier(self.db_name + ".cdb")
+            for tokens, is_spam in make_corpus(200):
+                bayes.learn(tokens, is_spam)
+        finally:
+            options["Storage", "x-hash_tokens"] = old_hash
+        frozen = self._freeze(bayes)
+        self.assert_(frozen.hash_tokens)
+        for msg in self.msgs:
+            self.assertEqual(frozen.spamprob(msg, True),
+                             self.bayes.spamprob(msg, True))
+
+    def testCdbClassifier(self):
+        # The older cdb_classifier can read a snapshot, and a snapshot
+        # can be opened from one of its files.
+        self._freeze()
+        cdbfile = open(self.db_name, "rb")
+        try:
+            reader = CdbClassifier(cdbfile)
+            for msg in self.msgs:
+                self.assertEqual(reader.spamprob(msg),
+                                 self.bayes.spamprob(msg))
+        finally:
+            cdbfile.close()
+        writer = CdbClassifier()
+        writer.wordinfo = self.bayes.wordinfo
+        writer.nspam, writer.nham = self.bayes.nspam, self.bayes.nham
+        cdbfile = open(self.db_name + ".old", "wb")
+        try:
+            writer.save_wordinfo(cdbfile)
+        finally:
+            cdbfile.close()
+        old = FrozenClassifier(self.db_name + ".old")
+        try:
+            self.assertEqual((old.nspam, old.nham), (0, 0))
+            self.assertEqual(old.spamprob(self.msgs[0]),
+                             self.bayes.spamprob(self.msgs[0]))
+        finally:
+            old.close()
+
+class TableClassifierTestCase(unittest.TestCase):
+    def setUp(self):
+        self.db_name = tempfile.mktemp("spambayestest")
+        self.bayes = Classifier()
+        for tokens, is_spam in make_corpus(200):
+            self.bayes.learn(tokens, is_spam)
+        self.bayes.learn([u"caf\xe9"], False)
+        self.msgs = [tokens + ["unknown%d" % i]
+                     for i, (tokens, _s) in enumerate(make_corpus(50, 2))]
+        self.table = None
+
+    def tearDown(self):
+        if self.table is not None:
+            self.table.close()
+        for name in glob.glob(self.db_name+"*"):
+            if os.path.isfile(name):
+                os.remove(name)
+
+    def _write(self, bayes=None):
+        if bayes is None:
+            bayes = self.bayes
+        write_table(bayes, self.db_name)
+        if self.table is None:
+            self.table = open_storage(self.db_name, "table")
+        return self.table
+
+    def testSameScores(self):
+        table = self._write()
+        self.assert_(isinstance(table, TableClassifier))
+        self.assertEqual((table.nspam, table.nham),
+                         (self.bayes.nspam, self.bayes.nham))
+        for msg in self.msgs:
+            self.assertEqual(table.spamprob(msg, True),
+                             self.bayes.spamprob(msg, True))
+        # Unlike a frozen snapshot, the counts are kept, so the scores
+        # follow the options.
+        old_prob = options["Classifier", "unknown_word_prob"]
+        options["Classifier", "unknown_word_prob"] = 0.4
+        try:
+            self.assertEqual(table.spamprob(self.msgs[0]),
+                             self.bayes.spamprob(self.msgs[0]))
+        finally:
+            options["Classifier", "unknown_word_prob"] = old_prob
+
+    def testRecords(self):
+        table = self._write()
+        keys = table._wordinfokeys()
+        expected = self.bayes._wordinfokeys()
+        keys.sort()
+        expected.sort()
+        self.assertEqual(keys, [token_text(word) for word in expected])
+        for word in expected:
+            self.assertEqual(table._wordinfoget(word).__getstate__(),
+                             self.bayes._wordinfoget(word).__getstate__())
+        self.assertEqual(table._wordinfoget("unknown"), None)
+        items = [(word, record.__getstate__())
+                 for word, record in table._wordinfoitems()]
+        items.sort()
+        self.assertEqual(items, [(word,
+                                  table._wordinfoget(word).__getstate__())
+                                 for word in keys])
+
+    def testStreamed(self):
+        # The records are read one at a time, not all fetched at once.
+        bayes = StreamedClassifier()
+        bayes.nham, bayes.nspam = self.bayes.nham, self.bayes.nspam
+        bayes.wordinfo = self.bayes.wordinfo
+        table = self._write(bayes)
+        for msg in self.msgs:
+            self.assertEqual(table.spamprob(msg), self.bayes.spamprob(msg))
+
+    def testReadOnly(self):
+        table = self._write()
+        self.assertRaises(FrozenClassifierError, table.learn,
+                          self.msgs[0], True)
+        self.assertRaises(FrozenClassifierError, table.store)
+
+    def testRefresh(self):
+        table = self._write()
+        self.failIf(table.refresh())
+        for tokens in self.msgs[:10]:
+            self.bayes.learn(tokens, True)
+        write_table(self.bayes, self.db_name)
+        self.assert_(table.refresh())
+        self.assertEqual(table.nspam, self.bayes.nspam)
+        self.assertEqual(table.spamprob(self.msgs[0]),
+                         self.bayes.spamprob(self.msgs[0]))
+
+    def testFromHashed(self):
+        # A table made from a database of hashed tokens has only the
+        # hashes, but scores the same.
+        old_hash = options["Storage", "x-hash_tokens"]
+        options["Storage", "x-hash_tokens"] = True
+        try:
+            bayes = CDBClassifier(self.db_name + ".cdb")
+            for tokens, is_spam in make_corpus(200):
+                bayes.learn(tokens, is_spam)
+        finally:
+            options["Storage", "x-hash_tokens"] = old_hash
+        table = self._write(bayes)
+        self.failIf(table.keep_token_text)
+        for word in table._wordinfokeys():
+            self.assert_(isinstance(word, HashedToken))
+        for msg in self.msgs:
+            self.assertEqual(table.spamprob(msg), bayes.spamprob(msg))
+        # A frozen snapshot has no counts to write.
+        freeze(bayes, self.db_name + ".frozen")
+        frozen = FrozenClassifier(self.db_name + ".frozen")
+        try:
+            self.assertRaises(ValueError, write_table, frozen, self.db_name)
+        finally:
+            frozen.close()
+
+    def testConvert(self):
+        pickled = PickledClassifier(self.db_name + ".pickle")
+        for tokens, is_spam in make_corpus(100):
+            pickled.learn(tokens, is_spam)
+        pickled.store()
+        err = sys.stderr
+        sys.stderr = StringIO.StringIO()
+        try:
+            convert(self.db_name + ".pickle", "pickle", self.db_name, "table")
+        finally:
+            sys.stderr = err
+        self.table = open_storage(self.db_name, "table")
+        for msg in self.msgs:
+            self.assertEqual(self.table.spamprob(msg), pickled.spamprob(msg))
+
 def suite():
     suite = unittest.TestSuite()
     clses = (PickleStorageTestCase,
+             CompactPickleStorageTestCase,
+             PickleJournalTestCase,
              CDBStorageTestCase,
+             HashedCDBStorageTestCase,
+             HashedTextCDBStorageTestCase,
+             ConvertHashedTestCase,
+             FrozenClassifierTestCase,
+             TableClassifierTestCase,
+             WordInfoCacheTestCase,
+             CDBJournalTestCase,
              )
     from spambayes.port import bsddb
     from spambayes.port import gdbm
     
     if gdbm or bsddb:
-        clses += (DBStorageTestCase,)
+        clses += (DBStorageTestCase,
+                  HashedDBStorageTestCase,
+                  HashedTextDBStorageTestCase,
+                  BloomDBStorageTestCase,
+                  )
     else:
         print "Skipping dbm tests, no dbm module available"
 
+    try:
+        import sqlite3
+    except ImportError:
+        try:
+            from pysqlite2 import dbapi2
+        except ImportError:
+            print "Skipping SQLite tests, sqlite3 not available"
+            dbapi2 = None
+    else:
+        dbapi2 = sqlite3
+    if dbapi2 is not None:
+        clses += (SQLiteStorageTestCase,
+                  HashedSQLiteStorageTestCase,
+                  HashedTextSQLiteStorageTestCase,
+                  BloomSQLiteStorageTestCase,
+                  FormatSQLStorageTestCase,
+                  HashedFormatSQLStorageTestCase,
+                  HashedTextFormatSQLStorageTestCase,
+                  )
+
     try:
         import ZODB
     except ImportError:
@@ -0,0 +1,68 @@
+# Test the storage benchmarks.
+
+import unittest, os, sys
+import tempfile
+
+import sb_test_support
+sb_test_support.fix_sys_path()
+
+from spambayes import storagebench
+
+class StorageBenchTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        for name in os.listdir(self.directory):
+            os.remove(os.path.join(self.directory, name))
+        os.rmdir(self.directory)
+
+    def testCorpusReproducible(self):
+        corpus = storagebench.make_corpus(50)
+        self.assertEqual(corpus, storagebench.make_corpus(50))
+        self.assertNotEqual(corpus, storagebench.make_corpus(50, seed=1))
+        self.assertEqual(len(corpus), 50)
+        spam = [is_spam for tokens, is_spam in corpus if is_spam]
+        self.assert_(0 < len(spam) < 50)
+
+    def testPercentiles(self):
+        times = [i / 1000.0 for i in range(1, 101)]
+        times.reverse()
+        p = storagebench.percentiles(times)
+        self.assertEqual(int(round(p["p50"])), 51)
+        self.assertEqual(int(round(p["p99"])), 100)
+        self.assertEqual(int(round(p["max"])), 100)
+
+    def testRun(self):
+        report = storagebench.run(["pickle", "nosuch"], [40, 80], 10,
+                                  self.directory)
+        self.assertEqual(report["skipped"].keys(), ["nosuch"])
+        results = report["results"]
+        self.assertEqual([(r["storage"], r["messages"]) for r in results],
+                         [("pickle", 40), ("pickle", 80)])
+        for result in results:
+            self.assertEqual(result["scored"], 10)
+            self.assert_(result["disk_bytes"] > 0)
+            self.assert_(result["cold_ms"]["p50"] <= result["cold_ms"]["max"])
+        self.assert_(results[0]["tokens"] < results[1]["tokens"])
+        # The databases are cleaned up, and the report is JSON.
+        self.assertEqual(os.listdir(self.directory), [])
+        loaded = storagebench.json.loads(storagebench.dumps(report))
+        self.assertEqual(loaded["results"][0]["tokens"],
+                         results[0]["tokens"])
+
+    def testIsolated(self):
+        report = storagebench.run(["pickle"], [20], 5, self.directory,
+                                  isolate=True)
+        self.assert_(report["isolated"])
+        self.assertEqual(report["results"][0]["messages"], 20)
+
+def suite():
+    suite = unittest.TestSuite()
+    for cls in (StorageBenchTestCase,
+                ):
+        suite.addTest(unittest.makeSuite(cls))
+    return suite
+
+if __name__=='__main__':
+    sb_test_support.unittest_main(argv=sys.argv + ['suite'])
@@ -0,0 +1,185 @@
+# Test sharing a classifier between threads.
+
+import unittest, sys
+import threading
+
+import sb_test_support
+sb_test_support.fix_sys_path()
+
+from spambayes.Options import options
+from spambayes.classifier import Classifier
+from spambayes.threadsafe import ReadWriteLock, LockedClassifier
+
+from test_classifier import make_corpus
+
+def start(func, *args):
+    """Run func(*args) in a new thread, and return the thread."""
+    thread = threading.Thread(target=func, args=args)
+    thread.setDaemon(True)
+    thread.start()
+    return thread
+
+class ReadWriteLockTestCase(unittest.TestCase):
+    def setUp(self):
+        self.lock = ReadWriteLock()
+
+    def _try(self, acquire, release):
+        """Return whether another thread can get the lock promptly."""
+        got = threading.Event()
+        def run():
+            acquire()
+            got.set()
+            release()
+        thread = start(run)
+        got.wait(0.5)
+        return got.isSet(), thread
+
+    def testReadersShare(self):
+        lock = self.lock
+        lock.acquire_read()
+        got, thread = self._try(lock.acquire_read, lock.release_read)
+        self.assert_(got)
+        thread.join()
+        lock.release_read()
+
+    def testWriterExcludesReaders(self):
+        lock = self.lock
+        lock.acquire_write()
+        got, thread = self._try(lock.acquire_read, lock.release_read)
+        self.failIf(got)
+        lock.release_write()
+        thread.join(5)
+        self.failIf(thread.isAlive())
+
+    def testReaderExcludesWriter(self):
+        lock = self.lock
+        lock.acquire_read()
+        got, thread = self._try(lock.acquire_write, lock.release_write)
+        self.failIf(got)
+        lock.release_read()
+        thread.join(5)
+        self.failIf(thread.isAlive())
+
+    def testWaitingWriterBlocksNewReaders(self):
+        lock = self.lock
+        lock.acquire_read()
+        got, writer = self._try(lock.acquire_write, lock.release_write)
+        self.failIf(got)
+        got, reader = self._try(lock.acquire_read, lock.release_read)
+        self.failIf(got)
+        lock.release_read()
+        writer.join(5)
+        reader.join(5)
+        self.failIf(writer.isAlive() or reader.isAlive())
+
+    def testWriterReenters(self):
+        lock = self.lock
+        lock.acquire_write()
+        lock.acquire_write()
+        lock.acquire_read()
+        lock.release_read()
+        lock.release_write()
+        got, thread = self._try(lock.acquire_read, lock.release_read)
+        self.failIf(got)
+        lock.release_write()
+        thread.join(5)
+        self.failIf(thread.isAlive())
+
+    def testBadRelease(self):
+        self.assertRaises(RuntimeError, self.lock.release_read)
+        self.assertRaises(RuntimeError, self.lock.release_write)
+
+class RecordingLock(ReadWriteLock):
+    def __init__(self):
+        ReadWriteLock.__init__(self)
+        self.calls = []
+
+    def acquire_read(self):
+        self.calls.append("read")
+        ReadWriteLock.acquire_read(self)
+
+    def acquire_write(self):
+        self.calls.append("write")
+        ReadWriteLock.acquire_write(self)
+
+class LockedClassifierTestCase(unittest.TestCase):
+    def setUp(self):
+        self.old_track = options["Classifier", "x-track_last_seen"]
+        self.corpus = make_corpus(200)
+        self.classifier = Classifier()
+        for tokens, is_spam in self.corpus[:100]:
+            self.classifier.learn(tokens, is_spam)
+        self.lock = RecordingLock()
+        self.locked = LockedClassifier(self.classifier, self.lock)
+
+    def tearDown(self):
+        options["Classifier", "x-track_last_seen"] = self.old_track
+
+    def testLocks(self):
+        tokens = self.corpus[0][0]
+        self.locked.spamprob(tokens)
+        self.locked.spamprob_many([tokens])
+        self.locked.learn(tokens, True)
+        self.locked.unlearn(tokens, True)
+        self.locked.learn_many([(tokens, False)])
+        self.assertEqual(self.lock.calls,
+                         ["read", "read", "write", "write", "write"])
+
+    def testExclusiveScoring(self):
+        tokens = self.corpus[0][0]
+        options["Classifier", "x-track_last_seen"] = True
+        self.locked.spamprob(tokens)
+        options["Classifier", "x-track_last_seen"] = False
+        self.classifier.concurrent_reads = False
+        self.locked.spamprob(tokens)
+        self.assertEqual(self.lock.calls, ["write", "write"])
+
+    def testPassThrough(self):
+        self.assertEqual(self.locked.nspam, self.classifier.nspam)
+        self.assertEqual(self.locked._wordinfoget("w1"),
+                         self.classifier._wordinfoget("w1"))
+
+    def testConcurrentScoringAndTraining(self):
+        locked = self.locked
+        msgs = [tokens for tokens, _s in self.corpus]
+        errors = []
+        def score():
+            try:
+                for _i in xrange(3):
+                    for prob in locked.spamprob_many(msgs):
+                        assert 0.0 <= prob <= 1.0
+                    for tokens in msgs[:20]:
+                        locked.spamprob(tokens)
+            except Exception, e:
+                errors.append(e)
+        def train():
+            try:
+                for tokens, is_spam in self.corpus[100:]:
+                    locked.learn(tokens, is_spam)
+            except Exception, e:
+                errors.append(e)
+        threads = [start(score) for _i in xrange(4)] + [start(train)]
+        for thread in threads:
+            thread.join(60)
+            self.failIf(thread.isAlive())
+        self.assertEqual(errors, [])
+
+        # The result is just as if it had all been done in one thread.
+        expected = Classifier()
+        for tokens, is_spam in self.corpus:
+            expected.learn(tokens, is_spam)
+        self.assertEqual((locked.nspam, locked.nham),
+                         (expected.nspam, expected.nham))
+        self.assertEqual(locked.spamprob_many(msgs),
+                         expected.spamprob_many(msgs))
+
+def suite():
+    suite = unittest.TestSuite()
+    for cls in (ReadWriteLockTestCase,
+                LockedClassifierTestCase,
+                ):
+        suite.addTest(unittest.makeSuite(cls))
+    return suite
+
+if __name__=='__main__':
+    sb_test_support.unittest_main(argv=sys.argv + ['suite'])
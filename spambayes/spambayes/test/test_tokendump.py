@@ -0,0 +1,93 @@
+# Test the token dump file format.
+
+import unittest, os, sys
+import tempfile
+
+import sb_test_support
+sb_test_support.fix_sys_path()
+
+from spambayes.storage import HashedToken
+from spambayes.tokendump import DumpReader, DumpWriter, dump_make, merge
+from spambayes.tokendump import token_key, token_word, is_dump
+
+class TokenDumpTestCase(unittest.TestCase):
+    def setUp(self):
+        self.db_name = tempfile.mktemp("spambayestest")
+
+    def tearDown(self):
+        if os.path.exists(self.db_name):
+            os.remove(self.db_name)
+
+    def _make(self, items, nham=0, nspam=0, **kwargs):
+        fp = open(self.db_name, "wb")
+        try:
+            dump_make(fp, nham, nspam, items, **kwargs)
+        finally:
+            fp.close()
+
+    def _read(self):
+        fp = open(self.db_name, "rb")
+        try:
+            reader = DumpReader(fp)
+            records = [(token_word(key, flags), spam, ham)
+                       for key, flags, spam, ham in reader]
+        finally:
+            fp.close()
+        return reader, records
+
+    def testRoundTrip(self):
+        items = [("token%d" % i, i, 3 ** (i % 21)) for i in range(30)]
+        items.append((u"caf\xe9", 1, 0))
+        items.append((u"ascii", 0, 1))
+        items.append((HashedToken("\x01" * 8), 2, 2))
+        self._make(items, 5, 6)
+        self.assert_(is_dump(self.db_name))
+        reader, records = self._read()
+        self.assertEqual((reader.nham, reader.nspam), (5, 6))
+        self.assertEqual(len(records), len(items))
+        for word, spam, ham in records:
+            self.assert_((word, spam, ham) in items)
+        words = dict([(word, type(word)) for word, _s, _h in records])
+        self.assertEqual(words[u"caf\xe9"], unicode)
+        self.assertEqual(words["ascii"], str)
+        self.assertEqual(words["\x01" * 8], HashedToken)
+        # The records are in order.
+        keys = [token_key(word) for word, _s, _h in records]
+        self.assertEqual(keys, sorted(keys))
+
+    def testRuns(self):
+        # An export too big to sort in memory is sorted in runs (and
+        # this one takes several frames).
+        items = [("token%d" % (i * 7919 % 20000), 1, i)
+                 for i in range(20000)]
+        self._make(items, run_size=5000)
+        _reader, records = self._read()
+        items.sort()
+        self.assertEqual(records, items)
+
+    def testMerge(self):
+        a = [("a", 0, 1, 0), ("b", 0, 1, 1), ("d", 0, 2, 0)]
+        b = [("b", 0, 0, 2), ("c", 0, 1, 1), ("d", 0, 1, 1)]
+        self.assertEqual(list(merge([a, [], b])),
+                         [("a", 0, 1, 0), ("b", 0, 1, 3), ("c", 0, 1, 1),
+                          ("d", 0, 3, 1)])
+        self.assertEqual(list(merge([])), [])
+
+    def testCutShort(self):
+        self._make([("token%d" % i, i, i) for i in range(100)])
+        data = open(self.db_name, "rb").read()
+        open(self.db_name, "wb").write(data[:-2])
+        self.assertRaises(ValueError, self._read)
+        open(self.db_name, "wb").write("a CSV file,0,1\n")
+        self.failIf(is_dump(self.db_name))
+        self.assertRaises(ValueError, self._read)
+
+def suite():
+    suite = unittest.TestSuite()
+    for cls in (TokenDumpTestCase,
+                ):
+        suite.addTest(unittest.makeSuite(cls))
+    return suite
+
+if __name__=='__main__':
+    sb_test_support.unittest_main(argv=sys.argv + ['suite'])
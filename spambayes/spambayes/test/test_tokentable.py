@@ -0,0 +1,83 @@
+# Test the token table file format.
+
+import unittest, os, sys
+import tempfile
+
+import sb_test_support
+sb_test_support.fix_sys_path()
+
+from spambayes.port import md5
+from spambayes.tokentable import TokenTable, table_make
+
+def key(i):
+    return md5("token%d" % i).digest()[:8]
+
+class TokenTableTestCase(unittest.TestCase):
+    def setUp(self):
+        self.db_name = tempfile.mktemp("spambayestest")
+        self.tables = []
+
+    def tearDown(self):
+        for table in self.tables:
+            table.close()
+            table.fp.close()
+        if os.path.exists(self.db_name):
+            os.remove(self.db_name)
+
+    def _make(self, items, nspam=0, nham=0, keep_text=False):
+        fp = open(self.db_name, "wb")
+        try:
+            table_make(fp, items, nspam, nham, keep_text)
+        finally:
+            fp.close()
+        table = TokenTable(open(self.db_name, "rb"))
+        self.tables.append(table)
+        return table
+
+    def testLookup(self):
+        items = [(key(i), i, 2 * i, None) for i in range(5000)]
+        table = self._make(items, 3, 4)
+        self.assertEqual((table.nspam, table.nham), (3, 4))
+        self.assertEqual(len(table), 5000)
+        self.failIf(table.has_text)
+        for i in range(5000):
+            self.assertEqual(table.get(key(i)), (i, 2 * i))
+        for i in range(5000, 6000):
+            self.assertEqual(table.get(key(i)), None)
+        self.assertEqual(table.get("\0" * 8), None)
+        self.assertEqual(table.get("\xff" * 8), None)
+        keys = [k for k, _spam, _ham in table]
+        self.assertEqual(keys, sorted([k for k, _s, _h, _t in items]))
+
+    def testText(self):
+        items = [(key(i), 1, 0, "token%d" % i) for i in range(100)]
+        table = self._make(items, keep_text=True)
+        self.assert_(table.has_text)
+        texts = [table.text(table.find(key(i))) for i in range(100)]
+        self.assertEqual(texts, ["token%d" % i for i in range(100)])
+
+    def testEmpty(self):
+        table = self._make([])
+        self.assertEqual(len(table), 0)
+        self.assertEqual(table.get(key(0)), None)
+        self.assertEqual(list(table), [])
+
+    def testNotATable(self):
+        fp = open(self.db_name, "wb")
+        fp.write("not a token table, but long enough to have a header")
+        fp.close()
+        fp = open(self.db_name, "rb")
+        try:
+            self.assertRaises(ValueError, TokenTable, fp)
+        finally:
+            fp.close()
+
+def suite():
+    suite = unittest.TestSuite()
+    for cls in (TokenTableTestCase,
+                ):
+        suite.addTest(unittest.makeSuite(cls))
+    return suite
+
+if __name__=='__main__':
+    sb_test_support.unittest_main(argv=sys.argv + ['suite'])
@@ -0,0 +1,187 @@
+"""Share a classifier between threads.
+
+Nothing in classifier.py or storage.py is thread-safe, so a classifier
+used by more than one thread (as in a threaded server) needs a lock
+around it.  A plain lock would let only one thread score at a time,
+though scoring changes nothing that matters, so this module provides a
+reader-writer lock, and a LockedClassifier that wraps a classifier with
+one:  any number of threads can score at once, while training, storing
+and the like wait for the scoring to finish, then have the classifier to
+themselves.
+
+    bayes = threadsafe.LockedClassifier(storage.open_storage(name, usedb))
+
+Scoring only runs concurrently if the classifier's storage can be read
+by several threads at once (its concurrent_reads attribute says whether
+it can) and the [Classifier] x-track_last_seen option is off (because
+that writes to the database as messages are scored).  Otherwise scoring
+takes the lock exclusively too, which is still safe, just no faster.
+"""
+
+# This module is part of the spambayes project, which is Copyright 2002-2007
+# The Python Software Foundation and is covered by the Python Software
+# Foundation license.
+
+try:
+    import threading
+except ImportError:
+    import dummy_threading as threading
+
+from spambayes.Options import options
+
+
+class ReadWriteLock(object):
+    """A lock that can be held by many readers, or by a single writer.
+
+    A writer waits until there are no readers, and while a writer is
+    waiting no new readers get in, so a steady stream of readers can't
+    starve it.  A thread holding the write lock may acquire it, or the
+    read lock, again (which counts as acquiring the write lock again);
+    but a thread holding the read lock must not try to acquire either.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer = None
+        self._writes = 0
+        self._writers_waiting = 0
+
+    def acquire_read(self):
+        me = threading.currentThread()
+        self._cond.acquire()
+        try:
+            if self._writer is me:
+                self._writes += 1
+                return
+            while self._writer is not None or self._writers_waiting:
+                self._cond.wait()
+            self._readers += 1
+        finally:
+            self._cond.release()
+
+    def release_read(self):
+        self._cond.acquire()
+        try:
+            if self._writer is threading.currentThread():
+                self._writes -= 1
+                return
+            if self._readers <= 0:
+                raise RuntimeError("release of an unacquired read lock")
+            self._readers -= 1
+            if not self._readers:
+                self._cond.notifyAll()
+        finally:
+            self._cond.release()
+
+    def acquire_write(self):
+        me = threading.currentThread()
+        self._cond.acquire()
+        try:
+            if self._writer is me:
+                self._writes += 1
+                return
+            self._writers_waiting += 1
+            try:
+                while self._writer is not None or self._readers:
+                    self._cond.wait()
+            finally:
+                self._writers_waiting -= 1
+            self._writer = me
+            self._writes = 1
+        finally:
+            self._cond.release()
+
+    def release_write(self):
+        self._cond.acquire()
+        try:
+            if self._writer is not threading.currentThread():
+                raise RuntimeError("release of an unacquired write lock")
+            self._writes -= 1
+            if not self._writes:
+                self._writer = None
+                self._cond.notifyAll()
+        finally:
+            self._cond.release()
+
+
+class LockedClassifier(object):
+    """A classifier that can be shared between threads.
+
+    The scoring methods (spamprob(), chi2_spamprob(), spamprob_many() and
+    spamprob_cached()) take the read lock, and the methods that change
+    the classifier or its storage (learn(), unlearn(), learn_many(),
+    unlearn_many(), prune(), store(), load(), close() and, for a frozen
+    snapshot, refresh()) take the write lock.  Anything else is passed
+    straight through to the wrapped classifier, without locking.
+    """
+
+    def __init__(self, classifier, lock=None):
+        self.classifier = classifier
+        if lock is None:
+            lock = ReadWriteLock()
+        self.lock = lock
+
+    def __getattr__(self, att):
+        return getattr(self.classifier, att)
+
+    def _shared(self):
+        """Return the acquire and release functions scoring should use."""
+        if getattr(self.classifier, "concurrent_reads", False) and \
+           not options["Classifier", "x-track_last_seen"]:
+            return self.lock.acquire_read, self.lock.release_read
+        return self.lock.acquire_write, self.lock.release_write
+
+    def _read(self, name, args):
+        acquire, release = self._shared()
+        acquire()
+        try:
+            return getattr(self.classifier, name)(*args)
+        finally:
+            release()
+
+    def _write(self, name, args):
+        self.lock.acquire_write()
+        try:
+            return getattr(self.classifier, name)(*args)
+        finally:
+            self.lock.release_write()
+
+    def spamprob(self, *args):
+        return self._read("spamprob", args)
+
+    def chi2_spamprob(self, *args):
+        return self._read("chi2_spamprob", args)
+
+    def spamprob_many(self, *args):
+        return self._read("spamprob_many", args)
+
+    def spamprob_cached(self, *args):
+        return self._read("spamprob_cached", args)
+
+    def learn(self, *args):
+        return self._write("learn", args)
+
+    def unlearn(self, *args):
+        return self._write("unlearn", args)
+
+    def learn_many(self, *args):
+        return self._write("learn_many", args)
+
+    def unlearn_many(self, *args):
+        return self._write("unlearn_many", args)
+
+    def prune(self, *args):
+        return self._write("prune", args)
+
+    def store(self, *args):
+        return self._write("store", args)
+
+    def load(self, *args):
+        return self._write("load", args)
+
+    def close(self, *args):
+        return self._write("close", args)
+
+    def refresh(self, *args):
+        return self._write("refresh", args)
@@ -0,0 +1,303 @@
+"""A token dump:  a compact, compressed file of token counts, for exporting
+a database and importing it again (see sb_dbexpimp).
+
+The records are sorted by token, so any number of dumps can be merged in
+a single pass, summing the counts of the tokens they share.  The file is
+laid out as:
+
+    header     MAGIC, then the number of ham and spam, as 32-bit
+               little-endian numbers
+    frames     a 32-bit little-endian length, then that many bytes of
+               zlib-compressed records; the last frame is empty
+
+and the records of a frame (up to FRAME_RECORDS of them) are stored a
+column at a time:
+
+    the number of records, as a 32-bit little-endian number, then the
+    width in bytes (1, 2 or 4) of each of the next four columns
+    the length of each token
+    the flags of each token
+    the spam counts
+    the ham counts
+    the tokens, one after another (unicode tokens encoded as UTF-8)
+
+Each column is an array of little-endian numbers of the smallest width
+that holds the biggest of them, so most counts take a byte, as they would
+as varints, but a column is read with a single call to the array module
+rather than a byte at a time.
+
+The flags mark a token that was unicode (UNICODE), and the hash of a
+token whose text a hashed-token database didn't keep (HASHED).
+"""
+
+# This module is part of the spambayes project, which is Copyright 2002-2007
+# The Python Software Foundation and is covered by the Python Software
+# Foundation license.
+
+from __future__ import generators
+
+import os
+import sys
+import zlib
+import struct
+import tempfile
+from array import array
+from heapq import heapify, heappop, heapreplace
+
+from spambayes.storage import HashedToken
+
+MAGIC = "SBD1"
+HEADER = "<4sLL"
+HEADER_SIZE = struct.calcsize(HEADER)
+FRAME_HEADER = "<LBBBB"
+FRAME_HEADER_SIZE = struct.calcsize(FRAME_HEADER)
+
+# Flags.
+UNICODE = 1
+HASHED = 2
+
+# The most records in a frame.
+FRAME_RECORDS = 8192
+
+# dump_make() sorts this many records at a time in memory; bigger exports
+# are sorted in runs written to temporary files, then merged.
+RUN_SIZE = 500000
+
+# The array typecode for numbers of each width.
+_TYPECODES = {1: "B", 2: "H"}
+for _typecode in "IL":
+    if array(_typecode).itemsize == 4:
+        _TYPECODES[4] = _typecode
+        break
+_SWAP = sys.byteorder != "little"
+
+def _column(numbers):
+    """Return the width and bytes of a column of numbers."""
+    top = max(numbers)
+    if top < 0x100:
+        width = 1
+    elif top < 0x10000:
+        width = 2
+    else:
+        width = 4
+    column = array(_TYPECODES[width], numbers)
+    if _SWAP:
+        column.byteswap()
+    return width, column.tostring()
+
+def _read_column(width, data, pos, count):
+    """Return the column of count numbers of width at data[pos:], and the
+    position after it."""
+    end = pos + width * count
+    column = array(_TYPECODES[width], data[pos:end])
+    if _SWAP:
+        column.byteswap()
+    return column, end
+
+def token_key(word):
+    """Return the (key, flags) a token is dumped as."""
+    if isinstance(word, HashedToken):
+        return str(word), HASHED
+    if isinstance(word, unicode):
+        try:
+            # An ASCII token is the same token whichever it is.
+            return word.encode("ascii"), 0
+        except UnicodeError:
+            return word.encode("utf-8"), UNICODE
+    return word, 0
+
+def token_word(key, flags):
+    """Return the token dumped as (key, flags)."""
+    if flags & HASHED:
+        return HashedToken(key)
+    if flags & UNICODE:
+        return key.decode("utf-8")
+    return key
+
+
+class DumpWriter(object):
+    """Writes a token dump to the open file fp.
+
+    The records must be written in order of (key, flags) for the dump to
+    be merged.
+    """
+
+    def __init__(self, fp, nham, nspam):
+        self.fp = fp
+        self.buffer = []
+        fp.write(struct.pack(HEADER, MAGIC, nham, nspam))
+
+    def write_records(self, records):
+        """Write the (key, flags, spamcount, hamcount) records."""
+        buffer = self.buffer
+        append = buffer.append
+        for record in records:
+            append(record)
+            if len(buffer) >= FRAME_RECORDS:
+                self._flush()
+                buffer = self.buffer
+                append = buffer.append
+
+    def _flush(self):
+        records = self.buffer
+        keys, flags, spams, hams = map(list, zip(*records))
+        columns = [_column(map(len, keys)), _column(flags), _column(spams),
+                   _column(hams)]
+        data = [struct.pack(FRAME_HEADER, len(records),
+                            *[width for width, _data in columns])]
+        data.extend([column for _width, column in columns])
+        data.extend(keys)
+        data = zlib.compress("".join(data))
+        self.fp.write(struct.pack("<L", len(data)))
+        self.fp.write(data)
+        self.buffer = []
+
+    def close(self):
+        if self.buffer:
+            self._flush()
+        self.fp.write(struct.pack("<L", 0))
+
+
+class DumpReader(object):
+    """Reads the token dump in the open file fp.
+
+    Iterating over it gives the (key, flags, spamcount, hamcount) of each
+    record in turn; token_word() gives the token a key is for.
+    """
+
+    def __init__(self, fp):
+        self.fp = fp
+        header = fp.read(HEADER_SIZE)
+        if len(header) < HEADER_SIZE:
+            raise ValueError("%s is not a token dump" % (fp.name,))
+        magic, self.nham, self.nspam = struct.unpack(HEADER, header)
+        if magic != MAGIC:
+            raise ValueError("%s is not a token dump" % (fp.name,))
+
+    def _frames(self):
+        fp = self.fp
+        while True:
+            length = fp.read(4)
+            if len(length) < 4:
+                raise ValueError("%s is cut short" % (fp.name,))
+            length = struct.unpack("<L", length)[0]
+            if not length:
+                break
+            data = fp.read(length)
+            if len(data) < length:
+                raise ValueError("%s is cut short" % (fp.name,))
+            yield zlib.decompress(data)
+
+    def frames(self):
+        """Yield a list of the records of each frame in turn."""
+        for data in self._frames():
+            header = struct.unpack(FRAME_HEADER, data[:FRAME_HEADER_SIZE])
+            count = header[0]
+            pos = FRAME_HEADER_SIZE
+            columns = []
+            for width in header[1:]:
+                column, pos = _read_column(width, data, pos, count)
+                columns.append(column)
+            keys = []
+            append = keys.append
+            for length in columns[0]:
+                append(data[pos:pos+length])
+                pos += length
+            yield zip(keys, columns[1], columns[2], columns[3])
+
+    def __iter__(self):
+        for records in self.frames():
+            for record in records:
+                yield record
+
+
+def is_dump(filename):
+    """Return whether filename is a token dump."""
+    fp = open(filename, "rb")
+    try:
+        return fp.read(len(MAGIC)) == MAGIC
+    finally:
+        fp.close()
+
+def merge(sources):
+    """Yield the (key, flags, spamcount, hamcount) records of the sorted
+    iterables sources in order, summing the counts of the same token."""
+    heap = []
+    for i, source in enumerate(sources):
+        next = iter(source).next
+        try:
+            key, flags, spamcount, hamcount = next()
+        except StopIteration:
+            continue
+        heap.append(((key, flags), i, spamcount, hamcount, next))
+    heapify(heap)
+    token = None
+    spam = ham = 0
+    while heap:
+        entry, i, spamcount, hamcount, next = heap[0]
+        try:
+            key, flags, s, h = next()
+        except StopIteration:
+            heappop(heap)
+        else:
+            heapreplace(heap, ((key, flags), i, s, h, next))
+        if entry == token:
+            spam += spamcount
+            ham += hamcount
+            continue
+        if token is not None:
+            yield token[0], token[1], spam, ham
+        token = entry
+        spam = spamcount
+        ham = hamcount
+    if token is not None:
+        yield token[0], token[1], spam, ham
+
+def dump_make(fp, nham, nspam, items, run_size=RUN_SIZE):
+    """Write a token dump of the (word, spamcount, hamcount) items to the
+    open file fp.
+
+    The items needn't be in any order, nor fit in memory:  they're sorted
+    run_size at a time, and if there's more than one run, the runs are
+    written to temporary files and merged.
+    """
+    runs = []
+    run = []
+    try:
+        for word, spamcount, hamcount in items:
+            if word.__class__ is str:
+                # The usual case.
+                run.append((word, 0, spamcount, hamcount))
+            else:
+                key, flags = token_key(word)
+                run.append((key, flags, spamcount, hamcount))
+            if len(run) >= run_size:
+                runs.append(_write_run(run))
+                run = []
+        run.sort()
+        if not runs:
+            records = run
+        else:
+            if run:
+                runs.append(_write_run(run))
+            run = None
+            records = merge([DumpReader(f) for f, _name in runs])
+        writer = DumpWriter(fp, nham, nspam)
+        writer.write_records(records)
+        writer.close()
+    finally:
+        for f, name in runs:
+            f.close()
+            os.remove(name)
+
+def _write_run(run):
+    """Write the records of run, sorted, to a temporary file, and return
+    the file, open for reading from the start, and its name."""
+    run.sort()
+    fd, name = tempfile.mkstemp(".run", "sbdump")
+    f = os.fdopen(fd, "w+b")
+    writer = DumpWriter(f, 0, 0)
+    writer.write_records(run)
+    writer.close()
+    f.seek(0)
+    return f, name
@@ -0,0 +1,164 @@
+"""A token table:  a read-only file of token counts, made to be opened and
+searched in place.
+
+The file is mmapped, and looking a token up reads a few bytes of it,
+without loading anything else, so opening even a big table costs next to
+nothing.  Tokens are identified by an eight-byte key (the caller's hash
+of the token), and the file is laid out as:
+
+    header     MAGIC, then the number of records, the number of spam and
+               ham, the number of bucket bits and the flags, as 32-bit
+               little-endian numbers
+    buckets    2**bits + 1 32-bit numbers:  the index of the first record
+               whose key starts with each bits-bit prefix (and, last, the
+               number of records)
+    records    a 16-byte record for each token, sorted by key:  the key,
+               then the spam and ham counts as 32-bit little-endian numbers
+    text       if the HAS_TEXT flag is set, the number of records + 1
+               32-bit offsets of the text of each token within the text
+               that follows them
+
+A lookup finds the key's bucket from its first bytes, then does a binary
+search of the few records in it.
+"""
+
+# This module is part of the spambayes project, which is Copyright 2002-2007
+# The Python Software Foundation and is covered by the Python Software
+# Foundation license.
+
+from __future__ import generators
+
+import os
+import mmap
+import struct
+
+MAGIC = "SBT1"
+HEADER = "<4sLLLLL"
+HEADER_SIZE = struct.calcsize(HEADER)
+RECORD = "<8sLL"
+RECORD_SIZE = struct.calcsize(RECORD)
+KEY_SIZE = 8
+
+# Flags.
+HAS_TEXT = 1
+
+# Buckets are made for about this many records each.
+BUCKET_RECORDS = 8
+MAX_BUCKET_BITS = 24
+
+
+class TokenTable(object):
+    """A token table in the open file fp."""
+
+    def __init__(self, fp):
+        self.fp = fp
+        fd = fp.fileno()
+        self.size = os.fstat(fd).st_size
+        if self.size < HEADER_SIZE:
+            raise ValueError("%s is not a token table" % (fp.name,))
+        self.map = mmap.mmap(fd, self.size, access=mmap.ACCESS_READ)
+        magic, self.count, self.nspam, self.nham, bits, flags = \
+               struct.unpack(HEADER, self.map[:HEADER_SIZE])
+        if magic != MAGIC:
+            self.map.close()
+            raise ValueError("%s is not a token table" % (fp.name,))
+        self.has_text = bool(flags & HAS_TEXT)
+        self.shift = 32 - bits
+        self.records_start = HEADER_SIZE + 4 * ((1 << bits) + 1)
+        self.text_start = self.records_start + self.count * RECORD_SIZE
+        self.text_data_start = self.text_start + 4 * (self.count + 1)
+
+    def close(self):
+        self.map.close()
+
+    def __len__(self):
+        return self.count
+
+    def find(self, key):
+        """Return the index of the record of key, or -1 if there isn't
+        one."""
+        m = self.map
+        pos = HEADER_SIZE + 4 * (struct.unpack(">L", key[:4])[0] >>
+                                 self.shift)
+        lo, hi = struct.unpack("<LL", m[pos:pos+8])
+        start = self.records_start
+        while lo < hi:
+            mid = (lo + hi) // 2
+            pos = start + mid * RECORD_SIZE
+            found = m[pos:pos+KEY_SIZE]
+            if found < key:
+                lo = mid + 1
+            elif found > key:
+                hi = mid
+            else:
+                return mid
+        return -1
+
+    def get(self, key, default=None):
+        """Return (spamcount, hamcount) for key, or default."""
+        i = self.find(key)
+        if i < 0:
+            return default
+        pos = self.records_start + i * RECORD_SIZE + KEY_SIZE
+        return struct.unpack("<LL", self.map[pos:pos+8])
+
+    def record(self, i):
+        """Return (key, spamcount, hamcount) for the i'th record."""
+        pos = self.records_start + i * RECORD_SIZE
+        return struct.unpack(RECORD, self.map[pos:pos+RECORD_SIZE])
+
+    def text(self, i):
+        """Return the text of the token of the i'th record, or None if
+        the table doesn't keep the text."""
+        if not self.has_text:
+            return None
+        pos = self.text_start + 4 * i
+        start, end = struct.unpack("<LL", self.map[pos:pos+8])
+        return self.map[self.text_data_start+start:
+                        self.text_data_start+end]
+
+    def __iter__(self):
+        for i in xrange(self.count):
+            yield self.record(i)
+
+
+def _bucket_bits(count):
+    bits = 0
+    while bits < MAX_BUCKET_BITS and \
+          (2 << bits) * BUCKET_RECORDS <= count:
+        bits += 1
+    return bits
+
+def table_make(fp, items, nspam, nham, keep_text=False):
+    """Write a token table to the open file fp.
+
+    items is an iterable of (key, spamcount, hamcount, text) sequences
+    with distinct keys; the text is only written if keep_text is true.
+    """
+    items = list(items)
+    items.sort()
+    count = len(items)
+    bits = _bucket_bits(count)
+    shift = 32 - bits
+    starts = [0] * ((1 << bits) + 1)
+    for key, _spam, _ham, _text in items:
+        starts[(struct.unpack(">L", key[:4])[0] >> shift) + 1] += 1
+    for i in xrange(1, len(starts)):
+        starts[i] += starts[i-1]
+
+    flags = 0
+    if keep_text:
+        flags |= HAS_TEXT
+    fp.write(struct.pack(HEADER, MAGIC, count, nspam, nham, bits, flags))
+    fp.write(struct.pack("<%dL" % (len(starts),), *starts))
+    for i in xrange(0, count, 10000):
+        fp.write("".join([struct.pack(RECORD, key, spam, ham)
+                          for key, spam, ham, _text in items[i:i+10000]]))
+    if keep_text:
+        offsets = [0]
+        for _key, _spam, _ham, text in items:
+            offsets.append(offsets[-1] + len(text or ""))
+        fp.write(struct.pack("<%dL" % (len(offsets),), *offsets))
+        for i in xrange(0, count, 10000):
+            fp.write("".join([text or "" for _key, _spam, _ham, text
+                              in items[i:i+10000]]))
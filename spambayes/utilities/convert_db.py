@@ -12,9 +12,12 @@ Usage:
             -t type   : type of the database to convert
                         (e.g. pickle, dbm, zodb)
             -T type   : type of database to convert to
-                        (e.g. pickle, dbm, zodb)
+                        (e.g. pickle, dbm, zodb, or table for a
+                        read-only token table)
             -n path   : path to the database to convert
             -N path   : path of the resulting database
+            -H        : store hashed tokens in the resulting database
+            -K        : as -H, but also keep the text of the tokens
             -h        : help
 
 To convert the database from dbm to ZODB on Windows, simply running
@@ -39,12 +42,13 @@ from spambayes import storage
 
 if __name__ == '__main__':
     try:
-        opts, args = getopt.getopt(sys.argv[1:], 'ht:T:n:N:')
+        opts, args = getopt.getopt(sys.argv[1:], 'ht:T:n:N:HK')
     except getopt.error, msg:
         print >> sys.stderr, str(msg) + '\n\n' + __doc__
         sys.exit()
 
     old_name = old_type = new_name = new_type = None
+    hash_tokens = keep_text = None
     for opt, arg in opts:
         if opt == '-h':
             print >> sys.stderr, __doc__
@@ -57,4 +61,9 @@ if __name__ == '__main__':
             old_name = os.path.expanduser(arg)
         elif opt == '-N':
             new_name = os.path.expanduser(arg)
-    storage.convert(old_name, old_type, new_name, new_type)
+        elif opt == '-H':
+            hash_tokens = True
+        elif opt == '-K':
+            hash_tokens = keep_text = True
+    storage.convert(old_name, old_type, new_name, new_type,
+                    hash_tokens, keep_text)
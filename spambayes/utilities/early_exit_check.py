@@ -0,0 +1,107 @@
+#! /usr/bin/env python
+
+"""Usage: %(program)s [options] FILE ...
+
+Check that early-exit scoring (the [Classifier] x-early_exit_scoring
+option) classifies every message exactly as full scoring does, and report
+how many clues it skips.
+
+Where:
+    -h
+        show usage and exit
+    -d DBNAME
+        score with the DBM store
+    -p DBNAME
+        score with the pickle store
+    -o section:option:value
+        set [section, option] in the options database to value
+
+Each FILE is a mailbox (any kind mboxutils.getmbox() accepts).  With no
+-d or -p, the database named in the configuration file is used.  The
+clues of each message are found once, then combined both ways, so the
+times reported are for the combining alone.  The exit status is 1 if any
+message is classified differently.
+"""
+
+import sys
+import time
+import getopt
+
+from spambayes import storage
+from spambayes.Options import options, get_pathname_option
+from spambayes.mboxutils import getmbox
+from spambayes.tokenizer import tokenize
+
+program = sys.argv[0]
+
+def usage(code, msg=''):
+    """Print usage message and sys.exit(code)."""
+    if msg:
+        print >> sys.stderr, msg
+        print >> sys.stderr
+    print >> sys.stderr, __doc__ % globals()
+    sys.exit(code)
+
+def classify(prob):
+    if prob < options["Categorization", "ham_cutoff"]:
+        return "ham"
+    if prob > options["Categorization", "spam_cutoff"]:
+        return "spam"
+    return "unsure"
+
+def main():
+    try:
+        opts, args = getopt.getopt(sys.argv[1:], 'hd:p:o:')
+    except getopt.error, msg:
+        usage(2, msg)
+    if not args:
+        usage(2, "No mailboxes given")
+
+    for opt, arg in opts:
+        if opt == '-h':
+            usage(0)
+        elif opt == '-o':
+            options.set_from_cmdline(arg, sys.stderr)
+
+    dbname, usedb = storage.database_type(opts)
+    if usedb is None:
+        usedb = options["Storage", "persistent_use_database"]
+        dbname = get_pathname_option("Storage", "persistent_storage_file")
+    bayes = storage.open_storage(dbname, usedb, 'r')
+
+    full_time = early_time = 0.0
+    changed = 0
+    counts = {"ham": 0, "unsure": 0, "spam": 0}
+    for name in args:
+        for msg in getmbox(name):
+            clues = bayes._getclues(tokenize(msg))
+            start = time.time()
+            prob = bayes._chi2_combine(clues)
+            full_time += time.time() - start
+            start = time.time()
+            early_prob = bayes._chi2_combine_early(clues)
+            early_time += time.time() - start
+            counts[classify(prob)] += 1
+            if classify(prob) != classify(early_prob):
+                changed += 1
+                print "%s: %s (%.6f) but %s (%.6f) with early exit" % \
+                      (msg.get("Message-ID", "message"), classify(prob),
+                       prob, classify(early_prob), early_prob)
+    bayes.close()
+
+    stats = bayes.scoringstats
+    if not stats.messages:
+        print "No messages."
+        return
+    print "messages:         %d (%d ham, %d unsure, %d spam)" % \
+          (stats.messages, counts["ham"], counts["unsure"], counts["spam"])
+    print "changed:          %d" % (changed,)
+    print "mean clues:       %.1f" % (float(stats.clues) / stats.messages,)
+    print "mean skipped:     %.1f" % (stats.mean_skipped(),)
+    print "combining (us):   %.1f full, %.1f early exit" % \
+          (full_time * 1e6 / stats.messages, early_time * 1e6 / stats.messages)
+    if changed:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
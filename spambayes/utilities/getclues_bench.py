@@ -0,0 +1,134 @@
+#! /usr/bin/env python
+
+"""Usage: %(program)s [options]
+
+Time clue selection (classifier.Classifier._getclues) on large messages,
+against the old approach of sorting every candidate clue.
+
+Where:
+    -h
+        show usage and exit
+    -b
+        use the mixed unigram/bigram scheme
+    -n NUM
+        number of times to score each message (default 20)
+
+A classifier is trained on synthetic messages, then messages with
+increasing numbers of distinct tokens are scored.  Token lookups are done
+up front, so that only the cost of building and selecting the candidate
+clues is measured.
+"""
+
+import sys
+import time
+import random
+import getopt
+
+from spambayes.Options import options
+from spambayes.classifier import Classifier
+
+program = sys.argv[0]
+
+def sorting_getclues(c, wordstream, worddistanceget):
+    """The old _getclues():  sort all candidate clues, then truncate."""
+    mindist = options["Classifier", "minimum_prob_strength"]
+    if options["Classifier", "use_bigrams"]:
+        raw = []
+        push = raw.append
+        pair = None
+        seen = {pair: 1}
+        for i, token in enumerate(wordstream):
+            if i:
+                pair = "bi:%s %s" % (last_token, token)
+            last_token = token
+            for clue, indices in (token, (i,)), (pair, (i-1, i)):
+                if clue not in seen:
+                    seen[clue] = 1
+                    tup = worddistanceget(clue)
+                    if tup[0] >= mindist:
+                        push((tup, indices))
+        raw.sort()
+        raw.reverse()
+        clues = []
+        push = clues.append
+        seen = {}
+        for tup, indices in raw:
+            overlap = [i for i in indices if i in seen]
+            if not overlap:
+                for i in indices:
+                    seen[i] = 1
+                push(tup)
+        clues.reverse()
+    else:
+        clues = []
+        push = clues.append
+        for word in set(wordstream):
+            tup = worddistanceget(word)
+            if tup[0] >= mindist:
+                push(tup)
+        clues.sort()
+    if len(clues) > options["Classifier", "max_discriminators"]:
+        del clues[0 : -options["Classifier", "max_discriminators"]]
+    return [t[1:] for t in clues]
+
+def train(c, vocab, nmsgs=2000, msglen=200):
+    rand = random.Random(42)
+    for i in xrange(nmsgs):
+        is_spam = i & 1
+        if is_spam:
+            pool = vocab[len(vocab)//3:]
+        else:
+            pool = vocab[:2*len(vocab)//3]
+        c.learn([rand.choice(pool) for _j in xrange(msglen)], is_spam)
+
+def timeit(func, c, msg, lookup, repeat):
+    """Return the best of 3 average times to run func(c, msg, lookup)."""
+    best = None
+    for _i in xrange(3):
+        start = time.clock()
+        for _j in xrange(repeat):
+            func(c, msg, lookup)
+        elapsed = (time.clock() - start) / repeat
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+def main():
+    try:
+        opts, args = getopt.getopt(sys.argv[1:], 'hbn:')
+    except getopt.error, msg:
+        print >> sys.stderr, msg
+        print >> sys.stderr, __doc__ % globals()
+        sys.exit(2)
+
+    repeat = 20
+    for opt, arg in opts:
+        if opt == '-h':
+            print __doc__ % globals()
+            sys.exit(0)
+        elif opt == '-b':
+            options["Classifier", "use_bigrams"] = True
+        elif opt == '-n':
+            repeat = int(arg)
+
+    vocab = ["w%d" % i for i in xrange(20000)]
+    c = Classifier()
+    train(c, vocab)
+    getclues = Classifier._getclues
+
+    rand = random.Random(7)
+    print "%8s %12s %12s %8s" % ("tokens", "sorting ms", "heap ms", "speedup")
+    for size in (200, 1000, 5000, 20000):
+        msg = [rand.choice(vocab) for _i in xrange(size)]
+        distances = {}
+        for word in c._enhance_wordstream(msg):
+            distances[word] = c._worddistanceget(word)
+        lookup = distances.__getitem__
+        assert getclues(c, msg, lookup) == sorting_getclues(c, msg, lookup)
+        old = timeit(sorting_getclues, c, msg, lookup, repeat)
+        new = timeit(getclues, c, msg, lookup, repeat)
+        print "%8d %12.3f %12.3f %7.2fx" % (size, old * 1e3, new * 1e3,
+                                            old / new)
+
+if __name__ == "__main__":
+    main()
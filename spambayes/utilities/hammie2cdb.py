@@ -1,6 +1,9 @@
 #/usr/bin/env python
 """
-Convert a hammie database to a cdb database.
+Convert a hammie database to a cdb database of token probabilities (a
+frozen snapshot, see storage.freeze), for cdb_classifier.py or for the
+"frozen" storage type.  A snapshot of a database with hashed tokens can
+only be used with the latter.
 
 usage %(prog)s [ -h ] [ -d <file> | -p <file> ] <cdbfile>
 
@@ -15,9 +18,7 @@ usage %(prog)s [ -h ] [ -d <file> | -p <file> ] <cdbfile>
 import sys
 import os
 import getopt
-from spambayes import cdb
 from spambayes import storage
-from spambayes.cdb_classifier import CdbClassifier
 
 prog = os.path.basename(sys.argv[0])
 
@@ -47,16 +48,8 @@ def main(args):
             
     dbname, usedb = storage.database_type(opts)
     store = storage.open_storage(dbname, usedb)
-
-    bayes = CdbClassifier()
-    items = []
-    for word in store._wordinfokeys():
-        record = store._wordinfoget(word)
-        prob = store.probability(record)
-        items.append((word, str(prob)))
-    cdbfile = open(cdbname, "wb")
-    cdb.cdb_make(cdbfile, items)
-    cdbfile.close()
+    storage.freeze(store, cdbname)
+    store.close()
 
 if __name__ == "__main__":
     sys.exit(main(sys.argv[1:]))
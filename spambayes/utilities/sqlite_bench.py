@@ -0,0 +1,119 @@
+#! /usr/bin/env python
+
+"""Usage: %(program)s [options]
+
+Time training, storing and scoring with the SQLite storage type, against
+the dbm one (storage.DBDictClassifier).
+
+Where:
+    -h
+        show usage and exit
+    -n NUM
+        number of messages to train on (default 2000)
+    -s NUM
+        number of messages to score (default 500)
+    -d DIR
+        directory to put the databases in (default a temporary one)
+
+A classifier of each type is trained on the same synthetic messages and
+stored, then the same messages are scored with each, after reopening the
+database so that nothing is scored from memory.  The scores are checked
+to be the same.
+"""
+
+import os
+import sys
+import time
+import glob
+import random
+import getopt
+import tempfile
+
+from spambayes.storage import DBDictClassifier, SQLiteClassifier
+
+program = sys.argv[0]
+
+def make_messages(vocab, nmsgs, msglen=200, seed=42):
+    rand = random.Random(seed)
+    msgs = []
+    for i in xrange(nmsgs):
+        is_spam = i & 1
+        if is_spam:
+            pool = vocab[len(vocab)//3:]
+        else:
+            pool = vocab[:2*len(vocab)//3]
+        msgs.append(([rand.choice(pool) for _j in xrange(msglen)], is_spam))
+    return msgs
+
+def run(cls, db_name, training, scoring):
+    """Return the times to train, store and score, and the scores."""
+    bayes = cls(db_name)
+    start = time.time()
+    for tokens, is_spam in training:
+        bayes.learn(tokens, is_spam)
+    trained = time.time()
+    bayes.store()
+    stored = time.time()
+    bayes.close()
+
+    bayes = cls(db_name)
+    start_scoring = time.time()
+    scores = [bayes.spamprob(tokens) for tokens, _is_spam in scoring]
+    scored = time.time()
+    bayes.close()
+    return (trained - start, stored - trained, scored - start_scoring,
+            scores)
+
+def main():
+    try:
+        opts, args = getopt.getopt(sys.argv[1:], 'hn:s:d:')
+    except getopt.error, msg:
+        print >> sys.stderr, msg
+        print >> sys.stderr, __doc__ % globals()
+        sys.exit(2)
+
+    ntrain = 2000
+    nscore = 500
+    directory = None
+    for opt, arg in opts:
+        if opt == '-h':
+            print __doc__ % globals()
+            sys.exit(0)
+        elif opt == '-n':
+            ntrain = int(arg)
+        elif opt == '-s':
+            nscore = int(arg)
+        elif opt == '-d':
+            directory = arg
+
+    made_directory = directory is None
+    if made_directory:
+        directory = tempfile.mkdtemp()
+    vocab = ["w%d" % i for i in xrange(20000)]
+    training = make_messages(vocab, ntrain)
+    scoring = make_messages(vocab, nscore, seed=7)
+
+    try:
+        results = []
+        for name, cls in (("dbm", DBDictClassifier),
+                          ("sqlite", SQLiteClassifier)):
+            db_name = os.path.join(directory, "bench." + name)
+            results.append((name, run(cls, db_name, training, scoring)))
+    finally:
+        if made_directory:
+            for name in glob.glob(os.path.join(directory, "*")):
+                os.remove(name)
+            os.rmdir(directory)
+
+    print "%8s %10s %10s %10s %12s" % ("storage", "train s", "store s",
+                                       "score s", "msgs/s")
+    for name, (train_time, store_time, score_time, _scores) in results:
+        print "%8s %10.2f %10.2f %10.2f %12.1f" % (name, train_time,
+                                                   store_time, score_time,
+                                                   nscore / score_time)
+    if results[0][1][3] != results[1][1][3]:
+        print >> sys.stderr, "The scores differ!"
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
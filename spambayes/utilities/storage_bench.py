@@ -0,0 +1,97 @@
+#! /usr/bin/env python
+
+"""Usage: %(program)s [options]
+
+Benchmark the storage types against each other, and write the results as
+JSON (see spambayes/storagebench.py for what is measured).
+
+Where:
+    -h
+        show usage and exit
+    -t TYPES
+        comma-separated storage types to benchmark (default
+        pickle,dbm,cdb,sqlite,zodb; those that can't be used here are
+        skipped)
+    -n SIZES
+        comma-separated numbers of messages to train on (default
+        1000,5000)
+    -s NUM
+        number of messages to score (default 500)
+    -d DIR
+        directory to put the databases in (default a temporary one)
+    -o FILE
+        write the results to FILE instead of stdout
+    -1
+        run every benchmark in this process, rather than each in a
+        process of its own (the peak memory is then that of all the runs
+        so far)
+"""
+
+import os
+import sys
+import getopt
+import tempfile
+
+from spambayes import storagebench
+
+program = sys.argv[0]
+
+def usage(code, msg=''):
+    if msg:
+        print >> sys.stderr, msg
+        print >> sys.stderr
+    print >> sys.stderr, __doc__ % globals()
+    sys.exit(code)
+
+def main():
+    try:
+        opts, args = getopt.getopt(sys.argv[1:], 'ht:n:s:d:o:1')
+    except getopt.error, msg:
+        usage(2, msg)
+
+    db_types = storagebench.FILE_TYPES
+    sizes = [1000, 5000]
+    nscore = 500
+    directory = None
+    output = None
+    isolate = True
+    for opt, arg in opts:
+        if opt == '-h':
+            usage(0)
+        elif opt == '-t':
+            db_types = arg.split(",")
+        elif opt == '-n':
+            sizes = [int(size) for size in arg.split(",")]
+        elif opt == '-s':
+            nscore = int(arg)
+        elif opt == '-d':
+            directory = arg
+        elif opt == '-o':
+            output = arg
+        elif opt == '-1':
+            isolate = False
+    if args:
+        usage(2, "Unexpected arguments")
+
+    made_directory = directory is None
+    if made_directory:
+        directory = tempfile.mkdtemp()
+    try:
+        report = storagebench.run(db_types, sizes, nscore, directory,
+                                  isolate)
+    finally:
+        if made_directory:
+            os.rmdir(directory)
+
+    if output is None:
+        print storagebench.dumps(report)
+    else:
+        f = open(output, "w")
+        f.write(storagebench.dumps(report))
+        f.write("\n")
+        f.close()
+    for db_type, reason in report["skipped"].items():
+        print >> sys.stderr, "Skipped %s: %s" % (db_type, reason)
+
+if __name__ == "__main__":
+    main()
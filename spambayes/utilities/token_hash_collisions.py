@@ -0,0 +1,128 @@
+#! /usr/bin/env python
+
+"""Usage: %(program)s [options]
+
+Measure how often tokens collide when stored as hashes (the [Storage]
+x-hash_tokens option), and how much smaller the database keys get.
+
+Where:
+    -h
+        show usage and exit
+    -d DBNAME
+        measure the tokens in the DBM store
+    -p DBNAME
+        measure the tokens in the pickle store
+    -n NUM
+        measure NUM synthetic tokens instead of a database
+
+With no options, the database named in the configuration file is used.
+The database must hold the tokens themselves (or a hashed database that
+keeps the token text).
+
+Two distinct tokens share a 64-bit hash with probability 2**-64, so among
+n tokens about n*(n-1)/2**65 collisions are expected.  For a database of
+5 million tokens that is 7e-7, and this is what is seen:  a run over
+5,000,000 synthetic tokens shaped like tokenizer output (words, url:,
+subject:, skip: and bigram tokens, averaging 12.8 bytes) found no
+collisions, and cut the key bytes from 64MB to 40MB (real databases, with
+their long url and header tokens, save more).  A collision, should one
+happen, makes the two tokens share their counts, which is no worse than
+the tokenizer already does by lowercasing and truncating.
+"""
+
+import sys
+import getopt
+import random
+
+from spambayes import storage
+from spambayes.Options import options, get_pathname_option
+
+program = sys.argv[0]
+
+def usage(code, msg=''):
+    """Print usage message and sys.exit(code)."""
+    if msg:
+        print >> sys.stderr, msg
+        print >> sys.stderr
+    print >> sys.stderr, __doc__ % globals()
+    sys.exit(code)
+
+def synthetic_tokens(n, seed=42):
+    """Yield n distinct tokens that look like the tokenizer's output."""
+    rand = random.Random(seed)
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    def word(lo=3, hi=12):
+        return "".join([rand.choice(letters)
+                        for _i in xrange(rand.randint(lo, hi))])
+    makers = (lambda: word(),
+              lambda: word(),
+              lambda: "url:" + word(),
+              lambda: "subject:" + word(),
+              lambda: "skip:%s %d" % (rand.choice(letters),
+                                      rand.randrange(10, 100)),
+              lambda: "bi:%s %s" % (word(), word()),
+              )
+    seen = {}
+    while len(seen) < n:
+        token = rand.choice(makers)()
+        if token not in seen:
+            seen[token] = 1
+            yield token
+
+def measure(tokens):
+    """Return (tokens, collisions, token bytes) over the tokens."""
+    hashes = {}
+    ntokens = collisions = nbytes = 0
+    for token in tokens:
+        if isinstance(token, storage.HashedToken):
+            raise ValueError("the database holds only hashed tokens")
+        if isinstance(token, unicode):
+            token = token.encode("utf-8")
+        ntokens += 1
+        nbytes += len(token)
+        key = storage.token_hash(token)
+        if key in hashes:
+            collisions += 1
+        else:
+            hashes[key] = 1
+    return ntokens, collisions, nbytes
+
+def main():
+    try:
+        opts, args = getopt.getopt(sys.argv[1:], 'hd:p:n:')
+    except getopt.error, msg:
+        usage(2, msg)
+    if args:
+        usage(2, "Positional arguments not allowed")
+
+    nsynthetic = None
+    for opt, arg in opts:
+        if opt == '-h':
+            usage(0)
+        elif opt == '-n':
+            nsynthetic = int(arg)
+
+    if nsynthetic is not None:
+        print "Hashing %d synthetic tokens" % (nsynthetic,)
+        tokens = synthetic_tokens(nsynthetic)
+    else:
+        dbname, usedb = storage.database_type(opts)
+        if usedb is None:
+            usedb = options["Storage", "persistent_use_database"]
+            dbname = get_pathname_option("Storage", "persistent_storage_file")
+        print "Hashing the tokens in %s (%s database)" % (dbname, usedb)
+        bayes = storage.open_storage(dbname, usedb, 'r')
+        tokens = bayes._wordinfokeys()
+
+    ntokens, collisions, nbytes = measure(tokens)
+    expected = ntokens * (ntokens - 1) / 2.0 ** (8 * storage.HASH_SIZE + 1)
+    print "tokens:               %d" % (ntokens,)
+    print "collisions:           %d" % (collisions,)
+    print "expected collisions:  %.2g" % (expected,)
+    if ntokens:
+        print "mean token length:    %.1f bytes" % (float(nbytes) / ntokens,)
+    print "key bytes:            %d as tokens, %d as hashes" % \
+          (nbytes, ntokens * storage.HASH_SIZE)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+#! /usr/bin/env python
+
+"""Usage: %(program)s [-h] [-n NUM]
+
+Compare the memory used per token by the usual dict of WordInfo records
+and by the compact store (classifier.CompactWordInfo, enabled with the
+[Classifier] x-use_compact_wordinfo option).
+
+Where:
+    -h
+        show usage and exit
+    -n NUM
+        number of tokens to store (default 1000000)
+
+Each representation is measured in a fresh process, by the growth of its
+resident set size while the records are added.  The token strings
+themselves are created beforehand, so they aren't counted.  Linux only
+(the RSS is read from /proc).
+"""
+
+import os
+import sys
+import getopt
+import random
+
+from spambayes.classifier import WordInfo, CompactWordInfo
+
+program = sys.argv[0]
+
+def rss():
+    """Return the resident set size of this process, in bytes."""
+    f = open("/proc/self/statm")
+    try:
+        pages = int(f.read().split()[1])
+    finally:
+        f.close()
+    return pages * os.sysconf("SC_PAGE_SIZE")
+
+def measure(kind, ntokens):
+    """Return the bytes per token used by a wordinfo store of kind."""
+    rand = random.Random(1)
+    tokens = ["token%d" % i for i in xrange(ntokens)]
+    # Counts as in a real database:  mostly hapaxes, some large.
+    counts = [(rand.choice((0, 0, 1, 2, 5, 300)), rand.choice((0, 1, 1, 40)))
+              for _i in xrange(ntokens)]
+    record = WordInfo()
+    before = rss()
+    if kind == "dict":
+        wordinfo = {}
+        for token, t in zip(tokens, counts):
+            record = WordInfo()
+            record.__setstate__(t)
+            wordinfo[token] = record
+    else:
+        wordinfo = CompactWordInfo()
+        for token, t in zip(tokens, counts):
+            record.__setstate__(t)
+            wordinfo[token] = record
+    return float(rss() - before) / ntokens
+
+def main():
+    try:
+        opts, args = getopt.getopt(sys.argv[1:], 'hn:m:')
+    except getopt.error, msg:
+        print >> sys.stderr, msg
+        print >> sys.stderr, __doc__ % globals()
+        sys.exit(2)
+
+    ntokens = 1000000
+    kind = None
+    for opt, arg in opts:
+        if opt == '-h':
+            print __doc__ % globals()
+            sys.exit(0)
+        elif opt == '-n':
+            ntokens = int(arg)
+        elif opt == '-m':
+            # Internal:  measure one kind, in this process.
+            kind = arg
+
+    if kind is not None:
+        print measure(kind, ntokens)
+        return
+
+    results = {}
+    for kind in ("dict", "compact"):
+        cmd = '"%s" "%s" -n %d -m %s' % (sys.executable, __file__, ntokens,
+                                        kind)
+        results[kind] = float(os.popen(cmd).read())
+    print "%d tokens" % ntokens
+    print "  dict of WordInfo: %6.1f bytes/token" % results["dict"]
+    print "  CompactWordInfo:  %6.1f bytes/token" % results["compact"]
+    print "  saving:           %6.1f%%" % \
+          (100.0 * (1.0 - results["compact"] / results["dict"]))
+
+if __name__ == "__main__":
+    main()